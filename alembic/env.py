@@ -2,7 +2,7 @@ from logging.config import fileConfig
 from sqlalchemy import engine_from_config, pool
 from alembic import context
 from app.database import Base
-from app.models import building, organizations, activity  # импорт моделей
+from app.models import building, organizations, activity, versions, changes, documents  # импорт моделей
 
 # Конфигурация Alembic
 config = context.config
@@ -0,0 +1,53 @@
+"""buildings geo_cell
+
+Revision ID: 397aeae05efa
+Revises: 7b19c07aab25
+Create Date: 2026-10-18 10:12:40.518312
+
+"""
+import math
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '397aeae05efa'
+down_revision: Union[str, Sequence[str], None] = '7b19c07aab25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Параметры сетки на момент миграции (см. app.geo)
+GEO_CELL_SIZE_DEG = 0.01
+GEO_CELL_COLUMNS = 36000
+GEO_CELL_ROWS = 18000
+
+
+def _geo_cell(latitude: float, longitude: float) -> int:
+    """Номер ячейки сетки (формула как в app.geo.geo_cell на момент миграции)."""
+    row = min(max(math.floor((latitude + 90) / GEO_CELL_SIZE_DEG), 0), GEO_CELL_ROWS - 1)
+    col = min(max(math.floor((longitude + 180) / GEO_CELL_SIZE_DEG), 0), GEO_CELL_COLUMNS - 1)
+    return row * GEO_CELL_COLUMNS + col
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('buildings', sa.Column('geo_cell', sa.BigInteger(), nullable=True))
+    # Номер ячейки для уже существующих зданий считается в Python: в SQLite нет LEAST/GREATEST/FLOOR
+    buildings = sa.table('buildings', sa.column('id', sa.Integer), sa.column('latitude', sa.Float),
+                         sa.column('longitude', sa.Float), sa.column('geo_cell', sa.BigInteger))
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(buildings.c.id, buildings.c.latitude, buildings.c.longitude)).all()
+    if rows:
+        bind.execute(
+            buildings.update().where(buildings.c.id == sa.bindparam('building_id')).values(geo_cell=sa.bindparam('cell')),
+            [{'building_id': building_id, 'cell': _geo_cell(latitude, longitude)} for building_id, latitude, longitude in rows],
+        )
+    op.create_index(op.f('ix_buildings_geo_cell'), 'buildings', ['geo_cell'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_buildings_geo_cell'), table_name='buildings')
+    op.drop_column('buildings', 'geo_cell')
@@ -0,0 +1,36 @@
+"""organization name search
+
+Revision ID: 3c992f1eea84
+Revises: 7c4780d6b0f0
+Create Date: 2026-10-18 14:05:31.482117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c992f1eea84'
+down_revision: Union[str, Sequence[str], None] = '7c4780d6b0f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_organizations_name'), 'organizations', ['name'], unique=False)
+    if op.get_bind().dialect.name == 'postgresql':
+        # Триграммы — подстрока и опечатки, tsvector — слова в любом порядке (см. app.crud.search)
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX ix_organizations_name_trgm ON organizations USING gin (lower(name) gin_trgm_ops)")
+        op.execute("CREATE INDEX ix_organizations_name_tsv ON organizations USING gin (to_tsvector('simple'::regconfig, name))")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_organizations_name_tsv")
+        op.execute("DROP INDEX IF EXISTS ix_organizations_name_trgm")
+    op.drop_index(op.f('ix_organizations_name'), table_name='organizations')
@@ -0,0 +1,31 @@
+"""change log xact id
+
+Revision ID: 5d2e8c9a41f7
+Revises: e4b7a91c3f25
+Create Date: 2026-10-18 23:40:12.184533
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2e8c9a41f7'
+down_revision: Union[str, Sequence[str], None] = 'e4b7a91c3f25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Существующие записи получают xact_id 0 и читаются раньше новых в прежнем порядке id
+    op.add_column('change_log', sa.Column('xact_id', sa.BigInteger(), server_default='0', nullable=False))
+    op.create_index('ix_change_log_xact_id_id', 'change_log', ['xact_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_change_log_xact_id_id', table_name='change_log')
+    op.drop_column('change_log', 'xact_id')
@@ -0,0 +1,56 @@
+"""buildings geo_cell not null
+
+Revision ID: 8a3f6c1d2b94
+Revises: 5d2e8c9a41f7
+Create Date: 2026-10-18 21:05:47.310264
+
+"""
+import math
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a3f6c1d2b94'
+down_revision: Union[str, Sequence[str], None] = '5d2e8c9a41f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Параметры сетки на момент миграции (см. app.geo)
+GEO_CELL_SIZE_DEG = 0.01
+GEO_CELL_COLUMNS = 36000
+GEO_CELL_ROWS = 18000
+
+
+def _geo_cell(latitude: float, longitude: float) -> int:
+    """Номер ячейки сетки (формула как в app.geo.geo_cell на момент миграции)."""
+    row = min(max(math.floor((latitude + 90) / GEO_CELL_SIZE_DEG), 0), GEO_CELL_ROWS - 1)
+    col = min(max(math.floor((longitude + 180) / GEO_CELL_SIZE_DEG), 0), GEO_CELL_COLUMNS - 1)
+    return row * GEO_CELL_COLUMNS + col
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Здания, вставленные в обход create_building и массовой загрузки, получают ячейку
+    # (при генерации SQL (--sql) строк нет — заполнение пропускается)
+    buildings = sa.table('buildings', sa.column('id', sa.Integer), sa.column('latitude', sa.Float),
+                         sa.column('longitude', sa.Float), sa.column('geo_cell', sa.BigInteger))
+    bind = op.get_bind()
+    rows = [] if context.is_offline_mode() else bind.execute(
+        sa.select(buildings.c.id, buildings.c.latitude, buildings.c.longitude).where(buildings.c.geo_cell.is_(None))
+    ).all()
+    if rows:
+        bind.execute(
+            buildings.update().where(buildings.c.id == sa.bindparam('building_id')).values(geo_cell=sa.bindparam('cell')),
+            [{'building_id': building_id, 'cell': _geo_cell(latitude, longitude)} for building_id, latitude, longitude in rows],
+        )
+    with op.batch_alter_table('buildings') as batch_op:
+        batch_op.alter_column('geo_cell', existing_type=sa.BigInteger(), nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('buildings') as batch_op:
+        batch_op.alter_column('geo_cell', existing_type=sa.BigInteger(), nullable=True)
@@ -0,0 +1,60 @@
+"""change log
+
+Revision ID: a61c0e2b9d47
+Revises: fbd6e47d83e0
+Create Date: 2026-10-18 18:04:31.218407
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a61c0e2b9d47'
+down_revision: Union[str, Sequence[str], None] = 'fbd6e47d83e0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Таблицы справочника в порядке зависимостей: журнал заполняется существующими строками в этом порядке
+VERSIONED_TABLES = ('buildings', 'activities', 'organizations')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in VERSIONED_TABLES:
+        # SQLite не добавляет столбец с непостоянным значением по умолчанию: сначала
+        # столбец без него, затем заполнение и NOT NULL с CURRENT_TIMESTAMP (batch пересоздаёт таблицу)
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+        op.execute(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP")
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(timezone=True),
+                                  server_default=sa.func.current_timestamp(), nullable=False)
+    if op.get_bind().dialect.name == 'sqlite':
+        # batch в SQLite пересоздаёт таблицу без индексов по выражениям (см. fbd6e47d83e0)
+        op.create_index('ix_activities_name_lower', 'activities', [sa.text('lower(name)')], unique=False)
+    op.create_table('change_log',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('operation', sa.String(length=16), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(timezone=True), server_default=sa.func.current_timestamp(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Существующие строки попадают в журнал как вставки: первая синхронизация с since=0 получает весь справочник
+    for table in VERSIONED_TABLES:
+        op.execute(
+            f"INSERT INTO change_log (table_name, entity_id, operation, version) "
+            f"SELECT '{table}', id, 'insert', version FROM {table} ORDER BY id"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('change_log')
+    for table in reversed(VERSIONED_TABLES):
+        op.drop_column(table, 'version')
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,41 @@
+"""table versions updated_at
+
+Revision ID: c3f58d2e7a10
+Revises: a61c0e2b9d47
+Create Date: 2026-10-18 19:36:12.504187
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f58d2e7a10'
+down_revision: Union[str, Sequence[str], None] = 'a61c0e2b9d47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite не добавляет столбец с непостоянным значением по умолчанию: сначала
+    # столбец без него, затем заполнение и NOT NULL с CURRENT_TIMESTAMP (batch пересоздаёт таблицу)
+    op.add_column('table_versions', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE table_versions SET updated_at = CURRENT_TIMESTAMP")
+    with op.batch_alter_table('table_versions') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(timezone=True),
+                              server_default=sa.func.current_timestamp(), nullable=False)
+    # Версии организаций и зданий (валидаторы HTTP-кэширования); activities уже есть
+    for name in ('organizations', 'buildings'):
+        op.execute(
+            f"INSERT INTO table_versions (name, version) SELECT '{name}', 1 "
+            f"WHERE NOT EXISTS (SELECT 1 FROM table_versions WHERE name = '{name}')"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM table_versions WHERE name IN ('organizations', 'buildings')")
+    op.drop_column('table_versions', 'updated_at')
@@ -0,0 +1,52 @@
+"""organization documents
+
+Revision ID: e4b7a91c3f25
+Revises: c3f58d2e7a10
+Create Date: 2026-10-18 21:12:47.603918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b7a91c3f25'
+down_revision: Union[str, Sequence[str], None] = 'c3f58d2e7a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Таблица создаётся пустой: документы собираются в Python (python -m app.documents)
+    op.create_table('organization_documents',
+    sa.Column('organization_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('building_id', sa.Integer(), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('activity_ids', sa.JSON().with_variant(postgresql.ARRAY(sa.Integer()), 'postgresql'), nullable=False),
+    sa.Column('document', sa.LargeBinary(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.current_timestamp(), nullable=False),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('organization_id')
+    )
+    op.create_index(op.f('ix_organization_documents_name'), 'organization_documents', ['name'], unique=False)
+    op.create_index(op.f('ix_organization_documents_building_id'), 'organization_documents', ['building_id'], unique=False)
+    op.create_index('ix_organization_documents_coordinates', 'organization_documents', ['latitude', 'longitude'], unique=False)
+    if op.get_bind().dialect.name == 'postgresql':
+        # В SQLite activity_ids — JSON, индекс по массиву есть только в PostgreSQL (как в модели)
+        op.create_index('ix_organization_documents_activity_ids', 'organization_documents', ['activity_ids'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_organization_documents_activity_ids', table_name='organization_documents')
+    op.drop_index('ix_organization_documents_coordinates', table_name='organization_documents')
+    op.drop_index(op.f('ix_organization_documents_building_id'), table_name='organization_documents')
+    op.drop_index(op.f('ix_organization_documents_name'), table_name='organization_documents')
+    op.drop_table('organization_documents')
@@ -0,0 +1,40 @@
+"""lookup indexes
+
+Revision ID: fbd6e47d83e0
+Revises: 3c992f1eea84
+Create Date: 2026-10-18 15:22:09.731540
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fbd6e47d83e0'
+down_revision: Union[str, Sequence[str], None] = '3c992f1eea84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_organizations_building_id'), 'organizations', ['building_id'], unique=False)
+    op.create_index(op.f('ix_organization_phones_organization_id'), 'organization_phones', ['organization_id'], unique=False)
+    op.create_index('ix_organization_activity_activity_id', 'organization_activity', ['activity_id', 'organization_id'], unique=False)
+    op.create_index(op.f('ix_activities_parent_id'), 'activities', ['parent_id'], unique=False)
+    op.create_index(op.f('ix_activities_name'), 'activities', ['name'], unique=False)
+    op.create_index('ix_activities_name_lower', 'activities', [sa.text('lower(name)')], unique=False)
+    op.create_index('ix_buildings_latitude_longitude', 'buildings', ['latitude', 'longitude'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_buildings_latitude_longitude', table_name='buildings')
+    op.drop_index('ix_activities_name_lower', table_name='activities')
+    op.drop_index(op.f('ix_activities_name'), table_name='activities')
+    op.drop_index(op.f('ix_activities_parent_id'), table_name='activities')
+    op.drop_index('ix_organization_activity_activity_id', table_name='organization_activity')
+    op.drop_index(op.f('ix_organization_phones_organization_id'), table_name='organization_phones')
+    op.drop_index(op.f('ix_organizations_building_id'), table_name='organizations')
@@ -0,0 +1,147 @@
+import os
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from app.crud.activity import get_activities
+from app.crud.versions import get_version, local_changes
+from app.compression import Payload
+
+"""
+Кэш дерева видов деятельности в памяти процесса.
+
+Дерево меняется редко, а читается на каждом GET /activities/ и при каждом
+поиске организаций по виду деятельности. Кэш хранит неизменяемый снимок:
+само дерево, словарь id -> узел и словарь название -> id.
+
+Актуальность снимка определяется версией "activities" из таблицы table_versions,
+которую увеличивает create_activity:
+- изменения, закоммиченные этим процессом, видны сразу (локальный счётчик);
+- изменения других воркеров — не позже чем через ACTIVITY_CACHE_CHECK_INTERVAL секунд;
+  в пределах интервала снимок отдаётся без обращения к БД.
+"""
+
+ACTIVITY_CACHE_ENABLED = os.getenv("ACTIVITY_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Как часто (в секундах) сверять версию снимка с версией в БД
+ACTIVITY_CACHE_CHECK_INTERVAL = float(os.getenv("ACTIVITY_CACHE_CHECK_INTERVAL", "1.0"))
+
+VERSION_NAME = "activities"
+
+
+def _truncate(node: dict, depth: int) -> dict:
+    """Копия узла, в которой оставлено depth уровней дерева (считая сам узел)."""
+    children = [_truncate(child, depth - 1) for child in node["children"]] if depth > 1 else []
+    return {**node, "children": children}
+
+
+class ActivitySnapshot:
+    """
+        Неизменяемый снимок дерева видов деятельности определённой версии.
+
+        Вместе со снимком живут собранные из него ответы GET /activities/
+        (сериализованные и сжатые один раз, см. payload).
+    """
+
+    def __init__(self, version: int, tree: list):
+        self.version = version
+        self.tree = tree
+        self.nodes = {}
+        self.by_name = {}
+        self._payloads = {}
+        stack = list(tree)
+        while stack:
+            node = stack.pop()
+            self.nodes[node["id"]] = node
+            stack.extend(node["children"])
+        for activity_id in sorted(self.nodes):
+            self.by_name.setdefault(self.nodes[activity_id]["name"].lower(), activity_id)
+
+    def find(self, name: str):
+        """id активности по названию без учёта регистра (или None)."""
+        return self.by_name.get(name.lower())
+
+    def subtree(self, root_id: int = None, max_depth: int = None) -> list:
+        """Дерево целиком или поддерево root_id, при необходимости усечённое до max_depth уровней."""
+        if root_id is not None:
+            roots = [self.nodes[root_id]] if root_id in self.nodes else []
+        else:
+            roots = self.tree
+        if max_depth is None:
+            return roots
+        return [_truncate(node, max_depth) for node in roots]
+
+    def payload(self, key, build) -> Payload:
+        """Ответ по ключу (например, параметрам запроса): тело собирается build() один раз на снимок."""
+        payload = self._payloads.get(key)
+        if payload is None:
+            payload = self._payloads[key] = Payload(build())
+        return payload
+
+    def related_ids(self, activity_id: int) -> set:
+        """id самой активности, всех её потомков и всех её предков."""
+        ids = set()
+        stack = [self.nodes[activity_id]]
+        while stack:
+            node = stack.pop()
+            ids.add(node["id"])
+            stack.extend(node["children"])
+        parent_id = self.nodes[activity_id]["parent_id"]
+        while parent_id is not None and parent_id in self.nodes:
+            ids.add(parent_id)
+            parent_id = self.nodes[parent_id]["parent_id"]
+        return ids
+
+
+class ActivityTreeCache:
+    """Лениво перестраиваемый кэш дерева видов деятельности."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._local_changes = -1
+
+    def fresh_version(self):
+        """
+        Версия снимка, если его можно считать актуальным без обращения к БД, иначе None.
+
+        Используется для ответа 304 Not Modified до открытия соединения с БД.
+        """
+        snapshot = self._snapshot
+        if (
+            snapshot is None
+            or self._local_changes != local_changes(VERSION_NAME)
+            or time.monotonic() - self._checked_at >= ACTIVITY_CACHE_CHECK_INTERVAL
+        ):
+            return None
+        return snapshot.version
+
+    def get(self, db: Session) -> ActivitySnapshot:
+        """
+        Возвращает актуальный снимок, при необходимости сверив версию с БД
+        и перестроив дерево (одним запросом, см. get_activities).
+
+        Блокировка не удерживается во время запросов к БД: в DB_MODE=async функция
+        выполняется через run_sync в потоке event loop, и ожидание блокировки,
+        занятой другой корутиной на время ввода-вывода, остановило бы весь цикл.
+        Параллельные запросы в худшем случае перестроят один и тот же снимок дважды.
+        """
+        if self.fresh_version() is not None:
+            return self._snapshot
+        changes = local_changes(VERSION_NAME)
+        version = get_version(db, VERSION_NAME)
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != version:
+            snapshot = ActivitySnapshot(version, get_activities(db))
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version <= snapshot.version:
+                self._snapshot = snapshot
+            self._checked_at = time.monotonic()
+            self._local_changes = changes
+            return self._snapshot
+
+
+# Общий экземпляр кэша процесса
+activity_cache = ActivityTreeCache()
@@ -0,0 +1,230 @@
+import os
+import zlib
+from typing import Optional
+
+from fastapi import Response
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli  # необязательная зависимость: без неё ответы сжимаются только gzip
+except ImportError:
+    brotli = None
+
+"""
+Сжатие ответов (brotli, gzip).
+
+CompressionMiddleware сжимает ответы с текстовыми типами (JSON, NDJSON, text/*)
+не меньше COMPRESSION_MIN_SIZE байт кодировкой, которую клиент указал в
+Accept-Encoding (brotli предпочтительнее, если установлен пакет brotli).
+Потоковые ответы (NDJSON) сжимаются по частям: каждая часть отправляется
+клиенту сразу, без ожидания конца выгрузки. Большие тела сжимаются в пуле
+потоков, чтобы не останавливать event loop.
+
+Ответы, у которых уже есть Content-Encoding, не трогаются: так отдаются
+заранее сжатые тела из кэшей (кэш ответов app.response_cache и снимок дерева
+видов деятельности), сжатые один раз при сохранении, а не на каждый запрос
+(см. encode_variants, Payload, encoded_response).
+
+При сжатии строгий ETag становится слабым (W/): тело со сжатием и без
+побайтно различается, а слабое сравнение If-None-Match (app.http_cache) их не различает.
+"""
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+# Минимальный размер тела ответа для сжатия, байты
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_LEVEL = int(os.getenv("BROTLI_LEVEL", "4"))
+
+# Тела от этого размера сжимаются в пуле потоков
+_THREADPOOL_MIN_SIZE = 64 * 1024
+
+_COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def available_encodings() -> tuple:
+    """Поддерживаемые кодировки в порядке предпочтения."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Кодировка ответа по заголовку Accept-Encoding (None — без сжатия).
+
+    Учитываются q-значения: кодировка с q=0 запрещена, `*` разрешает остальные.
+    """
+    if not COMPRESSION_ENABLED or not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    default = weights.get("*", 0.0)
+    best = None
+    for encoding in available_encodings():
+        q = weights.get(encoding, default)
+        if q > 0 and (best is None or q > best[1]):
+            best = (encoding, q)
+    return best[0] if best else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_LEVEL)
+    return zlib.compress(body, GZIP_LEVEL, wbits=31)
+
+
+class _StreamCompressor:
+    """Сжатие потока по частям: каждая часть дописывается в общий поток и сразу выталкивается (flush)."""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_LEVEL)
+            self._compress = lambda chunk: self._compressor.process(chunk) + self._compressor.flush()
+            self._finish = self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, wbits=31)
+            self._compress = lambda chunk: self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compress(chunk)
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+def _weak_etag(etag: str) -> str:
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+
+def encoded_headers(encoding: Optional[str], headers: dict = None) -> dict:
+    """Заголовки заранее сжатого ответа: Content-Encoding, Vary и слабый ETag."""
+    headers = {key.lower(): value for key, value in (headers or {}).items()}
+    vary = headers.get("vary")
+    if not vary:
+        headers["vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["vary"] = f"{vary}, Accept-Encoding"
+    if encoding:
+        headers["content-encoding"] = encoding
+        if "etag" in headers:
+            headers["etag"] = _weak_etag(headers["etag"])
+    return headers
+
+
+def encode_variants(body: bytes) -> dict:
+    """
+    Сжатые варианты тела для хранения в кэше: кодировка -> байты.
+
+    Пустой словарь, если тело меньше COMPRESSION_MIN_SIZE или сжатие выключено.
+    """
+    if not COMPRESSION_ENABLED or len(body) < COMPRESSION_MIN_SIZE:
+        return {}
+    return {encoding: compress(body, encoding) for encoding in available_encodings()}
+
+
+def encoded_response(body: bytes, variants: dict, accept_encoding: Optional[str],
+                     media_type: str = "application/json", headers: dict = None) -> Response:
+    """Ответ из тела и его заранее сжатых вариантов в кодировке, которую принимает клиент."""
+    encoding = choose_encoding(accept_encoding)
+    if encoding not in variants:
+        encoding = None
+    return Response(content=variants[encoding] if encoding else body, media_type=media_type,
+                    headers=encoded_headers(encoding, headers))
+
+
+class Payload:
+    """
+    Сериализованное тело ответа, которое отдаётся многократно (например, дерево
+    видов деятельности из снимка кэша): каждая кодировка сжимается один раз, при первом запросе.
+    """
+
+    __slots__ = ("body", "_variants")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self._variants = {}
+
+    def response(self, accept_encoding: Optional[str], media_type: str = "application/json",
+                 headers: dict = None) -> Response:
+        encoding = choose_encoding(accept_encoding) if len(self.body) >= COMPRESSION_MIN_SIZE else None
+        if encoding and encoding not in self._variants:
+            self._variants[encoding] = compress(self.body, encoding)
+        return encoded_response(self.body, self._variants, accept_encoding, media_type, headers)
+
+
+class CompressionMiddleware:
+    """ASGI middleware: сжатие ответов по Accept-Encoding (см. описание модуля)."""
+
+    def __init__(self, app, min_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        start = None
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if "content-encoding" in headers or not headers.get("content-type", "").startswith(_COMPRESSIBLE_TYPES):
+                    await send(message)
+                    return
+                if "accept-encoding" not in headers.get("vary", "").lower():
+                    headers.add_vary_header("Accept-Encoding")
+                # Заголовки отправляются вместе с первой частью тела: до неё неизвестно, сжимать ли ответ
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if encoding is None or (not more_body and len(body) < self.min_size):
+                    await send(start)
+                    start = None
+                    await send(message)
+                    return
+                headers = MutableHeaders(scope=start)
+                headers["content-encoding"] = encoding
+                if "etag" in headers:
+                    headers["etag"] = _weak_etag(headers["etag"])
+                if not more_body:
+                    body = await _compress(body, encoding)
+                    headers["content-length"] = str(len(body))
+                    await send(start)
+                    start = None
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                del headers["content-length"]
+                compressor = _StreamCompressor(encoding)
+                await send(start)
+            if len(body) >= _THREADPOOL_MIN_SIZE:
+                chunk = await run_in_threadpool(compressor.compress, body)
+            else:
+                chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+async def _compress(body: bytes, encoding: str) -> bytes:
+    if len(body) >= _THREADPOOL_MIN_SIZE:
+        return await run_in_threadpool(compress, body, encoding)
+    return compress(body, encoding)
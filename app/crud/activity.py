@@ -1,6 +1,10 @@
+from sqlalchemy import insert, select, literal
 from sqlalchemy.orm import Session
-from app.models.activity import Activity
+from app.models.activity import Activity, activity_closure
 from app.schemas.activity import ActivityCreate
+from app.crud.changes import log_changes
+from app.response_cache import response_cache
+from app.suggest_index import suggest_index
 
 """
 Модуль CRUD-операций для работы с видами деятельности.
@@ -37,10 +41,38 @@ def create_activity(db: Session, activity_in: ActivityCreate, level: int = 1):
             raise ValueError("Уровень вложенности не может превышать 3")
     activity = Activity(name=activity_in.name, parent_id=activity_in.parent_id, level=level)
     db.add(activity)
+    db.flush()
+    add_activity_closure(db, activity.id, activity.parent_id)
+    log_changes(db, "activities", [activity.id])
     db.commit()
+    response_cache.invalidate("activities")
     db.refresh(activity)
+    suggest_index.add_activities([(activity.id, activity.name)])
     return activity
 
+def add_activity_closure(db: Session, activity_id: int, parent_id: int = None):
+    """
+    Добавляет в таблицу замыкания строки для новой активности:
+    пару (она сама, она сама, 0) и пары со всеми предками родителя.
+
+    Args:
+        db (Session): активная сессия SQLAlchemy
+        activity_id (int): id новой активности (уже записанной в БД)
+        parent_id (int, optional): id родительской активности
+    """
+    db.execute(insert(activity_closure).values(ancestor_id=activity_id, descendant_id=activity_id, depth=0))
+    if parent_id:
+        db.execute(
+            insert(activity_closure).from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                select(
+                    activity_closure.c.ancestor_id,
+                    literal(activity_id),
+                    activity_closure.c.depth + 1,
+                ).where(activity_closure.c.descendant_id == parent_id),
+            )
+        )
+
 def build_activity_tree(activity: Activity):
     """
     Рекурсивно строит дерево вида деятельности, включая все дочерние элементы.
@@ -59,15 +91,60 @@ def build_activity_tree(activity: Activity):
         "children": [build_activity_tree(child) for child in activity.children]
     }
 
-def get_activities(db: Session):
+def assemble_activity_tree(rows, root_id: int = None):
+    """
+    Собирает дерево видов деятельности из плоского списка строк за O(n).
+
+    Узлы создаются по словарю id -> узел, после чего каждый узел добавляется
+    в `children` своего родителя. Корнями считаются узлы, родителя которых
+    нет в выборке (или узел root_id, если он указан).
+
+    Args:
+        rows: строки (id, name, parent_id, level), упорядоченные по id
+        root_id (int, optional): id активности, которая должна стать единственным корнем
+
+    Returns:
+        List[dict]: дерево видов деятельности
+    """
+    nodes = {
+        row.id: {"id": row.id, "name": row.name, "parent_id": row.parent_id, "level": row.level, "children": []}
+        for row in rows
+    }
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node["parent_id"])
+        if parent is not None and node["id"] != root_id:
+            parent["children"].append(node)
+        else:
+            roots.append(node)
+    return roots
+
+def get_activities(db: Session, root_id: int = None, max_depth: int = None):
     """
-        Возвращает все виды деятельности в виде дерева (иерархической структуры).
+        Возвращает виды деятельности в виде дерева (иерархической структуры).
+
+        Все нужные активности выбираются одним плоским запросом, дерево
+        собирается в памяти (см. assemble_activity_tree).
 
-        Находит все корневые активности (у которых parent_id == None)
-        и рекурсивно строит их потомков.
+        Args:
+            root_id (int, optional): вернуть только поддерево этой активности
+                (выбирается по таблице замыкания activity_closure)
+            max_depth (int, optional): сколько уровней дерева вернуть, считая корень
 
         Returns:
-            List[dict]: дерево всех видов деятельности
+            List[dict]: дерево видов деятельности
         """
-    roots = db.query(Activity).filter(Activity.parent_id == None).all()
-    return [build_activity_tree(act) for act in roots]
\ No newline at end of file
+    columns = (Activity.id, Activity.name, Activity.parent_id, Activity.level)
+    if root_id is not None:
+        query = (
+            db.query(*columns)
+            .join(activity_closure, activity_closure.c.descendant_id == Activity.id)
+            .filter(activity_closure.c.ancestor_id == root_id)
+        )
+        if max_depth is not None:
+            query = query.filter(activity_closure.c.depth < max_depth)
+    else:
+        query = db.query(*columns)
+        if max_depth is not None:
+            query = query.filter(Activity.level <= max_depth)
+    return assemble_activity_tree(query.order_by(Activity.id).all(), root_id)
\ No newline at end of file
@@ -0,0 +1,67 @@
+import functools
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud import organizations, building, activity, bulk, versions
+from app.activity_cache import activity_cache
+from app.suggest_index import suggest_index
+from app.metrics import run_in_request_thread
+
+"""
+Асинхронные версии функций CRUD для эндпоинтов (async def).
+
+Каждая функция принимает либо AsyncSession (DB_MODE=async), либо Session (DB_MODE=sync):
+- с AsyncSession синхронная реализация выполняется через AsyncSession.run_sync —
+  в том же потоке, а ввод-вывод идёт через асинхронный драйвер (asyncpg/aiosqlite),
+  поэтому запросы не занимают пул потоков;
+- с Session она выполняется в пуле потоков, как раньше выполнялись синхронные эндпоинты.
+
+Логика запросов остаётся единственной (в синхронных модулях CRUD). Все они
+заранее загружают нужные связи, поэтому сериализация результата вне run_sync
+не вызывает ленивых запросов.
+"""
+
+async def run(db, fn, *args, **kwargs):
+    """Выполняет синхронную функцию fn(session, *args, **kwargs) в подходящем для сессии режиме."""
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_request_thread(fn, db, *args, **kwargs)
+
+def _async(fn):
+    @functools.wraps(fn)
+    async def wrapper(db, *args, **kwargs):
+        return await run(db, fn, *args, **kwargs)
+    return wrapper
+
+# Организации
+create_organization = _async(organizations.create_organization)
+get_organizations = _async(organizations.get_organizations)
+get_organizations_by_building = _async(organizations.get_organizations_by_building)
+get_organizations_by_name_activites = _async(organizations.get_organizations_by_name_activites)
+get_organizations_by_coordinates = _async(organizations.get_organizations_by_coordinates)
+get_organizations_in_radius = _async(organizations.get_organizations_in_radius)
+get_organizations_in_box = _async(organizations.get_organizations_in_box)
+get_nearest_organizations = _async(organizations.get_nearest_organizations)
+get_organization_by_id = _async(organizations.get_organization_by_id)
+get_organization_by_name = _async(organizations.get_organization_by_name)
+search_organizations = _async(organizations.search_organizations)
+get_organizations_by_activity_name = _async(organizations.get_organizations_by_activity_name)
+
+# Здания
+create_building = _async(building.create_building)
+get_buildings = _async(building.get_buildings)
+get_nearest_buildings = _async(building.get_nearest_buildings)
+
+# Виды деятельности
+create_activity = _async(activity.create_activity)
+get_activities = _async(activity.get_activities)
+get_activity_snapshot = _async(activity_cache.get)
+
+# Подсказки
+refresh_suggest_index = _async(suggest_index.refresh)
+
+# Версии наборов данных
+get_versions = _async(versions.get_versions)
+
+# Массовая загрузка
+bulk_create_organizations = _async(bulk.bulk_create_organizations)
+bulk_create_buildings = _async(bulk.bulk_create_buildings)
+bulk_create_activities = _async(bulk.bulk_create_activities)
@@ -1,13 +1,24 @@
+import math
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 from app.models.building import Building
 from app.schemas.building import BuildingCreate
+from app.crud.pagination import keyset, split_page
+from app.crud.changes import log_changes
+from app.geo import EARTH_RADIUS_M, geo_cell, haversine_m, radius_bounding_box, cell_ranges
+from app.spatial_index import building_index
+from app.response_cache import response_cache
 
 """
 Модуль CRUD-операций для работы со зданиями.
 
-Содержит функции для создания зданий и получения списка всех зданий.
+Содержит функции для создания зданий, получения списка всех зданий
+и поиска ближайших к точке зданий.
 """
 
+# Начальный радиус поиска ближайших через БД, метры; на каждом шаге он растёт в 4 раза
+NEAREST_START_RADIUS_M = 500
+
 def create_building(db: Session, building_in: BuildingCreate):
     """
      Создаёт новое здание в базе данных.
@@ -20,16 +31,103 @@ def create_building(db: Session, building_in: BuildingCreate):
          Building: созданное здание
      """
     building = Building(**building_in.dict())
+    building.geo_cell = geo_cell(building.latitude, building.longitude)
     db.add(building)
+    db.flush()
+    log_changes(db, "buildings", [building.id])
     db.commit()
     db.refresh(building)
+    building_index.add(building.id, building.latitude, building.longitude)
+    response_cache.invalidate("buildings")
     return building
 
-def get_buildings(db: Session):
+def get_buildings(db: Session, limit: int = None, cursor: int = None):
     """
-        Возвращает список всех зданий из базы данных.
+        Возвращает список всех зданий из базы данных (постранично, если указан limit).
 
         Returns:
-            List[Building]: список всех зданий
+            tuple: (List[Building] — здания страницы, курсор следующей страницы или None)
+    """
+    return split_page(keyset(db.query(Building), Building.id, limit, cursor).all(), limit)
+
+def iter_buildings(db: Session, batch_size: int):
+    """
+        Итерирует по всем зданиям, читая их из серверного курсора пачками по batch_size.
+    """
+    return db.query(Building).order_by(Building.id).yield_per(batch_size)
+
+def building_area_filter(min_lat: float, max_lat: float, lon_ranges):
+    """
+        Условие попадания здания в прямоугольную область.
+
+        Диапазоны по geo_cell позволяют использовать индекс, а фильтр по широте
+        и долготе отсекает лишнее на границах ячеек.
+    """
+    return and_(
+        or_(*[Building.geo_cell.between(first, last) for first, last in cell_ranges(min_lat, max_lat, lon_ranges)]),
+        Building.latitude.between(min_lat, max_lat),
+        or_(*[Building.longitude.between(lo, hi) for lo, hi in lon_ranges]),
+    )
+
+def nearest_search_radii(radius_m: float = None):
+    """
+        Последовательность радиусов для поиска ближайших через БД: от
+        NEAREST_START_RADIUS_M с ростом в 4 раза до radius_m (или до половины
+        окружности Земли, если ограничение не задано).
+    """
+    max_radius = radius_m if radius_m is not None else math.pi * EARTH_RADIUS_M
+    radius = min(NEAREST_START_RADIUS_M, max_radius)
+    while radius < max_radius:
+        yield radius
+        radius *= 4
+    yield max_radius
+
+def nearest_buildings_sql(db: Session, latitude: float, longitude: float, k: int, radius_m: float = None):
+    """
+        Поиск k ближайших зданий через БД (индекс geo_cell).
+
+        Радиус поиска расширяется, пока в круге не окажется k зданий: тогда
+        все k ближайших гарантированно лежат внутри него.
+
+        Returns:
+            list: пары (расстояние в метрах, id здания), ближайшие — первыми
+    """
+    for radius in nearest_search_radii(radius_m):
+        min_lat, max_lat, lon_ranges = radius_bounding_box(latitude, longitude, radius)
+        rows = (
+            db.query(Building.id, Building.latitude, Building.longitude)
+            .filter(building_area_filter(min_lat, max_lat, lon_ranges))
+            .all()
+        )
+        found = []
+        for building_id, lat, lon in rows:
+            distance = haversine_m(latitude, longitude, lat, lon)
+            if distance <= radius:
+                found.append((distance, building_id))
+        if len(found) >= k:
+            break
+    found.sort()
+    return found[:k]
+
+def get_nearest_buildings(db: Session, latitude: float, longitude: float, k: int, radius_m: float = None):
+    """
+        Возвращает k ближайших к точке зданий (ближайшие — первыми).
+
+        Использует in-memory индекс, если он загружен, иначе — поиск через БД.
+        Расстояние записывается в атрибут `distance` каждого здания (для BuildingGeoOut).
     """
-    return db.query(Building).all()
\ No newline at end of file
+    building_index.refresh(db)
+    if building_index.ready:
+        found = building_index.nearest(latitude, longitude, k, radius_m)
+    else:
+        found = nearest_buildings_sql(db, latitude, longitude, k, radius_m)
+    if not found:
+        return []
+    buildings = {b.id: b for b in db.query(Building).filter(Building.id.in_([building_id for _, building_id in found])).all()}
+    result = []
+    for distance, building_id in found:
+        building = buildings.get(building_id)
+        if building is not None:
+            building.distance = distance
+            result.append(building)
+    return result
@@ -0,0 +1,254 @@
+from typing import List
+from sqlalchemy import insert, select
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.models.organizations import Organization, OrganizationPhone, organization_activity
+from app.models.activity import Activity, activity_closure
+from app.models.building import Building
+from app.schemas.organizations import OrganizationCreate
+from app.schemas.building import BuildingCreate
+from app.schemas.activity import ActivityCreate
+from app.crud.changes import log_changes
+from app.geo import geo_cell
+from app.spatial_index import building_index
+from app.response_cache import response_cache
+from app.suggest_index import suggest_index
+
+"""
+Модуль массовой загрузки организаций, зданий и видов деятельности.
+
+Строки обрабатываются пачками по BULK_BATCH_SIZE, каждая пачка — отдельная
+транзакция:
+1. ссылки (здания, виды деятельности, родители) проверяются одним запросом
+   на пачку, строки с ошибками откладываются в список ошибок;
+2. остальные строки вставляются одним INSERT ... RETURNING на пачку
+   (executemany / insertmanyvalues), телефоны, связи с видами деятельности
+   и строки таблицы замыкания — тоже одним запросом каждого вида, как и
+   записи журнала изменений (app.crud.changes);
+3. если пачка целиком не вставилась (ошибка БД), она откатывается до
+   точки сохранения и строки вставляются по одной, каждая в своей точке
+   сохранения, — так ошибка одной строки не отменяет остальные.
+
+После коммита пачки вызываются те же действия, что и в create_*:
+пополнение пространственного индекса и индекса подсказок, сброс кэша ответов.
+Журнал изменений и версии наборов данных пишутся в транзакции пачки.
+"""
+
+# Количество строк в одной транзакции
+BULK_BATCH_SIZE = 1000
+
+# Максимальное количество строк в одном запросе к POST .../bulk
+BULK_MAX_ROWS = 10000
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, DBAPIError) and error.orig is not None:
+        return str(error.orig).strip()
+    return str(error)
+
+
+def _write_batch(db: Session, items, write):
+    """
+    Вставляет пачку строк, при ошибке БД — построчно.
+
+    Args:
+        items: список пар (номер строки, данные строки)
+        write: функция (db, список данных) -> список id в том же порядке
+
+    Returns:
+        tuple: (словарь номер строки -> id, словарь номер строки -> текст ошибки)
+    """
+    if not items:
+        return {}, {}
+    try:
+        with db.begin_nested():
+            ids = write(db, [payload for _, payload in items])
+        return {index: id_ for (index, _), id_ in zip(items, ids)}, {}
+    except SQLAlchemyError:
+        pass
+    created, errors = {}, {}
+    for index, payload in items:
+        try:
+            with db.begin_nested():
+                created[index] = write(db, [payload])[0]
+        except SQLAlchemyError as e:
+            errors[index] = _error_message(e)
+    return created, errors
+
+
+def _bulk(db: Session, rows: list, batch_size: int, prepare, write, after_commit):
+    """
+    Общий цикл массовой загрузки.
+
+    Args:
+        prepare: функция (db, пачка пар (номер, строка)) -> (пары (номер, данные для write), ошибки {номер: текст})
+        write: функция вставки пачки (см. _write_batch)
+        after_commit: функция (созданные пары (номер, id), данные строк) -> None,
+                      вызывается после коммита каждой пачки, в которой что-то создано
+
+    Returns:
+        dict: результат в форме BulkResult
+    """
+    ids = [None] * len(rows)
+    errors = {}
+    for start in range(0, len(rows), batch_size):
+        batch = list(enumerate(rows[start:start + batch_size], start))
+        items, rejected = prepare(db, batch)
+        created, failed = _write_batch(db, items, write)
+        db.commit()
+        errors.update(rejected)
+        errors.update(failed)
+        for index, id_ in created.items():
+            ids[index] = id_
+        if created:
+            after_commit(created, dict(items))
+    return {
+        "created": sum(id_ is not None for id_ in ids),
+        "ids": ids,
+        "errors": [{"index": index, "error": errors[index]} for index in sorted(errors)],
+    }
+
+# -------------------------------------------------------------------
+# Здания
+# -------------------------------------------------------------------
+def _prepare_buildings(db: Session, batch):
+    items = []
+    for index, row in batch:
+        values = row.model_dump()
+        values["geo_cell"] = geo_cell(row.latitude, row.longitude)
+        items.append((index, values))
+    return items, {}
+
+
+def _insert_buildings(db: Session, rows: list) -> list:
+    ids = db.execute(insert(Building).returning(Building.id, sort_by_parameter_order=True), rows).scalars().all()
+    log_changes(db, "buildings", ids)
+    return ids
+
+
+def _buildings_committed(created: dict, values: dict):
+    building_index.add_many([
+        (building_id, values[index]["latitude"], values[index]["longitude"]) for index, building_id in created.items()
+    ])
+    response_cache.invalidate("buildings")
+
+
+def bulk_create_buildings(db: Session, rows: List[BuildingCreate], batch_size: int = BULK_BATCH_SIZE):
+    """
+    Массово создаёт здания.
+
+    Returns:
+        dict: результат в форме BulkResult
+    """
+    return _bulk(db, rows, batch_size, _prepare_buildings, _insert_buildings, _buildings_committed)
+
+# -------------------------------------------------------------------
+# Организации
+# -------------------------------------------------------------------
+def _prepare_organizations(db: Session, batch):
+    """
+    Проверяет здания одним запросом на пачку. Несуществующие id видов
+    деятельности пропускаются — так же, как в create_organization.
+    """
+    building_ids = {row.building_id for _, row in batch}
+    activity_ids = {activity_id for _, row in batch for activity_id in row.activity_ids}
+    existing_buildings = set(db.scalars(select(Building.id).where(Building.id.in_(building_ids))))
+    existing_activities = set(db.scalars(select(Activity.id).where(Activity.id.in_(activity_ids)))) if activity_ids else set()
+    items, errors = [], {}
+    for index, row in batch:
+        if row.building_id not in existing_buildings:
+            errors[index] = f"Здание с id={row.building_id} не найдено"
+            continue
+        items.append((index, {
+            "name": row.name,
+            "building_id": row.building_id,
+            "phones": [phone.phone for phone in row.phones],
+            "activity_ids": [a for a in dict.fromkeys(row.activity_ids) if a in existing_activities],
+        }))
+    return items, errors
+
+
+def _insert_organizations(db: Session, rows: list) -> list:
+    ids = db.execute(
+        insert(Organization).returning(Organization.id, sort_by_parameter_order=True),
+        [{"name": row["name"], "building_id": row["building_id"]} for row in rows],
+    ).scalars().all()
+    phones = [{"organization_id": org_id, "phone": phone} for org_id, row in zip(ids, rows) for phone in row["phones"]]
+    if phones:
+        db.execute(insert(OrganizationPhone), phones)
+    links = [{"organization_id": org_id, "activity_id": a} for org_id, row in zip(ids, rows) for a in row["activity_ids"]]
+    if links:
+        db.execute(insert(organization_activity), links)
+    log_changes(db, "organizations", ids)
+    return ids
+
+
+def _organizations_committed(created: dict, values: dict):
+    suggest_index.add_organizations([(organization_id, values[index]["name"]) for index, organization_id in created.items()])
+    response_cache.invalidate("organizations")
+
+
+def bulk_create_organizations(db: Session, rows: List[OrganizationCreate], batch_size: int = BULK_BATCH_SIZE):
+    """
+    Массово создаёт организации вместе с телефонами и связями с видами деятельности.
+
+    Returns:
+        dict: результат в форме BulkResult
+    """
+    return _bulk(db, rows, batch_size, _prepare_organizations, _insert_organizations, _organizations_committed)
+
+# -------------------------------------------------------------------
+# Виды деятельности
+# -------------------------------------------------------------------
+def _prepare_activities(db: Session, batch):
+    """
+    Проверяет родителей одним запросом на пачку и вычисляет уровень вложенности.
+
+    Родитель должен существовать до начала пачки (созданные в этой же пачке
+    активности ещё не видны: их id клиенту неизвестны).
+    """
+    parent_ids = {row.parent_id for _, row in batch if row.parent_id}
+    levels = dict(db.execute(select(Activity.id, Activity.level).where(Activity.id.in_(parent_ids))).all()) if parent_ids else {}
+    items, errors = [], {}
+    for index, row in batch:
+        level = 1
+        if row.parent_id:
+            if row.parent_id not in levels:
+                errors[index] = f"Родитель с id={row.parent_id} не найден"
+                continue
+            level = levels[row.parent_id] + 1
+            if level > 3:
+                errors[index] = "Уровень вложенности не может превышать 3"
+                continue
+        items.append((index, {"name": row.name, "parent_id": row.parent_id or None, "level": level}))
+    return items, errors
+
+
+def _insert_activities(db: Session, rows: list) -> list:
+    ids = db.execute(insert(Activity).returning(Activity.id, sort_by_parameter_order=True), rows).scalars().all()
+    db.execute(insert(activity_closure), [{"ancestor_id": i, "descendant_id": i, "depth": 0} for i in ids])
+    db.execute(
+        insert(activity_closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(activity_closure.c.ancestor_id, Activity.id, activity_closure.c.depth + 1)
+            .join(Activity, Activity.parent_id == activity_closure.c.descendant_id)
+            .where(Activity.id.in_(ids)),
+        )
+    )
+    log_changes(db, "activities", ids)
+    return ids
+
+
+def _activities_committed(created: dict, values: dict):
+    suggest_index.add_activities([(activity_id, values[index]["name"]) for index, activity_id in created.items()])
+    response_cache.invalidate("activities")
+
+
+def bulk_create_activities(db: Session, rows: List[ActivityCreate], batch_size: int = BULK_BATCH_SIZE):
+    """
+    Массово создаёт виды деятельности и строки таблицы замыкания для них.
+
+    Returns:
+        dict: результат в форме BulkResult
+    """
+    return _bulk(db, rows, batch_size, _prepare_activities, _insert_activities, _activities_committed)
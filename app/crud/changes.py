@@ -0,0 +1,139 @@
+from sqlalchemy import insert, literal_column, select, tuple_
+from sqlalchemy.orm import Session
+from app.models.changes import ChangeLog
+from app.models.organizations import Organization
+from app.models.building import Building
+from app.models.activity import Activity
+from app.crud.loaders import organization_out_options
+from app.crud.versions import bump_version
+from app.crud.documents import DOCUMENTS_WRITE, refresh_changed_documents
+
+"""
+Модуль CRUD-операций для журнала изменений (таблица change_log).
+
+Функции создания (create_* и массовая загрузка) записывают в журнал строку
+на каждую изменённую строку справочника в той же транзакции, что и само
+изменение. Потребители (мобильные приложения, поисковый кластер) читают
+журнал по курсору — id последней полученной записи — и получают только то,
+что изменилось с прошлой синхронизации (GET /changes?since=<курсор>).
+
+Порядок чтения — (xact_id, id), где xact_id — id транзакции PostgreSQL,
+записавшей изменение. id выдаются при вставке, а не при коммите, поэтому
+запись с меньшим id может закоммититься позже записи с большим; чтобы
+потребитель её не пропустил, журнал отдаёт только записи транзакций с
+xact_id меньше горизонта видимости — xmin снимка читающего запроса
+(pg_snapshot_xmin(pg_current_snapshot())). Все транзакции ниже горизонта уже
+завершены, а все, что закоммитятся позже, получат xact_id не меньше него и
+встанут в порядке чтения после уже прочитанных записей. Блокировок при
+записи нет: пишущие транзакции не ждут друг друга (раньше журнал
+сериализовал их блокировкой таблицы до коммита, включая пересборку
+документов app.crud.documents). Цена — задержка ленты: записи не видны, пока
+не завершится самая старая из транзакций, начавшихся раньше их (в том числе
+не связанная с журналом). Нужен PostgreSQL 13+ (pg_current_xact_id).
+В SQLite транзакции записи выполняются по одной, xact_id всегда 0, и журнал
+читается в порядке id.
+"""
+
+# Таблица журнала -> (модель, функция (запрос) -> запрос с загрузкой данных для ответа)
+CHANGE_TABLES = {
+    "buildings": (Building, lambda query: query),
+    "activities": (Activity, lambda query: query),
+    "organizations": (Organization, lambda query: query.options(*organization_out_options())),
+}
+
+# id текущей транзакции и горизонт видимости снимка (xid8 -> bigint)
+_CURRENT_XACT_ID = literal_column("pg_current_xact_id()::text::bigint")
+_VISIBILITY_HORIZON = literal_column("pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+def _is_postgresql(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+def log_changes(db: Session, table: str, ids: list, operation: str = "insert", versions: list = None):
+    """
+    Записывает изменения строк таблицы table в журнал текущей транзакции,
+    увеличивает версию набора данных table (app.crud.versions) и, если
+    включена таблица organization_documents, пересобирает документы
+    затронутых организаций (app.crud.documents).
+
+    Args:
+        db (Session): активная сессия SQLAlchemy (коммит выполняет вызывающий код)
+        table (str): имя таблицы из CHANGE_TABLES
+        ids (list): id изменённых строк
+        operation (str): insert, update или delete
+        versions (list, optional): версии строк после изменения (по умолчанию 1 — новая строка)
+    """
+    if not ids:
+        return
+    versions = versions or [1] * len(ids)
+    statement = insert(ChangeLog)
+    if _is_postgresql(db):
+        statement = statement.values(xact_id=_CURRENT_XACT_ID)
+    db.execute(statement, [
+        {"table_name": table, "entity_id": entity_id, "operation": operation, "version": version}
+        for entity_id, version in zip(ids, versions)
+    ])
+    bump_version(db, table)
+    if DOCUMENTS_WRITE:
+        refresh_changed_documents(db, table, ids)
+
+def changes_position(db: Session, since: int) -> tuple:
+    """
+    Позиция курсора since в порядке чтения журнала: (xact_id, id).
+
+    Для курсора, которого нет в журнале, берётся xact_id ближайшей записи
+    с меньшим id; since=0 — начало журнала.
+    """
+    xact_id = db.scalar(
+        select(ChangeLog.xact_id).where(ChangeLog.id <= since).order_by(ChangeLog.id.desc()).limit(1)
+    )
+    return (xact_id if xact_id is not None else -1, since)
+
+def visibility_horizon(db: Session):
+    """
+    Горизонт видимости журнала: читаются только записи с xact_id меньше него
+    (см. описание модуля). None — ограничения нет (SQLite).
+    """
+    if not _is_postgresql(db):
+        return None
+    return db.scalar(select(_VISIBILITY_HORIZON))
+
+def changes_query(position: tuple, horizon=None):
+    """Запрос записей журнала после позиции position = (xact_id, id) в порядке чтения."""
+    query = select(ChangeLog).where(
+        tuple_(ChangeLog.xact_id, ChangeLog.id) > tuple_(*position, types=[ChangeLog.xact_id.type, ChangeLog.id.type])
+    )
+    if horizon is not None:
+        query = query.where(ChangeLog.xact_id < horizon)
+    return query.order_by(ChangeLog.xact_id, ChangeLog.id)
+
+def iter_changes(db: Session, batch_size: int, since: int = 0, limit: int = None):
+    """
+    Итерирует по записям журнала после курсора since в порядке (xact_id, id)
+    (не больше limit записей).
+
+    Журнал читается пачками по batch_size (keyset по (xact_id, id)) до
+    горизонта видимости, вычисленного в начале чтения; для каждой пачки
+    текущее состояние строк загружается одним запросом на таблицу.
+
+    Yields:
+        tuple: (ChangeLog, текущий объект строки или None, если строки больше нет)
+    """
+    position, remaining = changes_position(db, since), limit
+    horizon = visibility_horizon(db)
+    while remaining is None or remaining > 0:
+        size = batch_size if remaining is None else min(batch_size, remaining)
+        entries = db.scalars(changes_query(position, horizon).limit(size)).all()
+        if not entries:
+            return
+        entities = {}
+        for table, (model, load) in CHANGE_TABLES.items():
+            ids = {entry.entity_id for entry in entries if entry.table_name == table}
+            if ids:
+                entities[table] = {obj.id: obj for obj in load(db.query(model)).filter(model.id.in_(ids))}
+        for entry in entries:
+            yield entry, entities.get(entry.table_name, {}).get(entry.entity_id)
+        position = (entries[-1].xact_id, entries[-1].id)
+        if remaining is not None:
+            remaining -= len(entries)
+        # Прочитанные пачки больше не нужны: в памяти остаётся не больше одной
+        db.expunge_all()
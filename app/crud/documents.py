@@ -0,0 +1,152 @@
+import os
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+from app.models.documents import OrganizationDocument
+from app.models.organizations import Organization, organization_activity
+from app.models.activity import activity_closure
+from app.schemas.organizations import OrganizationOut
+from app.crud.loaders import organization_out_options
+from app.serialization import dump_row
+
+"""
+Модуль CRUD-операций для денормализованной копии организаций (таблица organization_documents).
+
+Чтение организации в обычном режиме — запрос к organizations с JOIN зданий и
+отдельные запросы телефонов, связей и каждого уровня дерева видов
+деятельности, после чего ответ собирается в Python. Документ хранит этот
+ответ уже готовым (см. app.models.documents).
+
+Режим задаёт переменная окружения ORGANIZATION_DOCUMENTS:
+- off (по умолчанию) — таблица не используется;
+- write — документы обновляются при изменениях справочника, чтение — как обычно;
+- read — документы обновляются, и эндпоинты организаций читают их одним
+  запросом (см. app.crud.organizations._organizations_query).
+
+Документы обновляются инкрементально в той же транзакции, что и изменение:
+при записи в журнал изменений (app.crud.changes.log_changes) пересобираются
+документы затронутых организаций — самих организаций, организаций в
+изменённых зданиях и организаций, у которых в дереве видов деятельности
+появился новый вид. Перед включением режима таблицу нужно заполнить:
+    python -m app.documents
+
+Цена быстрого чтения — запись: документ содержит поддеревья видов
+деятельности, поэтому новый вид деятельности пересобирает документы всех
+организаций его ветки (на наполненном справочнике — тысячи документов на
+один вызов), а создание организации перечитывает её со всеми связями.
+Сравнение: ORGANIZATION_DOCUMENTS=read python -m benchmarks.suite --compare ...
+"""
+
+ORGANIZATION_DOCUMENTS = os.getenv("ORGANIZATION_DOCUMENTS", "off").lower()
+DOCUMENTS_WRITE = ORGANIZATION_DOCUMENTS in ("write", "read")
+DOCUMENTS_READ = ORGANIZATION_DOCUMENTS == "read"
+
+# Организаций на один запрос загрузки при пересборке документов
+REFRESH_BATCH_SIZE = 1000
+
+def document_values(org) -> dict:
+    """
+    Строка organization_documents для организации, загруженной с профилем OrganizationOut.
+
+    Returns:
+        dict: значения столбцов OrganizationDocument
+    """
+    building = org.building
+    return {
+        "organization_id": org.id,
+        "name": org.name,
+        "building_id": org.building_id,
+        "latitude": building.latitude if building is not None else None,
+        "longitude": building.longitude if building is not None else None,
+        "activity_ids": [activity.id for activity in org.activities],
+        "document": dump_row(OrganizationOut, org),
+    }
+
+def refresh_documents(db: Session, organization_ids) -> int:
+    """
+    Пересобирает документы организаций (коммит выполняет вызывающий код).
+
+    Организации загружаются пачками по REFRESH_BATCH_SIZE с профилем
+    OrganizationOut. populate_existing перечитывает объекты, уже находящиеся
+    в сессии: их связи (например, children родителя только что созданного
+    вида деятельности) могли быть загружены до изменения. Документы
+    удалённых организаций удаляются.
+
+    Returns:
+        int: число записанных документов
+    """
+    organization_ids = list(organization_ids)
+    written = 0
+    for start in range(0, len(organization_ids), REFRESH_BATCH_SIZE):
+        chunk = organization_ids[start:start + REFRESH_BATCH_SIZE]
+        orgs = (
+            db.query(Organization)
+            .options(*organization_out_options())
+            .filter(Organization.id.in_(chunk))
+            .execution_options(populate_existing=True)
+            .all()
+        )
+        db.execute(delete(OrganizationDocument).where(OrganizationDocument.organization_id.in_(chunk)))
+        if orgs:
+            db.execute(insert(OrganizationDocument), [document_values(org) for org in orgs])
+        written += len(orgs)
+    return written
+
+def affected_organization_ids(db: Session, table: str, ids: list) -> list:
+    """
+    id организаций, документы которых зависят от изменённых строк таблицы table.
+
+    - organizations — сами организации;
+    - buildings — организации в этих зданиях;
+    - activities — организации, связанные с видом деятельности или с любым
+      его предком (поддерево предка входит в документ).
+    """
+    if table == "organizations":
+        return list(ids)
+    if table == "buildings":
+        query = select(Organization.id).where(Organization.building_id.in_(ids))
+    elif table == "activities":
+        ancestors = select(activity_closure.c.ancestor_id).where(activity_closure.c.descendant_id.in_(ids))
+        query = (
+            select(organization_activity.c.organization_id)
+            .where(organization_activity.c.activity_id.in_(ancestors))
+            .distinct()
+        )
+    else:
+        return []
+    return db.scalars(query).all()
+
+def refresh_changed_documents(db: Session, table: str, ids: list) -> int:
+    """
+    Пересобирает документы организаций, затронутых изменением строк таблицы table
+    (вызывается из app.crud.changes.log_changes в режимах write и read).
+
+    Returns:
+        int: число записанных документов
+    """
+    return refresh_documents(db, affected_organization_ids(db, table, ids))
+
+def rebuild_documents(db: Session, batch_size: int = REFRESH_BATCH_SIZE) -> int:
+    """
+    Заполняет таблицу organization_documents заново для всех организаций.
+
+    Каждая пачка (keyset по id) коммитится отдельно, в памяти остаётся не
+    больше одной пачки. Документы организаций, которых больше нет, удаляются.
+
+    Returns:
+        int: число записанных документов
+    """
+    db.execute(delete(OrganizationDocument).where(OrganizationDocument.organization_id.not_in(select(Organization.id))))
+    written, cursor = 0, 0
+    while True:
+        ids = db.scalars(
+            select(Organization.id).where(Organization.id > cursor).order_by(Organization.id).limit(batch_size)
+        ).all()
+        if not ids:
+            break
+        written += refresh_documents(db, ids)
+        db.commit()
+        db.expunge_all()
+        cursor = ids[-1]
+    db.commit()
+    return written
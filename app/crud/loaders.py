@@ -0,0 +1,71 @@
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from app.models.organizations import Organization
+from app.models.activity import Activity
+from app.schemas.organizations import OrganizationProjection
+
+"""
+Профили загрузки связей (loader options) для запросов к организациям.
+
+Каждый профиль соответствует форме ответа API и описывает, какие связи
+нужно подгрузить заранее, чтобы сериализация не вызывала ленивых запросов
+на каждую строку (проблема N+1).
+"""
+
+# Максимальная глубина вложенности видов деятельности (см. crud.activity.create_activity)
+ACTIVITY_MAX_LEVEL = 3
+
+
+def activity_tree_options(loader, depth: int = ACTIVITY_MAX_LEVEL):
+    """
+    Дополняет загрузчик видов деятельности цепочкой selectinload по полю `children` (ActivityOut).
+
+    Каждый уровень дерева загружается одним запросом `IN (...)`, поэтому число
+    запросов зависит только от глубины дерева, но не от количества строк.
+    У листьев тоже загружается (пустой) список `children`, иначе он будет
+    запрошен лениво при сериализации.
+
+    Args:
+        loader: загрузчик связи с Activity (например, selectinload(Organization.activities))
+        depth (int): число уровней `children`, которые нужно загрузить
+
+    Returns:
+        Load: опция загрузки для `Query.options()`
+    """
+    for _ in range(depth):
+        loader = loader.selectinload(Activity.children)
+    return loader
+
+
+def organization_out_options(projection: OrganizationProjection = None):
+    """
+    Профиль загрузки для схемы OrganizationOut.
+
+    - building — many-to-one, подгружается через JOIN в том же запросе;
+    - phones — отдельный запрос `IN (...)` по всем организациям выборки;
+    - activities — отдельный запрос, плюс по запросу на каждый уровень `children`.
+
+    Если указана проекция (выбор полей ответа), из таблицы организаций читаются
+    только нужные столбцы, а связи, которых нет в ответе, не загружаются.
+
+    Args:
+        projection (OrganizationProjection, optional): поля ответа (по умолчанию — все)
+
+    Returns:
+        list: опции для `Query.options()`
+    """
+    if projection is None:
+        return [
+            joinedload(Organization.building),
+            selectinload(Organization.phones),
+            activity_tree_options(selectinload(Organization.activities)),
+        ]
+    fields = projection.fields
+    options = [load_only(Organization.id, Organization.name) if "name" in fields else load_only(Organization.id)]
+    if "building" in fields:
+        options.append(joinedload(Organization.building))
+    if "phones" in fields:
+        options.append(selectinload(Organization.phones))
+    if "activities" in fields:
+        loader = selectinload(Organization.activities)
+        options.append(activity_tree_options(loader) if projection.activity_children else loader)
+    return options
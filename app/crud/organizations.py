@@ -1,9 +1,23 @@
+import os
 from sqlalchemy.orm import Session, joinedload,selectinload
 from app.models.organizations import Organization,OrganizationPhone, organization_activity
-from app.models.activity import Activity
+from app.models.activity import Activity, activity_closure
 from app.models.building import Building
-from app.schemas.organizations import OrganizationCreate
-from sqlalchemy import func
+from app.schemas.organizations import OrganizationCreate, OrganizationProjection
+from app.crud.loaders import organization_out_options
+from app.crud.pagination import keyset, split_page
+from app.crud.building import building_area_filter, nearest_search_radii
+from app.geo import box_area_km2, haversine_m, radius_bounding_box, box_lon_ranges
+from app.spatial_index import building_index
+from app.activity_cache import ACTIVITY_CACHE_ENABLED, activity_cache
+from app.response_cache import response_cache
+from app.suggest_index import suggest_index
+from app.crud.search import search_organization_ids
+from app.crud.activity import get_activities
+from app.crud.changes import log_changes
+from app.crud.documents import DOCUMENTS_READ
+from app.models.documents import OrganizationDocument
+from sqlalchemy import false, func, insert, select, union
 
 """
 Модуль CRUD-операций для работы с организациями.
@@ -12,96 +26,356 @@ from sqlalchemy import func
 по различным критериям: по зданию, деятельности, координатам и т.д.
 """
 
+# Максимальная площадь области поиска по радиусу и в прямоугольнике, км²
+MAX_SEARCH_AREA_KM2 = float(os.getenv("MAX_SEARCH_AREA_KM2", "100000"))
+
+def _activity_trees(db: Session, activity_ids: list) -> list:
+    """
+        Поддеревья видов деятельности для ответа OrganizationOut.
+
+        Берутся из кэша дерева (app.activity_cache) без обращения к БД; если кэш
+        выключен или ещё не видит вид деятельности, созданный другим воркером, —
+        из БД, по запросу на вид деятельности.
+    """
+    if ACTIVITY_CACHE_ENABLED:
+        snapshot = activity_cache.get(db)
+        if all(activity_id in snapshot.nodes for activity_id in activity_ids):
+            return [snapshot.nodes[activity_id] for activity_id in activity_ids]
+    return [get_activities(db, root_id=activity_id)[0] for activity_id in activity_ids]
+
 def create_organization(db: Session, org_in: OrganizationCreate):
     """
         Создаёт новую организацию в базе данных.
 
-        1. Добавляет запись об организации с указанным зданием.
-        2. Привязывает телефоны к организации.
-        3. Привязывает виды деятельности (если указаны ID).
+        1. Проверяет здание и виды деятельности одним запросом (здание LEFT JOIN
+           найденные виды деятельности); несуществующие id видов деятельности
+           пропускаются, как и в массовой загрузке.
+        2. Вставляет организацию через INSERT ... RETURNING, телефоны и связи
+           с видами деятельности — одним многострочным INSERT каждого вида;
+           записывает вставку в журнал изменений (app.crud.changes).
+        3. Добавляет название в индекс подсказок и сбрасывает кэш ответов, зависящих от организаций.
+        4. Собирает ответ из уже известных данных, без повторного чтения организации.
+
+        Raises:
+            ValueError: если здание не найдено
+
+        Returns:
+            dict: организация в форме OrganizationOut
     """
-    org = Organization(
-        name=org_in.name,
-        building_id=org_in.building_id,
-    )
-    # Телефоны
-    for phone in org_in.phones:
-        org.phones.append(OrganizationPhone(phone=phone.phone))
-    # Деятельность
-    if org_in.activity_ids:
-        activities = db.query(Activity).filter(Activity.id.in_(org_in.activity_ids)).all()
-        org.activities.extend(activities)
-    db.add(org)
+    requested = list(dict.fromkeys(org_in.activity_ids))
+    rows = db.execute(
+        select(Building.id, Building.address, Building.latitude, Building.longitude, Activity.id.label("activity_id"))
+        .outerjoin(Activity, Activity.id.in_(requested) if requested else false())
+        .where(Building.id == org_in.building_id)
+    ).all()
+    if not rows:
+        raise ValueError(f"Здание с id={org_in.building_id} не найдено")
+    # В порядке id — как их возвращают запросы чтения организаций
+    activity_ids = sorted({row.activity_id for row in rows if row.activity_id is not None})
+
+    org_id = db.execute(
+        insert(Organization).returning(Organization.id),
+        {"name": org_in.name, "building_id": org_in.building_id},
+    ).scalar_one()
+    phones = []
+    if org_in.phones:
+        # Без sort_by_parameter_order: иначе SQLite вставляет строки по одной; порядок восстанавливается по id
+        phones = sorted(db.execute(
+            insert(OrganizationPhone).returning(OrganizationPhone.id, OrganizationPhone.phone),
+            [{"organization_id": org_id, "phone": phone.phone} for phone in org_in.phones],
+        ).all())
+    if activity_ids:
+        db.execute(insert(organization_activity), [
+            {"organization_id": org_id, "activity_id": activity_id} for activity_id in activity_ids
+        ])
+    log_changes(db, "organizations", [org_id])
+    activities = _activity_trees(db, activity_ids)
     db.commit()
-    db.refresh(org)
-    return org
+    suggest_index.add_organizations([(org_id, org_in.name)])
+    response_cache.invalidate("organizations")
+    building = rows[0]
+    return {
+        "name": org_in.name,
+        "id": org_id,
+        "building": {"address": building.address, "latitude": building.latitude,
+                     "longitude": building.longitude, "id": building.id},
+        "phones": [{"phone": phone, "id": phone_id} for phone_id, phone in phones],
+        "activities": activities,
+    }
+
+def _organizations_query(db: Session, projection: OrganizationProjection = None):
+    """
+        Базовый запрос организаций с профилем загрузки связей для OrganizationOut
+        (или для выбранных полей ответа, если указана проекция).
+
+        Проекцию (параметры fields/expand эндпоинтов) принимают все функции
+        получения организаций ниже.
+
+        В режиме ORGANIZATION_DOCUMENTS=read выбираются готовые документы
+        (app.crud.documents) одним запросом: JOIN с organizations по первичному
+        ключу оставляет в силе все фильтры и сортировки по Organization ниже,
+        проекция применяется при сериализации.
+    """
+    if DOCUMENTS_READ:
+        return db.query(OrganizationDocument).join(Organization, Organization.id == OrganizationDocument.organization_id)
+    return db.query(Organization).options(*organization_out_options(projection))
 
-def get_organizations(db: Session):
+def _page(query, limit=None, cursor=None):
     """
-        Возвращает список всех организаций из базы данных.
+        Выполняет запрос организаций с курсорной пагинацией по id.
+
+        Returns:
+            tuple: (список организаций, курсор следующей страницы или None)
+    """
+    return split_page(keyset(query, Organization.id, limit, cursor).all(), limit)
+
+def get_organizations(db: Session, limit: int = None, cursor: int = None, projection: OrganizationProjection = None):
+    """
+        Возвращает список всех организаций из базы данных (постранично, если указан limit).
+    """
+    return _page(_organizations_query(db, projection), limit, cursor)
+
+def iter_organizations(db: Session, batch_size: int, projection: OrganizationProjection = None):
+    """
+        Итерирует по всем организациям, читая их из серверного курсора пачками по batch_size.
     """
-    return db.query(Organization).all()
+    return _organizations_query(db, projection).order_by(Organization.id).yield_per(batch_size)
 
-def get_organizations_by_building(db:Session,building_id:int):
+def get_organizations_by_building(db:Session,building_id:int, limit: int = None, cursor: int = None, projection: OrganizationProjection = None):
     """
         Возвращает все организации, находящиеся в указанном здании.
     """
-    return db.query(Organization).filter(Organization.building_id == building_id).all()
+    return _page(_organizations_query(db, projection).filter(Organization.building_id == building_id), limit, cursor)
 
-def get_organizations_by_name_activites(db:Session,activity_name:str):
+def get_organizations_by_name_activites(db:Session,activity_name:str, limit: int = None, cursor: int = None, projection: OrganizationProjection = None):
     """
         Возвращает все организации, которые занимаются указанным видом деятельности.
+
+        id организаций выбираются подзапросом по индексам activities.name и
+        organization_activity.activity_id (EXISTS через .any() проверял бы
+        каждую организацию таблицы).
+    """
+    organization_ids = (
+        select(organization_activity.c.organization_id)
+        .join(Activity, Activity.id == organization_activity.c.activity_id)
+        .where(Activity.name == activity_name)
+    )
+    return _page(_organizations_query(db, projection).filter(Organization.id.in_(organization_ids)), limit, cursor)
+
+def get_organizations_by_coordinates(db:Session,latitude:float,longitude:float, limit: int = None, cursor: int = None, projection: OrganizationProjection = None):
+    """
+        Возвращает все организации, находящиеся в здании по заданным координатам
+        (по индексу ix_buildings_latitude_longitude).
+    """
+    query = (
+        _organizations_query(db, projection)
+        .join(Organization.building)
+        .filter(Building.latitude == latitude, Building.longitude == longitude)
+    )
+    return _page(query, limit, cursor)
+
+def _organizations_by_distance(db: Session, area_filter, latitude: float, longitude: float,
+                               radius_m: float, limit: int, offset: int = 0,
+                               projection: OrganizationProjection = None):
+    """
+        Ищет организации в области и сортирует их по расстоянию от точки.
+
+        1. Одним запросом по индексу geo_cell выбирает здания области с числом
+           организаций в каждом — строку на здание, а не на организацию.
+        2. Считает точное расстояние до зданий (гаверсинус), отбрасывает здания
+           вне радиуса и сортирует остальные; общее количество найденных
+           организаций — сумма по зданиям.
+        3. Загружает полные данные организаций только из зданий, на которые
+           приходится запрошенная страница (здания на том же расстоянии, что и
+           её первая и последняя организация, — целиком), и упорядочивает их
+           по расстоянию и id.
+
+        Расстояние записывается в атрибут `distance` каждой организации (для OrganizationGeoOut).
+
+        Returns:
+            tuple: (список организаций страницы, общее количество найденных организаций)
+    """
+    # Число организаций — подзапросом по индексу organizations.building_id: с GROUP BY
+    # SQLite обходит buildings по первичному ключу целиком вместо индекса geo_cell
+    organization_count = (
+        select(func.count()).where(Organization.building_id == Building.id).correlate(Building).scalar_subquery()
+    )
+    rows = db.query(Building.id, Building.latitude, Building.longitude, organization_count).filter(area_filter).all()
+    buildings = []
+    for building_id, lat, lon, count in rows:
+        distance = haversine_m(latitude, longitude, lat, lon)
+        if count and (radius_m is None or distance <= radius_m):
+            buildings.append((distance, building_id, count))
+    buildings.sort()
+    total = sum(count for _, _, count in buildings)
+    end = min(offset + limit, total)
+    if offset >= end:
+        return [], total
+
+    # Расстояния первой и последней организации страницы
+    seen, first, last = 0, None, None
+    for distance, _, count in buildings:
+        seen += count
+        if first is None and seen > offset:
+            first = distance
+        if seen >= end:
+            last = distance
+            break
+    skipped = sum(count for distance, _, count in buildings if distance < first)
+    distances = {building_id: distance for distance, building_id, _ in buildings if first <= distance <= last}
+    orgs = _organizations_query(db, projection).filter(Organization.building_id.in_(distances)).all()
+    for org in orgs:
+        org.distance = distances[org.building_id]
+    orgs.sort(key=lambda org: (org.distance, org.id))
+    return orgs[offset - skipped:end - skipped], total
+
+def _check_search_area(min_lat: float, max_lat: float, lon_ranges):
+    area = box_area_km2(min_lat, max_lat, lon_ranges)
+    if area > MAX_SEARCH_AREA_KM2:
+        raise ValueError(f"Область поиска слишком велика: {area:.0f} км², допустимо не больше {MAX_SEARCH_AREA_KM2:.0f} км²")
+
+def _organizations_in_radius(db: Session, latitude: float, longitude: float, radius_m: float, limit: int,
+                             offset: int = 0, projection: OrganizationProjection = None, check_area: bool = True):
+    min_lat, max_lat, lon_ranges = radius_bounding_box(latitude, longitude, radius_m)
+    if check_area:
+        _check_search_area(min_lat, max_lat, lon_ranges)
+    return _organizations_by_distance(db, building_area_filter(min_lat, max_lat, lon_ranges),
+                                      latitude, longitude, radius_m, limit, offset, projection)
+
+def get_organizations_in_radius(db: Session, latitude: float, longitude: float, radius_m: float,
+                                limit: int, offset: int = 0, projection: OrganizationProjection = None):
     """
-    return db.query(Organization).join(Organization.activities).filter(Activity.name == activity_name).all()
+        Возвращает организации в радиусе radius_m метров от точки, ближайшие — первыми.
 
-def get_organizations_by_coordinates(db:Session,latitude:float,longitude:float):
+        Raises:
+            ValueError: если описанный вокруг круга прямоугольник больше MAX_SEARCH_AREA_KM2
     """
-        Возвращает все организации, находящиеся в здании по заданным координатам.
+    return _organizations_in_radius(db, latitude, longitude, radius_m, limit, offset, projection)
+
+def get_organizations_in_box(db: Session, min_lat: float, max_lat: float, min_lon: float, max_lon: float,
+                             limit: int, offset: int = 0, projection: OrganizationProjection = None):
+    """
+        Возвращает организации внутри прямоугольной области, отсортированные
+        по расстоянию от её центра.
+
+        Если min_lon > max_lon, область пересекает 180-й меридиан.
+
+        Raises:
+            ValueError: если min_lat больше max_lat или площадь области больше MAX_SEARCH_AREA_KM2
     """
-    return db.query(Organization).join(Organization.building).filter(Building.latitude == latitude and Building.longitude == longitude).all()
+    if min_lat > max_lat:
+        raise ValueError("Минимальная широта не может быть больше максимальной")
+    lon_ranges = box_lon_ranges(min_lon, max_lon)
+    _check_search_area(min_lat, max_lat, lon_ranges)
+    center_lat = (min_lat + max_lat) / 2
+    center_lon = (min_lon + max_lon) / 2 if min_lon <= max_lon else (min_lon + max_lon + 360) / 2
+    if center_lon > 180:
+        center_lon -= 360
+    return _organizations_by_distance(db, building_area_filter(min_lat, max_lat, lon_ranges),
+                                      center_lat, center_lon, None, limit, offset, projection)
 
-def get_organization_by_id(db: Session,organization_id:int):
+def get_organization_by_id(db: Session,organization_id:int, projection: OrganizationProjection = None):
     """
         Возвращает одну организацию по её идентификатору.
     """
-    return db.query(Organization).filter(Organization.id == organization_id).first()
+    return _organizations_query(db, projection).filter(Organization.id == organization_id).first()
+
+def get_organization_by_name(db: Session,organization_name:str, projection: OrganizationProjection = None):
+    return _organizations_query(db, projection).filter(Organization.name == organization_name).first()
 
-def get_organization_by_name(db: Session,organization_name:str):
-    return db.query(Organization).filter(Organization.name == organization_name).first()
 
+def search_organizations(db: Session, query: str, limit: int = 20, offset: int = 0, projection: OrganizationProjection = None):
+    """
+        Ищет организации по названию: по префиксу, подстроке и с опечатками
+        (см. app.crud.search), самые релевантные — первыми.
 
-def get_organizations_by_activity_name(db: Session, activity_name: str):
+        Returns:
+            tuple: (список организаций страницы, общее количество найденных организаций)
+    """
+    found = search_organization_ids(db, query)
+    page = [org_id for _, org_id in found[offset:offset + limit]]
+    if not page:
+        return [], len(found)
+    orgs = {org.id: org for org in _organizations_query(db, projection).filter(Organization.id.in_(page)).all()}
+    return [orgs[org_id] for org_id in page], len(found)
+
+def get_organizations_by_activity_name(db: Session, activity_name: str, limit: int = None, cursor: int = None,
+                                       projection: OrganizationProjection = None):
     """
         Возвращает все организации, связанные с указанной деятельностью,
         включая родительские и дочерние виды.
 
         Логика:
         1. Находит активность по названию (без учёта регистра).
-        2. Рекурсивно собирает все связанные ID — родителей и потомков.
+        2. Собирает id её потомков и предков — из кэша дерева видов деятельности
+           (app.activity_cache) или, если кэш выключен, по таблице замыкания activity_closure
+           прямо в запросе.
         3. Возвращает все организации, у которых есть эти виды деятельности.
     """
-    activity = db.query(Activity).filter(func.lower(Activity.name) == activity_name.lower()).first()
-    if not activity:
-        return []
+    if ACTIVITY_CACHE_ENABLED:
+        snapshot = activity_cache.get(db)
+        activity_id = snapshot.find(activity_name)
+        if activity_id is None:
+            return [], None
+        related = snapshot.related_ids(activity_id)
+    else:
+        target = (
+            select(Activity.id)
+            .where(func.lower(Activity.name) == activity_name.lower())
+            .order_by(Activity.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        related = union(
+            select(activity_closure.c.descendant_id).where(activity_closure.c.ancestor_id == target),
+            select(activity_closure.c.ancestor_id).where(activity_closure.c.descendant_id == target),
+        )
+    org_ids = select(organization_activity.c.organization_id).where(organization_activity.c.activity_id.in_(related))
+    return _page(_organizations_query(db, projection).filter(Organization.id.in_(org_ids)), limit, cursor)
 
-    # рекурсивный сбор id всех детей
-    def collect_children(act):
-        ids = [act.id]
-        for child in getattr(act, "children", []):
-            ids.extend(collect_children(child))
-        return ids
-
-    # рекурсивный сбор id всех родителей
-    def collect_parents(act):
-        if getattr(act, "parent", None):
-            return [act.parent.id] + collect_parents(act.parent)
-        return []
+def get_nearest_organizations(db: Session, latitude: float, longitude: float, limit: int, radius_m: float = None,
+                              projection: OrganizationProjection = None):
+    """
+        Возвращает limit ближайших к точке организаций (ближайшие — первыми).
 
-    ids = set(collect_children(activity) + collect_parents(activity))
+        Если загружен in-memory индекс зданий, ближайшие здания берутся из него,
+        а из БД читаются только организации в этих зданиях. Иначе радиус поиска
+        по индексу geo_cell расширяется, пока не найдётся достаточно организаций.
 
-    return (
-        db.query(Organization)
-        .join(Organization.activities)
-        .filter(Activity.id.in_(ids))
-        .all()
-    )
+        Args:
+            radius_m (float, optional): максимальное расстояние, метры
+
+        Returns:
+            list: организации с атрибутом `distance` (для OrganizationGeoOut)
+    """
+    building_index.refresh(db)
+    if not building_index.ready:
+        for radius in nearest_search_radii(radius_m):
+            # Радиус растёт, пока не наберётся limit организаций: площадь не ограничивается
+            orgs, total = _organizations_in_radius(db, latitude, longitude, radius, limit, projection=projection,
+                                                   check_area=False)
+            if total >= limit:
+                break
+        return orgs
+
+    # Здания могут быть пустыми, поэтому число запрашиваемых зданий растёт,
+    # пока организаций не наберётся достаточно (или здания не закончатся)
+    k = limit
+    while True:
+        buildings = building_index.nearest(latitude, longitude, k, radius_m)
+        distances = {building_id: distance for distance, building_id in buildings}
+        rows = db.query(Organization.id, Organization.building_id).filter(Organization.building_id.in_(distances)).all()
+        if len(rows) >= limit or len(buildings) < k:
+            break
+        k *= 4
+
+    page = sorted((distances[building_id], org_id) for org_id, building_id in rows)[:limit]
+    if not page:
+        return []
+    orgs = {org.id: org for org in _organizations_query(db, projection).filter(Organization.id.in_([org_id for _, org_id in page])).all()}
+    result = []
+    for distance, org_id in page:
+        org = orgs[org_id]
+        org.distance = distance
+        result.append(org)
+    return result
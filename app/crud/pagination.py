@@ -0,0 +1,42 @@
+"""
+Вспомогательные функции для курсорной (keyset) пагинации.
+
+Курсор — это значение ключа (id) последней записи предыдущей страницы.
+Следующая страница выбирается условием `id > cursor` с сортировкой по id,
+поэтому стоимость запроса не зависит от того, насколько далеко клиент пролистал список.
+"""
+
+def keyset(query, column, limit=None, cursor=None):
+    """
+    Применяет к запросу условие курсора, сортировку и лимит.
+
+    Запрашивается на одну строку больше, чем `limit`, чтобы без отдельного
+    COUNT определить, есть ли следующая страница.
+
+    Args:
+        query (Query): исходный запрос
+        column: колонка-ключ пагинации (обычно Model.id)
+        limit (int, optional): размер страницы; если не указан — возвращаются все записи
+        cursor (int, optional): значение ключа последней записи предыдущей страницы
+
+    Returns:
+        Query: запрос с применённой пагинацией
+    """
+    if cursor is not None:
+        query = query.filter(column > cursor)
+    query = query.order_by(column)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query
+
+def split_page(items, limit=None):
+    """
+    Отрезает лишнюю строку, запрошенную keyset(), и вычисляет курсор следующей страницы.
+
+    Returns:
+        tuple: (список записей страницы, курсор следующей страницы или None)
+    """
+    if limit is None or len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, items[-1].id
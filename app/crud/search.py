@@ -0,0 +1,189 @@
+import re
+from sqlalchemy import func, literal, literal_column, or_, select, text
+from sqlalchemy.orm import Session
+from app.models.organizations import Organization
+
+"""
+Полнотекстовый и нечёткий поиск организаций по названию.
+
+Поиск идёт в два шага:
+1. Кандидаты выбираются по индексу:
+   - PostgreSQL — GIN-индексы pg_trgm по lower(name) (подстрока, опечатки)
+     и tsvector по name (слова запроса в любом порядке, по префиксу);
+   - SQLite — виртуальная таблица FTS5 с токенизатором trigram.
+   Сначала ищутся «строгие» совпадения (все слова запроса как подстроки),
+   и только если их меньше SEARCH_CANDIDATES — похожие по триграммам (опечатки).
+2. Кандидаты ранжируются по relevance() одинаково для обеих СУБД:
+   точное совпадение > префикс > подстрока > похожие слова.
+
+Количество кандидатов ограничено SEARCH_CANDIDATES (для каждого шага), поэтому
+для очень общих запросов в выдачу попадают только лучшие из них.
+"""
+
+# Максимальное количество кандидатов, выбираемых из БД на каждом шаге
+SEARCH_CANDIDATES = 500
+
+# Минимальная релевантность похожих (не содержащих запрос) названий
+MIN_FUZZY_RELEVANCE = 0.3
+
+# Порог word_similarity pg_trgm для поиска с опечатками (оператор <%)
+PG_WORD_SIMILARITY_THRESHOLD = 0.4
+
+SQLITE_FTS_TABLE = "organizations_fts"
+
+_SQLITE_FTS_STATEMENTS = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} "
+    "USING fts5(name, content='organizations', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ai AFTER INSERT ON organizations BEGIN "
+    f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ad AFTER DELETE ON organizations BEGIN "
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_au AFTER UPDATE OF name ON organizations BEGIN "
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name); "
+    f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END",
+]
+
+_PG_STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_organizations_name_trgm ON organizations USING gin (lower(name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_organizations_name_tsv ON organizations USING gin (to_tsvector('simple'::regconfig, name))",
+]
+
+
+def ensure_search_index(connection):
+    """
+    Создаёт индексы поиска, если их ещё нет.
+
+    В PostgreSQL их создаёт миграция; для SQLite (разработка, бенчмарки)
+    таблица FTS5 с триггерами создаётся при старте приложения и при
+    необходимости заполняется по существующим организациям.
+    """
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        for statement in _PG_STATEMENTS:
+            connection.execute(text(statement))
+    elif dialect == "sqlite":
+        # Триггеры удаляются вместе с таблицей organizations: если их нет, индекс
+        # создаётся впервые или отстал от пересозданной таблицы и перестраивается
+        synced = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name"),
+            {"name": f"{SQLITE_FTS_TABLE}_ai"},
+        ).first()
+        for statement in _SQLITE_FTS_STATEMENTS:
+            connection.execute(text(statement))
+        if not synced:
+            connection.execute(text(f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def normalize(value: str) -> str:
+    """Приводит строку к виду для сравнения: нижний регистр, одиночные пробелы."""
+    return " ".join(value.casefold().split())
+
+
+def _trigrams(word: str) -> set:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a: str, b: str) -> float:
+    """Триграммное сходство двух слов (как similarity() в pg_trgm): от 0 до 1."""
+    ta, tb = _trigrams(a), _trigrams(b)
+    return len(ta & tb) / len(ta | tb) if ta and tb else 0.0
+
+
+def relevance(query: str, name: str) -> float:
+    """
+    Релевантность названия запросу (оба — после normalize).
+
+    Целая часть: 4 — точное совпадение, 3 — название начинается с запроса,
+    2.5 — с запроса начинается одно из слов, 2 — запрос входит в название,
+    1.5 — все слова запроса входят в название в другом порядке.
+    Дробная часть — среднее по словам запроса сходство с ближайшим словом названия.
+    """
+    if name == query:
+        return 4.0
+    words = name.split()
+    if name.startswith(query):
+        score = 3.0
+    elif any(word.startswith(query) for word in words):
+        score = 2.5
+    elif query in name:
+        score = 2.0
+    else:
+        score = 0.0
+    query_words = query.split()
+    if not score and all(any(q in w for w in words) for q in query_words):
+        score = 1.5
+    fuzzy = sum(max((similarity(q, w) for w in words), default=0.0) for q in query_words) / len(query_words)
+    return score + min(fuzzy, 0.99)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _pg_candidates(db: Session, query: str, tokens: list, fuzzy: bool):
+    name = func.lower(Organization.name)
+    if not fuzzy:
+        tsvector = func.to_tsvector(literal_column("'simple'::regconfig"), Organization.name)
+        tsquery = func.to_tsquery(literal_column("'simple'::regconfig"), " & ".join(f"{t}:*" for t in tokens))
+        condition = or_(name.like(f"%{_escape_like(query)}%", escape="\\"), tsvector.op("@@")(tsquery))
+        # Сначала названия, начинающиеся с запроса, затем более короткие
+        order = (~name.like(f"{_escape_like(query)}%", escape="\\"), func.length(Organization.name))
+    else:
+        # Порог оператора <% задаётся на время транзакции
+        db.execute(select(func.set_config("pg_trgm.word_similarity_threshold", str(PG_WORD_SIMILARITY_THRESHOLD), True)))
+        condition = literal(query).op("<%")(name)
+        order = (func.word_similarity(literal(query), name).desc(),)
+    return db.execute(
+        select(Organization.id, Organization.name).where(condition).order_by(*order).limit(SEARCH_CANDIDATES)
+    ).all()
+
+
+def _sqlite_candidates(db: Session, query: str, tokens: list, fuzzy: bool):
+    if not fuzzy:
+        if any(len(t) < 3 for t in tokens):
+            # Триграммный индекс не находит подстроки короче трёх символов
+            return db.execute(
+                select(Organization.id, Organization.name)
+                .where(Organization.name.like(f"%{_escape_like(query)}%", escape="\\"))
+                .limit(SEARCH_CANDIDATES)
+            ).all()
+        match = " AND ".join('"' + t.replace('"', '""') + '"' for t in tokens)
+    else:
+        # Каждое слово запроса должно совпасть с названием хотя бы одной своей триграммой
+        groups = [sorted({t[i:i + 3] for i in range(len(t) - 2)}) for t in tokens if len(t) >= 3]
+        if not groups:
+            return []
+        match = " AND ".join("(" + " OR ".join('"' + g.replace('"', '""') + '"' for g in grams) + ")" for grams in groups)
+    return db.execute(
+        text(
+            f"SELECT o.id, o.name FROM {SQLITE_FTS_TABLE} f JOIN organizations o ON o.id = f.rowid "
+            f"WHERE {SQLITE_FTS_TABLE} MATCH :match ORDER BY f.rank LIMIT :limit"
+        ),
+        {"match": match, "limit": SEARCH_CANDIDATES},
+    ).all()
+
+
+def search_organization_ids(db: Session, query: str):
+    """
+    Находит и ранжирует организации по названию.
+
+    Returns:
+        list: пары (релевантность, id организации), самые релевантные — первыми
+    """
+    query = normalize(query)
+    tokens = re.findall(r"\w+", query)
+    if not tokens:
+        return []
+    candidates_fn = _pg_candidates if db.get_bind().dialect.name == "postgresql" else _sqlite_candidates
+    candidates = dict(candidates_fn(db, query, tokens, fuzzy=False))
+    if len(candidates) < SEARCH_CANDIDATES:
+        candidates.update(candidates_fn(db, query, tokens, fuzzy=True))
+    scored = []
+    for org_id, name in candidates.items():
+        score = relevance(query, normalize(name))
+        if score >= MIN_FUZZY_RELEVANCE:
+            scored.append((score, org_id))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return scored
@@ -0,0 +1,58 @@
+from collections import defaultdict
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+from app.models.versions import TableVersion
+
+"""
+Модуль CRUD-операций для счётчиков версий данных (таблица table_versions).
+
+Помимо счётчика в БД ведётся локальный счётчик изменений текущего процесса:
+он увеличивается сразу после коммита транзакции, поэтому кэши этого процесса
+видят собственные изменения без ожидания следующей проверки версии в БД.
+"""
+
+_local_changes = defaultdict(int)
+
+def bump_version(db: Session, name: str):
+    """
+    Увеличивает версию набора данных name в текущей транзакции.
+
+    Args:
+        db (Session): активная сессия SQLAlchemy (коммит выполняет вызывающий код)
+        name (str): имя набора данных, например "activities"
+    """
+    result = db.execute(
+        update(TableVersion).where(TableVersion.name == name).values(version=TableVersion.version + 1, updated_at=func.now())
+    )
+    if result.rowcount == 0:
+        db.add(TableVersion(name=name, version=1))
+
+    def committed(session):
+        _local_changes[name] += 1
+
+    event.listen(db, "after_commit", committed, once=True)
+
+def get_version(db: Session, name: str) -> int:
+    """
+    Возвращает текущую версию набора данных name (0, если изменений ещё не было).
+    """
+    version = db.query(TableVersion.version).filter(TableVersion.name == name).scalar()
+    return version or 0
+
+def get_versions(db: Session, names) -> dict:
+    """
+    Возвращает версии и время последнего изменения наборов данных names одним запросом.
+
+    Returns:
+        dict: имя -> (версия, время изменения); наборов без изменений в словаре нет
+    """
+    rows = db.execute(
+        select(TableVersion.name, TableVersion.version, TableVersion.updated_at).where(TableVersion.name.in_(names))
+    ).all()
+    return {name: (version, updated_at) for name, version, updated_at in rows}
+
+def local_changes(name: str) -> int:
+    """
+    Возвращает количество закоммиченных этим процессом изменений набора данных name.
+    """
+    return _local_changes[name]
@@ -1,12 +1,105 @@
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 import os
 from dotenv import load_dotenv
+from app.db_pool import InstrumentedQueuePool, InstrumentedAsyncQueuePool
+from app import query_stats
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Режим работы с БД: sync — синхронные сессии (эндпоинты выполняют запросы в пуле потоков),
+# async — AsyncEngine и асинхронные сессии (asyncpg / aiosqlite)
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+
+# Асинхронные драйверы, подставляемые вместо синхронных, если ASYNC_DATABASE_URL не задан
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def make_async_url(url: str) -> str:
+    """Переводит URL синхронного драйвера в URL асинхронного (postgresql+psycopg2 -> postgresql+asyncpg)."""
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+# Настройки пула соединений (одинаковы для основной БД и реплики)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Сколько секунд ждать свободного соединения до ошибки QueuePool timeout
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Через сколько секунд переоткрывать соединение (-1 — никогда)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Проверять соединение перед выдачей (защита от разрывов со стороны сервера БД)
+DB_POOL_PRE_PING = _env_flag("DB_POOL_PRE_PING", "true")
+
+# Необязательная реплика для чтения: на неё идут GET-эндпоинты (см. dependencies.get_read_db)
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """
+    Параметры пула для create_engine / create_async_engine.
+
+    SQLite в памяти работает без очереди соединений, для неё настройки пула не применяются.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(bind=engine,autoflush=False,autocommit=False)
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+read_engine = engine
+if DATABASE_REPLICA_URL:
+    read_engine = create_engine(DATABASE_REPLICA_URL, **engine_options(DATABASE_REPLICA_URL))
+ReadSessionLocal = sessionmaker(bind=read_engine,autoflush=False,autocommit=False)
+
+# Синхронный движок нужен и в async-режиме: его используют потоковая выгрузка,
+# загрузка in-memory индексов при старте и миграции
+async_engine = None
+AsyncSessionLocal = None
+async_read_engine = None
+AsyncReadSessionLocal = None
+if DB_MODE == "async":
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or make_async_url(DATABASE_URL)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True))
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    async_read_engine = async_engine
+    if DATABASE_REPLICA_URL:
+        ASYNC_DATABASE_REPLICA_URL = os.getenv("ASYNC_DATABASE_REPLICA_URL") or make_async_url(DATABASE_REPLICA_URL)
+        async_read_engine = create_async_engine(
+            ASYNC_DATABASE_REPLICA_URL, **engine_options(ASYNC_DATABASE_REPLICA_URL, is_async=True)
+        )
+    AsyncReadSessionLocal = async_sessionmaker(bind=async_read_engine, autoflush=False, expire_on_commit=False)
+
+def engines() -> dict:
+    """Все созданные движки по именам (для метрик пулов): primary, replica, async_primary, async_replica."""
+    result = {"primary": engine}
+    if read_engine is not engine:
+        result["replica"] = read_engine
+    if async_engine is not None:
+        result["async_primary"] = async_engine.sync_engine
+        if async_read_engine is not async_engine:
+            result["async_replica"] = async_read_engine.sync_engine
+    return result
+
+# Статистика запросов по отпечаткам и журнал медленных запросов (GET /metrics/queries)
+for _engine in engines().values():
+    query_stats.install(_engine)
+
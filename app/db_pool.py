@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+"""
+Инструментированные пулы соединений.
+
+Пул считает, сколько раз из него брали соединение, сколько времени это
+заняло (ожидание свободного соединения, открытие нового и pre-ping) и сколько
+раз ожидание закончилось ошибкой QueuePool timeout. Вместе с текущим
+состоянием пула (занято, свободно, overflow) эти данные отдаются на
+GET /metrics/pool и позволяют подобрать DB_POOL_SIZE / DB_MAX_OVERFLOW
+по реальной нагрузке.
+
+Счётчики живут в объекте пула: после engine.dispose() (пересоздания пула)
+они начинаются заново.
+
+Также считается пул потоков, в котором выполняются CRUD-функции в
+DB_MODE=sync (app.metrics.run_in_request_thread): ожидание — время от
+постановки вызова в очередь до начала его выполнения в потоке. Максимум
+одновременно занятых соединений или потоков (busy_max), достигший размера
+пула, показывает, что пул ограничивает пропускную способность
+(см. benchmarks.loadtest).
+"""
+
+# Размер пула потоков anyio (0 — значение по умолчанию, 40)
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "0"))
+
+
+class PoolStats:
+    """Счётчики выдачи соединений из пула."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        # Максимум одновременно выданных соединений (потоков)
+        self.busy_max = 0
+
+    def record(self, wait: float, timed_out: bool = False, busy: int = 0):
+        with self._lock:
+            self.busy_max = max(self.busy_max, busy)
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_total_ms": round(self.wait_total * 1000, 3),
+                "wait_avg_ms": round(self.wait_total * 1000 / attempts, 3) if attempts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "busy_max": self.busy_max,
+            }
+
+
+class ThreadpoolStats(PoolStats):
+    """Счётчики пула потоков: выдачи потока, ожидание, размер и максимум занятых потоков."""
+
+    def __init__(self):
+        super().__init__()
+        self.size = None
+
+    def observe(self, limiter):
+        """Запоминает размер и занятость CapacityLimiter пула потоков (вызывается из event loop)."""
+        with self._lock:
+            self.size = limiter.total_tokens
+            self.busy_max = max(self.busy_max, limiter.borrowed_tokens)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            status = {"pool": "threadpool", "size": self.size}
+        status.update(super().snapshot())
+        return status
+
+
+# Общие счётчики пула потоков процесса
+threadpool_stats = ThreadpoolStats()
+
+
+class _InstrumentedPoolMixin:
+    def __init__(self, *args, max_overflow: int = 10, **kwargs):
+        super().__init__(*args, max_overflow=max_overflow, **kwargs)
+        self.max_overflow = max_overflow
+        self.stats = PoolStats()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start, busy=self.checkedout())
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    """QueuePool со счётчиками PoolStats (для синхронных движков)."""
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool со счётчиками PoolStats (для AsyncEngine)."""
+
+
+def pool_status(pool) -> dict:
+    """
+    Текущее состояние пула и накопленные счётчики.
+
+    Для пулов без очереди (например, SQLite в памяти) возвращается только имя класса.
+    """
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(0, pool.overflow()),
+            timeout=pool.timeout(),
+        )
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update(max_overflow=pool.max_overflow, **stats.snapshot())
+    return status
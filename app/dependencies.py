@@ -1,8 +1,122 @@
-from app.database import SessionLocal
+import hmac
+import os
+from typing import Optional
+from fastapi import Header, HTTPException, Query, Response, status
+from app.crud.bulk import BULK_MAX_ROWS
+from app.schemas.organizations import ORGANIZATION_FIELDS, EXPAND_ACTIVITY_CHILDREN, OrganizationProjection
+from app.database import SessionLocal, AsyncSessionLocal, ReadSessionLocal, AsyncReadSessionLocal, DB_MODE
 
-def get_db():
+# Максимальный размер страницы для списочных эндпоинтов
+MAX_PAGE_SIZE = 1000
+
+# Токен эндпоинтов мониторинга (/metrics...): без него они не подключаются (см. app.main)
+MONITORING_TOKEN = os.getenv("MONITORING_TOKEN", "")
+
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Сессия БД для эндпоинтов: Session или AsyncSession в зависимости от DB_MODE.
+# Функции CRUD вызываются через app.crud.aio, которые работают с обоими типами.
+get_db = get_async_db if DB_MODE == "async" else get_sync_db
+
+def get_sync_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+# Сессия только для чтения (GET-эндпоинты): реплика, если задан DATABASE_REPLICA_URL,
+# иначе та же основная БД. Запись всегда идёт через get_db.
+get_read_db = get_async_read_db if DB_MODE == "async" else get_sync_read_db
+
+def require_monitoring_token(authorization: Optional[str] = Header(None, include_in_schema=False)):
+    """
+    Пропускает запрос к эндпоинтам мониторинга только с заголовком
+    `Authorization: Bearer <MONITORING_TOKEN>`: они раскрывают тексты SQL-запросов,
+    состояние пулов и кэша, а DELETE /metrics/queries сбрасывает статистику.
+    """
+    expected = f"Bearer {MONITORING_TOKEN}"
+    if not MONITORING_TOKEN or not hmac.compare_digest((authorization or "").encode(), expected.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Требуется токен мониторинга",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+class PageParams:
+    """
+    Параметры курсорной пагинации списочных эндпоинтов.
+
+    Если `limit` не указан, возвращается полный список (как и раньше).
+    Курсор следующей страницы передаётся в заголовке ответа `X-Next-Cursor`.
+    """
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+        cursor: Optional[int] = Query(None, ge=0, description="Курсор: значение `X-Next-Cursor` из предыдущего ответа"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+def set_next_cursor(response: Response, next_cursor: Optional[int]):
+    """Передаёт курсор следующей страницы в заголовке `X-Next-Cursor` (если она есть)."""
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+
+def check_bulk_size(rows: list):
+    """Отклоняет запрос массовой загрузки, если в нём больше BULK_MAX_ROWS строк."""
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Слишком много строк: {len(rows)}, максимум {BULK_MAX_ROWS}. Разбейте загрузку на части или используйте python -m app.importer"
+        )
+
+def _split_list(value: Optional[str]) -> list:
+    return [item.strip() for item in value.split(",") if item.strip()] if value else []
+
+def get_organization_projection(
+    fields: Optional[str] = Query(
+        None,
+        description="Поля организации через запятую: " + ", ".join(ORGANIZATION_FIELDS) + " (id выводится всегда)",
+    ),
+    expand: Optional[str] = Query(
+        None,
+        description=f"Вложенные данные через запятую: `{EXPAND_ACTIVITY_CHILDREN}` — дерево children у видов деятельности",
+    ),
+) -> Optional[OrganizationProjection]:
+    """
+    Выбор полей ответа эндпоинтов организаций.
+
+    Без fields и expand возвращается полный OrganizationOut (None — проекции нет).
+    Иначе в ответе только поля из fields (по умолчанию — все) и id, а дерево
+    children у видов деятельности — только если оно указано в expand.
+    """
+    if fields is None and expand is None:
+        return None
+    requested = set(_split_list(fields)) if fields is not None else set(ORGANIZATION_FIELDS)
+    expanded = set(_split_list(expand))
+    unknown = sorted((requested - set(ORGANIZATION_FIELDS)) | (expanded - {EXPAND_ACTIVITY_CHILDREN}))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Неизвестные поля: {', '.join(unknown)}"
+        )
+    requested.add("id")
+    return OrganizationProjection(
+        fields=tuple(name for name in ORGANIZATION_FIELDS if name in requested),
+        activity_children=EXPAND_ACTIVITY_CHILDREN in expanded,
+    )
+
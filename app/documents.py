@@ -0,0 +1,34 @@
+import argparse
+import sys
+import time
+
+from app.database import SessionLocal
+from app.models import building, activity  # noqa: F401 — регистрация моделей
+from app.crud.documents import REFRESH_BATCH_SIZE, rebuild_documents
+
+"""
+Пересборка денормализованной таблицы organization_documents (см. app.crud.documents).
+
+    python -m app.documents
+    python -m app.documents --batch-size 5000
+
+Нужна перед включением ORGANIZATION_DOCUMENTS=write/read на существующих
+данных (миграция создаёт пустую таблицу) и для восстановления документов,
+если справочник менялся в обход приложения.
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пересборка таблицы organization_documents")
+    parser.add_argument("--batch-size", type=int, default=REFRESH_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        written = rebuild_documents(db, args.batch_size)
+    print(f"organization_documents: записано {written}, {time.perf_counter() - start:.1f} с", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
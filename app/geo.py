@@ -0,0 +1,118 @@
+import math
+
+"""
+Геометрические утилиты для поиска по карте.
+
+Для индексации координат без PostGIS поверхность делится на сетку ячеек
+размером GEO_CELL_SIZE_DEG × GEO_CELL_SIZE_DEG градусов. Номер ячейки хранится
+в колонке `buildings.geo_cell` с B-tree индексом: ячейки одной «строки» сетки
+(одной полосы широты) идут подряд, поэтому прямоугольная область на карте
+превращается в небольшой набор диапазонов `geo_cell BETWEEN a AND b`.
+Точное расстояние затем уточняется по формуле гаверсинуса.
+"""
+
+# Средний радиус Земли, метры
+EARTH_RADIUS_M = 6371008.8
+
+# Размер ячейки сетки в градусах (~1.1 км по широте)
+GEO_CELL_SIZE_DEG = 0.01
+GEO_CELL_COLUMNS = int(round(360 / GEO_CELL_SIZE_DEG))
+GEO_CELL_ROWS = int(round(180 / GEO_CELL_SIZE_DEG))
+
+# Если область захватывает больше строк сетки, вместо набора диапазонов
+# используется один общий диапазон (плюс фильтр по широте и долготе)
+MAX_CELL_RANGES = 64
+
+
+def _cell_row(latitude: float) -> int:
+    return min(max(math.floor((latitude + 90) / GEO_CELL_SIZE_DEG), 0), GEO_CELL_ROWS - 1)
+
+
+def _cell_col(longitude: float) -> int:
+    return min(max(math.floor((longitude + 180) / GEO_CELL_SIZE_DEG), 0), GEO_CELL_COLUMNS - 1)
+
+
+def geo_cell(latitude: float, longitude: float) -> int:
+    """
+    Возвращает номер ячейки сетки для точки.
+
+    Формула продублирована в миграции, заполняющей `buildings.geo_cell`,
+    поэтому менять её нужно вместе с новой миграцией.
+    """
+    return _cell_row(latitude) * GEO_CELL_COLUMNS + _cell_col(longitude)
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Расстояние между двумя точками по большому кругу, в метрах."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _normalize_lon_ranges(min_lon: float, max_lon: float):
+    """
+    Разбивает диапазон долгот на части в пределах [-180, 180].
+
+    Область, пересекающая 180-й меридиан (например, Чукотка), задаётся
+    как min_lon > max_lon либо выходом за границы и превращается в два диапазона.
+    """
+    if max_lon - min_lon >= 360:
+        return [(-180.0, 180.0)]
+    if min_lon > max_lon:
+        max_lon += 360
+    if min_lon < -180:
+        return [(min_lon + 360, 180.0), (-180.0, max_lon)]
+    if max_lon > 180:
+        return [(min_lon, 180.0), (-180.0, max_lon - 360)]
+    return [(min_lon, max_lon)]
+
+
+def radius_bounding_box(latitude: float, longitude: float, radius_m: float):
+    """
+    Вычисляет прямоугольник, гарантированно содержащий круг заданного радиуса.
+
+    Returns:
+        tuple: (min_lat, max_lat, список диапазонов долгот [(min_lon, max_lon), ...])
+    """
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    min_lat, max_lat = latitude - dlat, latitude + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        # Круг захватывает полюс — подходят любые долготы
+        return max(min_lat, -90.0), min(max_lat, 90.0), [(-180.0, 180.0)]
+    # Долготный охват круга (касательные меридианы), см. J. Matuschek, "Finding Points Within a Distance"
+    dlon = math.degrees(math.asin(math.sin(radius_m / EARTH_RADIUS_M) / math.cos(math.radians(latitude))))
+    return min_lat, max_lat, _normalize_lon_ranges(longitude - dlon, longitude + dlon)
+
+
+def box_lon_ranges(min_lon: float, max_lon: float):
+    """Диапазоны долгот прямоугольной области (с учётом перехода через 180-й меридиан)."""
+    return _normalize_lon_ranges(min_lon, max_lon)
+
+
+def box_area_km2(min_lat: float, max_lat: float, lon_ranges) -> float:
+    """Площадь прямоугольной области на сфере (между двумя параллелями и меридианами), км²."""
+    radius_km = EARTH_RADIUS_M / 1000
+    band = math.sin(math.radians(max_lat)) - math.sin(math.radians(min_lat))
+    return sum(radius_km ** 2 * math.radians(hi - lo) * band for lo, hi in lon_ranges)
+
+
+def cell_ranges(min_lat: float, max_lat: float, lon_ranges):
+    """
+    Переводит прямоугольную область в диапазоны номеров ячеек сетки.
+
+    Returns:
+        list: список пар (первая ячейка, последняя ячейка) для условия BETWEEN
+    """
+    first_row, last_row = _cell_row(min_lat), _cell_row(max_lat)
+    ranges = []
+    for lo, hi in lon_ranges:
+        first_col, last_col = _cell_col(lo), _cell_col(hi)
+        if (last_row - first_row + 1) * len(lon_ranges) > MAX_CELL_RANGES:
+            # Слишком много строк: один диапазон, остальное отсечёт фильтр по координатам
+            ranges.append((first_row * GEO_CELL_COLUMNS + first_col, last_row * GEO_CELL_COLUMNS + last_col))
+            continue
+        for row in range(first_row, last_row + 1):
+            ranges.append((row * GEO_CELL_COLUMNS + first_col, row * GEO_CELL_COLUMNS + last_col))
+    return ranges
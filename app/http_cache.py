@@ -0,0 +1,172 @@
+import functools
+import hashlib
+import inspect
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+from app.crud.aio import get_versions
+from app.crud.versions import local_changes
+
+"""
+Условные запросы (ETag, Last-Modified, 304 Not Modified) и Cache-Control для GET-эндпоинтов.
+
+Валидаторы ответа вычисляются без выполнения запроса эндпоинта и без
+сериализации тела — по версиям наборов данных (тегов), от которых зависит
+ответ: "organizations", "buildings", "activities". Версию и время изменения
+набора увеличивает каждая запись в журнал изменений (app.crud.changes) в той
+же транзакции. Версии читаются одним запросом по первичному ключу к table_versions
+и запоминаются в памяти процесса (ValidatorCache), так что обычный GET
+обходится без этого запроса:
+- изменения, закоммиченные этим процессом, видны сразу (локальный счётчик
+  app.crud.versions.local_changes);
+- изменения других воркеров — не позже чем через HTTP_CACHE_CHECK_INTERVAL секунд.
+Валидаторы строятся так:
+- ETag — слабый (W/), хэш версий тегов: одинаковые параметры запроса при
+  одинаковых версиях дают один и тот же ответ;
+- Last-Modified — самое позднее время изменения тегов.
+
+Если клиент прислал совпадающий If-None-Match (или, без него, If-Modified-Since
+не раньше Last-Modified), эндпоинт не вызывается: ответ 304 отдаётся до
+запросов CRUD и до кэша ответов. Версии берутся до выполнения эндпоинта,
+поэтому при параллельной записи ETag может оказаться старше тела — тогда
+следующая проверка просто не совпадёт, устаревший ответ не будет подтверждён.
+Запись другого воркера в пределах HTTP_CACHE_CHECK_INTERVAL ещё не меняет
+ETag: ответ, закэшированный клиентом, может быть подтверждён 304 с таким же
+опозданием.
+
+Cache-Control задаётся для каждой группы маршрутов (см. cache_control_setting).
+"""
+
+# Cache-Control по умолчанию: кэшировать можно, но перед использованием — сверять с сервером (дешёвый 304)
+CACHE_CONTROL = os.getenv("CACHE_CONTROL", "public, no-cache")
+
+# Как часто (в секундах) сверять запомненные версии с table_versions
+HTTP_CACHE_CHECK_INTERVAL = float(os.getenv("HTTP_CACHE_CHECK_INTERVAL", "1.0"))
+
+
+def cache_control_setting(group: str) -> str:
+    """Cache-Control группы маршрутов: переменная CACHE_CONTROL_<GROUP> или общий CACHE_CONTROL."""
+    return os.getenv(f"CACHE_CONTROL_{group.upper()}", CACHE_CONTROL)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверяет заголовок If-None-Match (слабое сравнение, как требует RFC 9110)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+def not_modified_since(if_modified_since: Optional[str], last_modified: datetime) -> bool:
+    """Проверяет заголовок If-Modified-Since (с точностью до секунды; некорректная дата игнорируется)."""
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite возвращает CURRENT_TIMESTAMP (UTC) без часового пояса
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def validators(versions: dict, tags):
+    """
+    ETag и время последнего изменения по версиям тегов (см. app.crud.versions.get_versions).
+
+    Теги без изменений (нет строки в table_versions) считаются версией 0.
+
+    Returns:
+        tuple: (ETag, время изменения в UTC или None, если ни один тег ещё не менялся)
+    """
+    raw = ",".join(f"{tag}={versions[tag][0]}@{versions[tag][1].isoformat()}" if tag in versions else f"{tag}=0"
+                   for tag in tags)
+    etag = f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:16]}"'
+    last_modified = max((_utc(updated_at) for _, updated_at in versions.values()), default=None)
+    return etag, last_modified
+
+
+class ValidatorCache:
+    """Валидаторы по наборам тегов, сверяемые с table_versions не чаще раза в интервал."""
+
+    def __init__(self, check_interval: float = HTTP_CACHE_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        # теги -> (ETag, Last-Modified, локальные счётчики тегов, время проверки)
+        self._entries = {}
+
+    async def get(self, db, tags: tuple):
+        """
+        ETag и время изменения тегов (см. validators); запрос к БД — только если
+        этот процесс менял теги или с прошлой проверки прошёл интервал.
+        """
+        changes = tuple(local_changes(tag) for tag in tags)
+        entry = self._entries.get(tags)
+        if entry is not None and entry[2] == changes and time.monotonic() - entry[3] < self.check_interval:
+            return entry[0], entry[1]
+        etag, last_modified = validators(await get_versions(db, tags), tags)
+        self._entries[tags] = (etag, last_modified, changes, time.monotonic())
+        return etag, last_modified
+
+
+# Общий экземпляр процесса
+validator_cache = ValidatorCache()
+
+
+def conditional(*tags: str, cache_control: str = CACHE_CONTROL):
+    """
+    Декоратор GET-эндпоинта: ETag, Last-Modified, Cache-Control и ответ 304.
+
+    Эндпоинт (async def) должен принимать сессию БД в параметре db (Session или
+    AsyncSession — как и функции app.crud.aio). Применяется поверх
+    response_cache.cached, чтобы 304 отдавался и без обращения к кэшу ответов.
+    Заголовки добавляются к успешным ответам; ответы-исключения (HTTPException) их не получают.
+
+    Args:
+        *tags: наборы данных, от которых зависит ответ
+        cache_control (str): значение заголовка Cache-Control для маршрута
+    """
+
+    def decorator(endpoint):
+        signature = inspect.signature(endpoint)
+        own_request = "request" in signature.parameters
+        parameters = list(signature.parameters.values())
+        if not own_request:
+            parameters.append(inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request))
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            request = kwargs["request"] if own_request else kwargs.pop("request")
+            etag, last_modified = await validator_cache.get(kwargs["db"], tags)
+            headers = {"ETag": etag, "Cache-Control": cache_control}
+            if last_modified is not None:
+                headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+            # If-Modified-Since учитывается, только если нет If-None-Match (RFC 9110, 13.2.2)
+            if_none_match = request.headers.get("if-none-match")
+            if if_none_match is not None:
+                not_modified = etag_matches(if_none_match, etag)
+            else:
+                not_modified = last_modified is not None and not_modified_since(
+                    request.headers.get("if-modified-since"), last_modified)
+            if not_modified:
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+            result = await endpoint(*args, **kwargs)
+            if isinstance(result, Response):
+                result.headers.update(headers)
+            elif "response" in kwargs:
+                kwargs["response"].headers.update(headers)
+            return result
+
+        wrapper.__signature__ = signature.replace(parameters=parameters)
+        return wrapper
+
+    return decorator
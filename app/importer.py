@@ -0,0 +1,142 @@
+import argparse
+import csv
+import json
+import sys
+import time
+
+from pydantic import ValidationError
+
+from app.database import SessionLocal
+from app.schemas.organizations import OrganizationCreate
+from app.schemas.building import BuildingCreate
+from app.schemas.activity import ActivityCreate
+from app.crud.bulk import BULK_BATCH_SIZE, bulk_create_organizations, bulk_create_buildings, bulk_create_activities
+
+"""
+Загрузка справочника из файлов CSV или NDJSON.
+
+    python -m app.importer buildings buildings.csv
+    python -m app.importer organizations organizations.ndjson --batch-size 5000
+    cat activities.csv | python -m app.importer activities - --format csv
+
+Формат строк совпадает с телом POST-запроса на создание записи. В CSV
+заголовок задаёт имена колонок; списки пишутся через точку с запятой:
+    name,building_id,phones,activity_ids
+    Моя компания,1,+7 123 456 78 90;+7 987 654 32 10,1;2
+
+Файл читается потоково, в памяти находится только текущая пачка. Ошибки
+отдельных строк (невалидные данные, несуществующее здание или родитель,
+ошибки БД) выводятся в stderr с номером строки файла и не прерывают загрузку.
+Код возврата — 1, если были ошибки.
+"""
+
+KINDS = {
+    "organizations": (OrganizationCreate, bulk_create_organizations),
+    "buildings": (BuildingCreate, bulk_create_buildings),
+    "activities": (ActivityCreate, bulk_create_activities),
+}
+
+# Колонки CSV, содержащие списки значений через ";"
+CSV_LIST_COLUMNS = {"phones", "activity_ids"}
+
+
+def _csv_record(record: dict) -> dict:
+    """Приводит строку CSV к виду JSON-записи: пустые значения опускаются, списки разбиваются."""
+    result = {}
+    for column, value in record.items():
+        value = (value or "").strip()
+        if not value:
+            continue
+        if column in CSV_LIST_COLUMNS:
+            items = [item.strip() for item in value.split(";") if item.strip()]
+            result[column] = [{"phone": item} for item in items] if column == "phones" else items
+        else:
+            result[column] = value
+    return result
+
+
+def read_records(stream, file_format: str):
+    """
+    Читает записи из потока.
+
+    Yields:
+        tuple: (номер строки файла, dict с данными записи или исключение разбора)
+    """
+    if file_format == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, _csv_record(record)
+        return
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, e
+
+
+def import_stream(db, kind: str, stream, file_format: str, batch_size: int = BULK_BATCH_SIZE, log=sys.stderr):
+    """
+    Загружает записи из потока пачками по batch_size.
+
+    Returns:
+        tuple: (количество созданных записей, количество ошибок)
+    """
+    schema, bulk_create = KINDS[kind]
+    created = errors = 0
+
+    def report(line_number, message):
+        nonlocal errors
+        errors += 1
+        print(f"строка {line_number}: {message}", file=log)
+
+    def flush(lines, rows):
+        nonlocal created
+        result = bulk_create(db, rows, batch_size)
+        created += result["created"]
+        for error in result["errors"]:
+            report(lines[error["index"]], error["error"])
+
+    lines, rows = [], []
+    for line_number, record in read_records(stream, file_format):
+        if isinstance(record, Exception):
+            report(line_number, f"некорректный JSON: {record}")
+            continue
+        try:
+            rows.append(schema.model_validate(record))
+        except ValidationError as e:
+            report(line_number, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+            continue
+        lines.append(line_number)
+        if len(rows) >= batch_size:
+            flush(lines, rows)
+            lines, rows = [], []
+    if rows:
+        flush(lines, rows)
+    return created, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Загрузка организаций, зданий и видов деятельности из CSV/NDJSON")
+    parser.add_argument("kind", choices=sorted(KINDS))
+    parser.add_argument("path", help="путь к файлу или '-' для stdin")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="по умолчанию определяется по расширению файла")
+    parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    file_format = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    stream = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8", newline="")
+    start = time.perf_counter()
+    try:
+        with SessionLocal() as db:
+            created, errors = import_stream(db, args.kind, stream, file_format, args.batch_size)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    print(f"{args.kind}: создано {created}, ошибок {errors}, {time.perf_counter() - start:.1f} с", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
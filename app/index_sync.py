@@ -0,0 +1,93 @@
+import threading
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.changes import ChangeLog
+from app.crud.changes import changes_query, visibility_horizon
+from app.crud.versions import get_version
+
+"""
+Подхват изменений других процессов in-memory индексами (app.spatial_index, app.suggest_index).
+
+Индекс строится при старте и сразу пополняется изменениями своего процесса.
+Изменения других воркеров он подхватывает так же, как кэш дерева видов
+деятельности (app.activity_cache): не чаще раза в интервал сверяет версию
+набора данных из table_versions и, если она сдвинулась, читает из журнала
+изменений (app.crud.changes) id строк, записанных после прошлой проверки.
+
+Журнал, а не «id больше максимального известного», нужен потому, что id
+выдаются при вставке: строка с меньшим id может закоммититься позже уже
+прочитанной. Журнал читается до горизонта видимости; если за горизонтом
+остались записи, версия не запоминается и журнал перечитывается при
+следующей проверке. Позиция в журнале берётся с запасом, поэтому одна
+строка может прийти дважды — индексы пропускают уже известные id.
+"""
+
+
+class ChangeFollower:
+    """Позиция in-memory индекса в журнале изменений одной таблицы."""
+
+    def __init__(self, table: str, check_interval: float):
+        self.table = table
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._position = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def start(self, db: Session):
+        """
+        Запоминает версию таблицы и позицию журнала; вызывается перед загрузкой индекса.
+
+        В PostgreSQL позиция — горизонт видимости: все транзакции ниже него
+        завершены и попадут в загрузку. В SQLite — последняя запись журнала.
+        """
+        version = get_version(db, self.table)
+        horizon = visibility_horizon(db)
+        if horizon is not None:
+            position = (horizon, 0)
+        else:
+            last = db.execute(
+                select(ChangeLog.xact_id, ChangeLog.id).order_by(ChangeLog.xact_id.desc(), ChangeLog.id.desc()).limit(1)
+            ).first()
+            position = tuple(last) if last is not None else (-1, 0)
+        with self._lock:
+            self._position, self._version = position, version
+            self._checked_at = time.monotonic()
+
+    @property
+    def due(self) -> bool:
+        """Пора ли сверить версию с БД (индекс загружен и интервал истёк)."""
+        return self._position is not None and time.monotonic() - self._checked_at >= self.check_interval
+
+    def changed_ids(self, db: Session) -> list:
+        """
+        id строк таблицы, записанных в журнал после прошлой проверки.
+
+        Пустой список — если интервал не истёк, версия не изменилась или
+        проверку уже выполняет другой запрос. Блокировка не удерживается во
+        время запросов к БД (см. ActivityTreeCache.get).
+        """
+        with self._lock:
+            if not self.due:
+                return []
+            self._checked_at = time.monotonic()
+            position, known_version = self._position, self._version
+        version = get_version(db, self.table)
+        if version == known_version:
+            return []
+        horizon = visibility_horizon(db)
+        entries = db.execute(
+            changes_query(position).with_only_columns(ChangeLog.xact_id, ChangeLog.id, ChangeLog.entity_id)
+            .where(ChangeLog.table_name == self.table)
+        ).all()
+        visible = [entry for entry in entries if horizon is None or entry.xact_id < horizon]
+        with self._lock:
+            if self._position == position:
+                if visible:
+                    self._position = (visible[-1].xact_id, visible[-1].id)
+                if len(visible) == len(entries):
+                    self._version = version
+        return list(dict.fromkeys(entry.entity_id for entry in visible))
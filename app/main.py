@@ -1,5 +1,32 @@
+from contextlib import asynccontextmanager
+from anyio import to_thread
 from fastapi import FastAPI
-from app.routers import organizations, building, activity
+from app.database import Base, SessionLocal, engine, engines
+from app.routers import organizations, building, activity, suggest, changes, monitoring
+from app.spatial_index import SPATIAL_INDEX_ENABLED, building_index
+from app.suggest_index import SUGGEST_INDEX_ENABLED, suggest_index
+from app.crud.search import ensure_search_index
+from app.metrics import MetricsMiddleware, instrument_engine, instrument_models
+from app.db_pool import THREADPOOL_SIZE
+from app.compression import CompressionMiddleware
+from app.dependencies import MONITORING_TOKEN
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Загрузка in-memory структур при старте приложения."""
+    if THREADPOOL_SIZE:
+        to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    if engine.dialect.name == "sqlite":
+        # В PostgreSQL индексы поиска создаёт миграция
+        with engine.begin() as connection:
+            ensure_search_index(connection)
+    if SPATIAL_INDEX_ENABLED:
+        with SessionLocal() as db:
+            building_index.load(db)
+    if SUGGEST_INDEX_ENABLED:
+        with SessionLocal() as db:
+            suggest_index.load(db)
+    yield
 
 app = FastAPI(
     title="Organizations Directory API",
@@ -17,13 +44,27 @@ API для управления организациями, зданиями и
 Документация:
 - Swagger UI — `/docs`  
 - ReDoc — `/redoc`
-    """
+    """,
+    lifespan=lifespan,
 )
 
+# Метрики запросов: Server-Timing, GET /metrics, профилирование по X-Profile
+for db_engine in engines().values():
+    instrument_engine(db_engine)
+instrument_models(Base)
+app.add_middleware(MetricsMiddleware)
+# Сжатие ответов (brotli/gzip): снаружи метрик, чтобы Server-Timing учитывал только обработку запроса
+app.add_middleware(CompressionMiddleware)
+
 # Подключаем роутеры
 app.include_router(organizations.router)
 app.include_router(building.router)
 app.include_router(activity.router)
+app.include_router(suggest.router)
+app.include_router(changes.router)
+# Эндпоинты мониторинга подключаются, только если задан токен доступа к ним
+if MONITORING_TOKEN:
+    app.include_router(monitoring.router)
 
 @app.get("/", tags=["Health"], summary="Проверка состояния API")
 def root():
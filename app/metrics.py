@@ -0,0 +1,303 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from contextvars import ContextVar
+
+from anyio import to_thread
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+
+from app.db_pool import threadpool_stats
+
+"""
+Метрики запросов и профилирование.
+
+MetricsMiddleware для каждого HTTP-запроса собирает:
+- общее время обработки;
+- время выполнения SQL-запросов и их количество (события before/after_cursor_execute движков);
+- количество ORM-объектов, созданных из строк результата (событие load моделей);
+- время сериализации ответа (app.serialization.dump_json).
+
+Время «app» — всё остальное: построение запросов, гидрация ORM-объектов,
+логика эндпоинта. В SQLite строки читаются уже после cursor.execute, поэтому
+их чтение тоже попадает в «app».
+
+Данные текущего запроса хранятся в ContextVar: контекст копируется в пул
+потоков (run_in_threadpool) и в run_sync, поэтому счётчики видны из CRUD-функций.
+
+Результат:
+- заголовок Server-Timing (total, db, serialize, app — видно в DevTools браузера);
+- накопленные по маршрутам метрики в формате Prometheus на GET /metrics.
+
+Профилирование включается переменной PROFILING_ENABLED: запрос с заголовком
+`X-Profile: 1` выполняется под cProfile, а вместо тела ответа возвращается
+отчёт pstats (по cumulative). Профилируются поток event loop и вызовы
+в пуле потоков через call_in_request (CRUD-функции и сериализация в
+DB_MODE=sync). Профиль потока event loop включает и другие запросы,
+обрабатываемые в это же время, поэтому профилировать лучше без нагрузки.
+cProfile не отслеживает переключения greenlet, поэтому в DB_MODE=async
+функции, выполняемые через run_sync, в отчёт почти не попадают — для
+профилирования CRUD запускайте приложение в DB_MODE=sync.
+"""
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Заголовок запроса, включающий профилирование (при PROFILING_ENABLED)
+PROFILE_HEADER = b"x-profile"
+
+# Количество строк отчёта профилировщика
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "60"))
+
+# Границы корзин гистограммы длительности запросов, секунды
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    """Счётчики одного HTTP-запроса."""
+
+    def __init__(self, profiles: list = None):
+        self.db_time = 0.0
+        self.statements = 0
+        self.orm_objects = 0
+        self.serialize_time = 0.0
+        # Профили cProfile потоков, выполнявших запрос (None — запрос не профилируется)
+        self.profiles = profiles
+
+
+_current: ContextVar = ContextVar("request_stats", default=None)
+
+
+def current_stats():
+    """Счётчики текущего HTTP-запроса (None вне запроса или при выключенных метриках)."""
+    return _current.get()
+
+
+def record_serialization(seconds: float):
+    stats = _current.get()
+    if stats is not None:
+        stats.serialize_time += seconds
+
+
+def call_in_request(fn, *args, **kwargs):
+    """
+    Вызывает fn(*args, **kwargs) в пуле потоков с учётом профилирования:
+    если текущий запрос профилируется, вызов выполняется под отдельным
+    cProfile.Profile этого потока, который попадает в отчёт запроса.
+    """
+    stats = _current.get()
+    if stats is None or stats.profiles is None:
+        return fn(*args, **kwargs)
+    profile = cProfile.Profile()
+    stats.profiles.append(profile)
+    return profile.runcall(fn, *args, **kwargs)
+
+
+async def run_in_request_thread(fn, *args, **kwargs):
+    """
+    Выполняет fn(*args, **kwargs) в пуле потоков через call_in_request
+    и учитывает ожидание свободного потока в threadpool_stats (GET /metrics/pool).
+    """
+    threadpool_stats.observe(to_thread.current_default_thread_limiter())
+    submitted = time.perf_counter()
+
+    def call():
+        threadpool_stats.record(time.perf_counter() - submitted)
+        return call_in_request(fn, *args, **kwargs)
+    return await run_in_threadpool(call)
+
+
+# -------------------------------------------------------------------
+# События SQLAlchemy
+# -------------------------------------------------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # В контексте выполнения, а не в conn.info: у запроса с ошибкой нет after_cursor_execute
+    if context is not None:
+        context.metrics_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "metrics_query_start", None)
+    stats = _current.get()
+    if stats is not None and start is not None:
+        stats.db_time += time.perf_counter() - start
+        stats.statements += 1
+
+
+def _on_load(target, context):
+    stats = _current.get()
+    if stats is not None:
+        stats.orm_objects += 1
+
+
+def instrument_engine(engine):
+    """Подключает учёт SQL-запросов к синхронному движку (для AsyncEngine — к его sync_engine)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def instrument_models(base):
+    """Подключает подсчёт загруженных ORM-объектов ко всем моделям base."""
+    if not event.contains(base, "load", _on_load):
+        event.listen(base, "load", _on_load, propagate=True)
+
+
+# -------------------------------------------------------------------
+# Накопленные метрики по маршрутам
+# -------------------------------------------------------------------
+def _format(value) -> str:
+    return f"{value:.6f}" if isinstance(value, float) else str(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RouteMetrics:
+    """Счётчики и гистограмма длительности по (метод, маршрут, статус) с момента запуска процесса."""
+
+    # Счётчики: (имя метрики, описание, индекс в записи)
+    _COUNTERS = (
+        ("app_request_db_seconds_total", "Время выполнения SQL-запросов", 2),
+        ("app_request_serialization_seconds_total", "Время сериализации ответов", 3),
+        ("app_db_statements_total", "Количество SQL-запросов", 4),
+        ("app_orm_objects_total", "Количество загруженных ORM-объектов", 5),
+    )
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # (метод, маршрут, статус) -> [count, duration_sum, db, serialize, statements, orm_objects, [корзины]]
+        self._series = {}
+
+    def observe(self, method: str, route: str, status: int, duration: float, stats: RequestStats):
+        key = (method, route, str(status))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0, 0.0, 0.0, 0.0, 0, 0, [0] * len(self.buckets)]
+            series[0] += 1
+            series[1] += duration
+            series[2] += stats.db_time
+            series[3] += stats.serialize_time
+            series[4] += stats.statements
+            series[5] += stats.orm_objects
+            for i, bound in enumerate(self.buckets):
+                if duration <= bound:
+                    series[6][i] += 1
+
+    def render(self) -> str:
+        """Метрики в текстовом формате Prometheus."""
+        with self._lock:
+            series = sorted((key, [*values[:6], list(values[6])]) for key, values in self._series.items())
+        lines = [
+            "# HELP app_requests_total Количество HTTP-запросов",
+            "# TYPE app_requests_total counter",
+        ]
+        labels = {key: 'method="{}",route="{}",status="{}"'.format(*map(_escape, key)) for key, _ in series}
+        lines += [f"app_requests_total{{{labels[key]}}} {values[0]}" for key, values in series]
+        lines += [
+            "# HELP app_request_duration_seconds Время обработки HTTP-запроса",
+            "# TYPE app_request_duration_seconds histogram",
+        ]
+        for key, values in series:
+            for bound, count in zip(self.buckets, values[6]):
+                lines.append(f'app_request_duration_seconds_bucket{{{labels[key]},le="{bound}"}} {count}')
+            lines.append(f'app_request_duration_seconds_bucket{{{labels[key]},le="+Inf"}} {values[0]}')
+            lines.append(f"app_request_duration_seconds_sum{{{labels[key]}}} {values[1]:.6f}")
+            lines.append(f"app_request_duration_seconds_count{{{labels[key]}}} {values[0]}")
+        for name, help_text, index in self._COUNTERS:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            lines += [f"{name}{{{labels[key]}}} {_format(values[index])}" for key, values in series]
+        return "\n".join(lines) + "\n"
+
+
+# Общий экземпляр метрик процесса
+route_metrics = RouteMetrics()
+
+
+# -------------------------------------------------------------------
+# Middleware
+# -------------------------------------------------------------------
+def _server_timing(total: float, stats: RequestStats) -> bytes:
+    app_time = max(0.0, total - stats.db_time - stats.serialize_time)
+    return (
+        f'total;dur={total * 1000:.1f}, '
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.statements} statements", '
+        f'serialize;dur={stats.serialize_time * 1000:.1f}, '
+        f'app;dur={app_time * 1000:.1f}'
+    ).encode()
+
+
+def _profile_report(profiles: list) -> bytes:
+    stream = io.StringIO()
+    report = pstats.Stats(profiles[0], stream=stream)
+    for profile in profiles[1:]:
+        report.add(profile)
+    report.sort_stats("cumulative").print_stats(PROFILE_TOP)
+    return stream.getvalue().encode()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: счётчики запроса, заголовок Server-Timing, метрики
+    по маршрутам и (по заголовку X-Profile) профилирование.
+    """
+
+    def __init__(self, app, metrics: RouteMetrics = route_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        profiling = PROFILING_ENABLED and dict(scope["headers"]).get(PROFILE_HEADER, b"") not in (b"", b"0")
+        stats = RequestStats(profiles=[cProfile.Profile()] if profiling else None)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status = 500
+        buffered = []
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(time.perf_counter() - start, stats)))
+                message = {**message, "headers": headers}
+            if profiling:
+                buffered.append(message)
+            else:
+                await send(message)
+
+        try:
+            if profiling:
+                stats.profiles[0].enable()
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                if profiling:
+                    stats.profiles[0].disable()
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            self.metrics.observe(scope["method"], route.path if route else "unmatched", status,
+                                 time.perf_counter() - start, stats)
+        if profiling:
+            body = _profile_report(stats.profiles)
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"x-profile-status", str(status).encode()),
+                    *[h for m in buffered[:1] for h in m["headers"] if h[0] == b"server-timing"],
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
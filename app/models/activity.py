@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Table, Index, func
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.models.changes import VersionedMixin
 
 """
 Модель базы данных для видов деятельности организаций.
@@ -8,7 +9,19 @@ from app.database import Base
 Поддерживает иерархическую структуру (до 3 уровней вложенности).
 """
 
-class Activity(Base):
+# Таблица замыкания иерархии: все пары (предок, потомок) с расстоянием между ними.
+# Каждая активность является сама себе предком с depth = 0, поэтому поддерево
+# или цепочка родителей выбираются одним индексированным запросом без рекурсии.
+activity_closure = Table(
+    "activity_closure",
+    Base.metadata,
+    Column("ancestor_id", Integer, ForeignKey("activities.id", ondelete="CASCADE"), primary_key=True),
+    Column("descendant_id", Integer, ForeignKey("activities.id", ondelete="CASCADE"), primary_key=True),
+    Column("depth", Integer, nullable=False),
+    Index("ix_activity_closure_descendant_id", "descendant_id", "ancestor_id"),
+)
+
+class Activity(VersionedMixin, Base):
     """
         Модель вида деятельности.
 
@@ -18,8 +31,8 @@ class Activity(Base):
     __tablename__ = "activities"
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(255), nullable=False)
-    parent_id = Column(Integer, ForeignKey("activities.id", ondelete="CASCADE"), nullable=True)
+    name = Column(String(255), nullable=False, index=True)
+    parent_id = Column(Integer, ForeignKey("activities.id", ondelete="CASCADE"), nullable=True, index=True)
     level = Column(Integer, nullable=False, default=1)
 
     # Связи
@@ -29,4 +42,7 @@ class Activity(Base):
         secondary="organization_activity",
         back_populates="activities",
         doc="Организации, связанные с данным видом деятельности"
-    )
\ No newline at end of file
+    )
+
+# Поиск по названию без учёта регистра (func.lower(Activity.name) в app.crud.organizations)
+Index("ix_activities_name_lower", func.lower(Activity.name))
@@ -1,12 +1,19 @@
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import Column, Integer, String, Float, BigInteger, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.models.changes import VersionedMixin
+from app.geo import geo_cell
 
 """
 Модель базы данных для зданий, в которых располагаются организации.
 """
 
-class Building(Base):
+def _geo_cell_default(context) -> int:
+    # Номер ячейки для вставок, в которых geo_cell не задан явно (ORM и Core-вставки через SQLAlchemy)
+    params = context.get_current_parameters()
+    return geo_cell(params["latitude"], params["longitude"])
+
+class Building(VersionedMixin, Base):
     """
         Модель здания.
 
@@ -14,11 +21,18 @@ class Building(Base):
         С одним зданием может быть связано несколько организаций.
     """
     __tablename__ = "buildings"
+    __table_args__ = (
+        # Поиск здания по точным координатам
+        Index("ix_buildings_latitude_longitude", "latitude", "longitude"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     address = Column(String(500), nullable=False)
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
+    # Номер ячейки географической сетки (см. app.geo.geo_cell) для поиска по радиусу и области;
+    # NOT NULL: здание без ячейки не нашлось бы ни одним поиском по области
+    geo_cell = Column(BigInteger, index=True, nullable=False, default=_geo_cell_default)
 
     # Связь с организациями
     organizations = relationship("Organization", back_populates="building", doc="Организации, расположенные в этом здании")
\ No newline at end of file
@@ -0,0 +1,41 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, func, literal_column
+from app.database import Base
+
+"""
+Модели журнала изменений для инкрементальной синхронизации (GET /changes).
+"""
+
+class VersionedMixin:
+    """
+        Время последнего изменения и номер версии строки.
+
+        При вставке заполняются значениями по умолчанию БД (текущее время, версия 1),
+        при UPDATE через SQLAlchemy — обновляются автоматически.
+    """
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+    version = Column(Integer, nullable=False, server_default="1", onupdate=literal_column("version + 1"))
+
+class ChangeLog(Base):
+    """
+        Запись журнала изменений: операция над строкой одной из таблиц справочника.
+
+        Пишется в той же транзакции, что и само изменение (см. app.crud.changes),
+        поэтому журнал содержит ровно закоммиченные изменения. id — курсор
+        для потребителей; записи читаются в порядке (xact_id, id), где xact_id —
+        id транзакции PostgreSQL, записавшей изменение (в SQLite — 0).
+    """
+    __tablename__ = "change_log"
+
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String(64), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    # insert, update или delete
+    operation = Column(String(16), nullable=False)
+    # Версия строки после изменения (для delete — последняя версия)
+    version = Column(Integer, nullable=False)
+    changed_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    xact_id = Column(BigInteger, nullable=False, server_default="0")
+
+    __table_args__ = (
+        Index("ix_change_log_xact_id_id", "xact_id", "id"),
+    )
@@ -0,0 +1,40 @@
+from sqlalchemy import JSON, Column, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, String, func
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import synonym
+from app.database import Base
+
+"""
+Модель денормализованной копии организаций для чтения (read model).
+"""
+
+class OrganizationDocument(Base):
+    """
+        Готовый к отдаче документ организации.
+
+        document — JSON организации в форме OrganizationOut (здание, телефоны,
+        виды деятельности с поддеревьями), сериализованный так же, как ответ API
+        (app.serialization), поэтому отдаётся без сборки из связанных таблиц.
+        Рядом — индексируемые столбцы для выборок: здание, координаты, название
+        и id видов деятельности (в PostgreSQL — массив с GIN-индексом).
+
+        Поддерживается в той же транзакции, что и изменения справочника
+        (см. app.crud.documents).
+    """
+    __tablename__ = "organization_documents"
+
+    organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), primary_key=True)
+    name = Column(String(255), nullable=False, index=True)
+    building_id = Column(Integer, index=True)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    activity_ids = Column(JSON().with_variant(ARRAY(Integer), "postgresql"), nullable=False)
+    document = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    # Тот же атрибут id, что и у Organization: документы можно отдавать вместо организаций
+    id = synonym("organization_id")
+
+    __table_args__ = (
+        Index("ix_organization_documents_coordinates", "latitude", "longitude"),
+        Index("ix_organization_documents_activity_ids", "activity_ids", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
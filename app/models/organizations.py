@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, ForeignKey, Table, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.models.changes import VersionedMixin
 
 """
 Модели базы данных для Организаций и связанных сущностей.
@@ -12,9 +13,11 @@ organization_activity = Table(
     Base.metadata,
     Column("organization_id", Integer, ForeignKey("organizations.id", ondelete="CASCADE"), primary_key=True),
     Column("activity_id", Integer, ForeignKey("activities.id", ondelete="CASCADE"), primary_key=True),
+    # Первичный ключ начинается с organization_id; для поиска организаций по виду деятельности нужен обратный индекс
+    Index("ix_organization_activity_activity_id", "activity_id", "organization_id"),
 )
 
-class Organization(Base):
+class Organization(VersionedMixin, Base):
     """
     Модель организации.
 
@@ -27,8 +30,8 @@ class Organization(Base):
     __tablename__ = "organizations"
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(255), nullable=False)
-    building_id = Column(Integer, ForeignKey("buildings.id", ondelete="SET NULL"))
+    name = Column(String(255), nullable=False, index=True)
+    building_id = Column(Integer, ForeignKey("buildings.id", ondelete="SET NULL"), index=True)
 
     # Связи
     building = relationship("Building", back_populates="organizations")
@@ -55,7 +58,7 @@ class OrganizationPhone(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     phone = Column(String(50), nullable=False)
-    organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"))
+    organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), index=True)
 
     # Обратная связь
     organization = relationship("Organization", back_populates="phones")
\ No newline at end of file
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, BigInteger, DateTime, func
+from app.database import Base
+
+"""
+Модель счётчиков версий данных.
+"""
+
+class TableVersion(Base):
+    """
+        Счётчик изменений набора данных (например, дерева видов деятельности).
+
+        Увеличивается в той же транзакции, что и само изменение, поэтому
+        все процессы приложения (воркеры uvicorn) могут дёшево проверить,
+        не устарели ли их in-memory кэши, одним запросом по первичному ключу.
+        Версии и время изменения таблиц справочника служат также валидаторами
+        HTTP-кэширования (ETag, Last-Modified, см. app.http_cache).
+    """
+    __tablename__ = "table_versions"
+
+    name = Column(String(64), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
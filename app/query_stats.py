@@ -0,0 +1,257 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event
+
+"""
+Статистика SQL-запросов по «отпечаткам» и журнал медленных запросов.
+
+Отпечаток (fingerprint) — текст запроса, в котором литералы и параметры
+заменены на `?`, списки `IN (?, ?, ...)` и строки VALUES свёрнуты, а пробелы
+нормализованы. Запросы одной формы с разными значениями и длиной списков
+дают один отпечаток.
+
+Для каждого отпечатка и для каждой вызвавшей его функции приложения
+(см. caller_name, например crud.organizations.get_organizations_by_activity_name)
+накапливаются: количество, суммарное и максимальное время, число строк
+(cursor.rowcount — драйверы SQLite для SELECT его не сообщают) и последние
+QUERY_STATS_WINDOW длительностей, по которым считаются p50/p95/p99.
+
+Запросы дольше SLOW_QUERY_MS пишутся в логгер app.slow_query (WARNING)
+с параметрами и планом выполнения (EXPLAIN QUERY PLAN в SQLite, EXPLAIN
+в PostgreSQL; только для SELECT, на том же соединении).
+
+Обработчики подключаются к движкам в app.database; таблица лучших
+отпечатков — GET /metrics/queries.
+"""
+
+QUERY_STATS_ENABLED = os.getenv("QUERY_STATS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Порог медленного запроса, миллисекунды
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Выполнять ли EXPLAIN для медленных запросов
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() in ("1", "true", "yes")
+# Количество последних длительностей, по которым считаются перцентили
+QUERY_STATS_WINDOW = int(os.getenv("QUERY_STATS_WINDOW", "1000"))
+# Максимальное количество отпечатков; запросы новых форм сверх него учитываются как OTHER
+QUERY_STATS_MAX_FINGERPRINTS = int(os.getenv("QUERY_STATS_MAX_FINGERPRINTS", "1000"))
+
+OTHER = "OTHER"
+
+# Максимальная длина параметров в журнале медленных запросов
+_MAX_PARAMS_LENGTH = 1000
+
+logger = logging.getLogger("app.slow_query")
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+_CRUD_DIR = os.path.join(_APP_DIR, "crud") + os.sep
+# Модули, которые не считаются вызывающими (инструментирование и обёртки CRUD)
+_SKIPPED_FILES = {
+    os.path.join(_APP_DIR, name)
+    for name in ("query_stats.py", "metrics.py", "database.py", os.path.join("crud", "aio.py"))
+}
+
+_FINGERPRINT_RULES = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"__\[POSTCOMPILE_\w+\]"), "?"),
+    (re.compile(r"%\(\w+\)s|%s|\$\d+|(?<![:\w]):\w+"), "?"),
+    (re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.IGNORECASE), "?"),
+    (re.compile(r"\s+"), " "),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?)"),
+    (re.compile(r"(\((?:\?|\s|,|\w+\(\?\))*\))(?:\s*,\s*\1)+"), r"\1, ..."),
+    (re.compile(r"\bIN \(\?\)", re.IGNORECASE), "IN (...)"),
+]
+
+
+def fingerprint(statement: str) -> str:
+    """Нормализованная форма запроса: литералы и параметры — `?`, списки свёрнуты."""
+    for pattern, replacement in _FINGERPRINT_RULES:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+def caller_name(frame=None) -> str:
+    """
+    Функция приложения, выполнившая запрос: модуль.функция.
+
+    Берётся самая внешняя функция из app/crud (публичная функция CRUD, а не
+    её внутренние помощники вроде _page), а если запрос выполнен не из CRUD —
+    ближайшая функция пакета app (кроме модулей инструментирования).
+    """
+    frame = frame or sys._getframe(1)
+    nearest, outermost_crud = None, None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_APP_DIR) and filename not in _SKIPPED_FILES:
+            if nearest is None:
+                nearest = frame
+            if filename.startswith(_CRUD_DIR):
+                outermost_crud = frame
+        frame = frame.f_back
+    found = outermost_crud or nearest
+    if found is None:
+        return OTHER
+    module = found.f_code.co_filename[len(_APP_DIR):-3].replace(os.sep, ".")
+    return f"{module}.{found.f_code.co_name}"
+
+
+class QueryStat:
+    """Накопленные значения для одного отпечатка (или одной вызывающей функции)."""
+
+    __slots__ = ("count", "total", "max", "rows", "durations", "callers")
+
+    def __init__(self, window: int):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.durations = deque(maxlen=window)
+        self.callers = {}
+
+    def add(self, duration: float, rows: int, caller: str = None):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.rows += max(rows, 0)
+        self.durations.append(duration)
+        if caller is not None:
+            self.callers[caller] = self.callers.get(caller, 0) + 1
+
+    def snapshot(self) -> dict:
+        durations = sorted(self.durations)
+
+        def percentile(p):
+            return round(durations[min(len(durations) - 1, int(p * len(durations)))] * 1000, 3)
+
+        result = {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total * 1000 / self.count, 3),
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(self.max * 1000, 3),
+            "rows": self.rows,
+            "rows_per_call": round(self.rows / self.count, 2),
+        }
+        if self.callers:
+            result["callers"] = dict(sorted(self.callers.items(), key=lambda item: -item[1]))
+        return result
+
+
+class QueryStats:
+    """Статистика запросов процесса по отпечаткам и по вызывающим функциям."""
+
+    # Поля, по которым можно сортировать таблицу
+    SORT_FIELDS = ("total_ms", "count", "mean_ms", "p95_ms", "p99_ms", "max_ms", "rows")
+
+    def __init__(self, window: int = QUERY_STATS_WINDOW, max_fingerprints: int = QUERY_STATS_MAX_FINGERPRINTS,
+                 slow_query_ms: float = SLOW_QUERY_MS):
+        self.window = window
+        self.max_fingerprints = max_fingerprints
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._fingerprints = {}
+        self._callers = {}
+        self.slow_queries = 0
+        # Кэш нормализации: текст запроса -> отпечаток (текстов столько же, сколько форм запросов в коде)
+        self._normalized = {}
+
+    def record(self, statement: str, duration: float, rows: int, caller: str) -> str:
+        """Учитывает выполненный запрос; возвращает его отпечаток."""
+        key = self._normalized.get(statement)
+        if key is None:
+            key = fingerprint(statement)
+            if len(self._normalized) < self.max_fingerprints * 10:
+                self._normalized[statement] = key
+        with self._lock:
+            stat = self._fingerprints.get(key)
+            if stat is None:
+                if len(self._fingerprints) >= self.max_fingerprints:
+                    key = OTHER
+                    stat = self._fingerprints.get(OTHER)
+                if stat is None:
+                    stat = self._fingerprints[key] = QueryStat(self.window)
+            stat.add(duration, rows, caller)
+            caller_stat = self._callers.get(caller)
+            if caller_stat is None:
+                caller_stat = self._callers[caller] = QueryStat(self.window)
+            caller_stat.add(duration, rows)
+        return key
+
+    def top(self, limit: int = 20, sort: str = "total_ms") -> dict:
+        """Самые затратные отпечатки и вызывающие функции по полю sort."""
+        with self._lock:
+            fingerprints = [{"fingerprint": key, **stat.snapshot()} for key, stat in self._fingerprints.items()]
+            callers = [{"caller": key, **stat.snapshot()} for key, stat in self._callers.items()]
+        fingerprints.sort(key=lambda row: -row[sort])
+        callers.sort(key=lambda row: -row[sort])
+        return {
+            "slow_query_ms": self.slow_query_ms,
+            "slow_queries": self.slow_queries,
+            "fingerprints": fingerprints[:limit],
+            "callers": callers[:limit],
+        }
+
+    def record_slow(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def reset(self):
+        with self._lock:
+            self._fingerprints.clear()
+            self._callers.clear()
+            self.slow_queries = 0
+
+
+# Общий экземпляр статистики процесса
+query_stats = QueryStats()
+
+
+def _explain(conn, statement: str, parameters) -> str:
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    rows = conn.exec_driver_sql(prefix + statement, parameters).all()
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Время начала хранится в контексте выполнения: при ошибке запроса after_cursor_execute
+    # не вызывается, и контекст уходит вместе с ним, ничего не оставляя в соединении
+    if context is not None and not conn.info.get("query_stats_explaining"):
+        context.query_stats_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "query_stats_start", None)
+    if start is None:
+        return
+    duration = time.perf_counter() - start
+    caller = caller_name()
+    key = query_stats.record(statement, duration, cursor.rowcount, caller)
+    if duration * 1000 < query_stats.slow_query_ms:
+        return
+    query_stats.record_slow()
+    plan = None
+    if SLOW_QUERY_EXPLAIN and not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        conn.info["query_stats_explaining"] = True
+        try:
+            plan = _explain(conn, statement, parameters)
+        except Exception as e:  # план — вспомогательная информация, ошибка не должна ломать запрос
+            plan = f"EXPLAIN не выполнен: {e}"
+        finally:
+            conn.info["query_stats_explaining"] = False
+    logger.warning(
+        "Медленный запрос %.1f мс (%s)\n%s\nПараметры: %s\nПлан:\n%s",
+        duration * 1000, caller, key, repr(parameters)[:_MAX_PARAMS_LENGTH], plan or "-",
+    )
+
+
+def install(engine):
+    """Подключает статистику запросов к синхронному движку (для AsyncEngine — к его sync_engine)."""
+    if QUERY_STATS_ENABLED and not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,312 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+
+from app.serialization import dump_json
+from app.compression import choose_encoding, encode_variants, encoded_headers, encoded_response
+from app.metrics import run_in_request_thread
+
+"""
+Кэш ответов GET-эндпоинтов.
+
+Ответ кэшируется уже сериализованным (байты JSON + служебные заголовки вроде
+X-Next-Cursor) по ключу «путь + параметры запроса + версии тегов».
+Вместе с телом хранятся его сжатые варианты (brotli, gzip — см.
+app.compression): они сжимаются один раз при сохранении, а попадание в кэш
+отдаётся в кодировке из Accept-Encoding без повторного сжатия.
+Каждый эндпоинт объявляет теги — наборы данных, от которых зависит ответ
+("organizations", "buildings", "activities"). Функции create_* после коммита
+вызывают invalidate(тег): версия тега увеличивается, и все ключи со старой
+версией перестают использоваться (а затем вытесняются по TTL/LRU).
+
+Хранилище подключаемое (RESPONSE_CACHE_BACKEND):
+- memory — LRU с TTL в памяти процесса; инвалидация видна только этому процессу,
+  остальные воркеры отдают устаревшие данные не дольше RESPONSE_CACHE_TTL секунд;
+- redis — общий для всех воркеров кэш (нужен пакет redis и REDIS_URL);
+- none — кэширование выключено.
+"""
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Заголовки, которые не сохраняются вместе с телом ответа
+_SKIPPED_HEADERS = {"content-length", "content-type"}
+
+
+class CacheBackend:
+    """
+    Интерфейс хранилища кэша.
+
+    Совместим по смыслу с командами Redis GET / SET EX / INCR, поэтому
+    любое хранилище с такими операциями (в том числе фейковое в тестах)
+    подключается через RedisBackend.
+    """
+
+    name = "abstract"
+    # Выполняет ли хранилище сетевой ввод-вывод (тогда в async-эндпоинтах оно вызывается в пуле потоков)
+    blocking = True
+
+    def get(self, key: str):
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float):
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    def get_counter(self, key: str) -> int:
+        """Текущее значение счётчика, увеличиваемого incr (0, если его ещё нет)."""
+        raise NotImplementedError
+
+    def size(self):
+        """Количество записей (None, если хранилище его не сообщает)."""
+        return None
+
+
+class MemoryBackend(CacheBackend):
+    """LRU-кэш с TTL в памяти процесса."""
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._counters = defaultdict(int)
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] += 1
+            return self._counters[key]
+
+    def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    def size(self):
+        return len(self._entries)
+
+
+class RedisBackend(CacheBackend):
+    """
+    Хранилище поверх Redis-совместимого клиента (методы get, set(ex=...), incr).
+
+    Args:
+        client: клиент redis.Redis или любой объект с тем же интерфейсом;
+                если не указан — создаётся по REDIS_URL
+    """
+
+    name = "redis"
+
+    def __init__(self, client=None):
+        if client is None:
+            import redis  # необязательная зависимость, нужна только для этого хранилища
+            client = redis.Redis.from_url(REDIS_URL)
+        self.client = client
+
+    def get(self, key: str):
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.client.set(key, value, ex=max(1, int(ttl)))
+
+    def incr(self, key: str) -> int:
+        return self.client.incr(key)
+
+    def get_counter(self, key: str) -> int:
+        value = self.client.get(key)
+        return int(value) if value is not None else 0
+
+
+def _pack(headers: dict, body: bytes, variants: dict) -> bytes:
+    """Запись кэша: строка JSON (заголовки и размеры частей), затем тело и его сжатые варианты подряд."""
+    parts = {"identity": body, **variants}
+    meta = {"headers": headers, "sizes": {encoding: len(data) for encoding, data in parts.items()}}
+    return json.dumps(meta).encode() + b"\n" + b"".join(parts.values())
+
+
+def _unpack(value: bytes, accept_encoding: str = None) -> Response:
+    """Ответ из записи кэша в кодировке из Accept-Encoding (из записи копируется только нужная часть)."""
+    meta, data = value.split(b"\n", 1)
+    meta = json.loads(meta)
+    sizes = meta["sizes"]
+    encoding = choose_encoding(accept_encoding)
+    if encoding not in sizes:
+        encoding = None
+    offset = 0
+    for name, size in sizes.items():
+        if name == (encoding or "identity"):
+            break
+        offset += size
+    return Response(content=data[offset:offset + size], media_type="application/json",
+                    headers=encoded_headers(encoding, meta["headers"]))
+
+
+class ResponseCache:
+    """Кэш ответов со счётчиками попаданий и промахов по маршрутам."""
+
+    def __init__(self, backend: CacheBackend = None, ttl: float = RESPONSE_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._stats_lock = threading.Lock()
+        self._stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def invalidate(self, *tags: str):
+        """Делает недействительными все закэшированные ответы, зависящие от тегов."""
+        if not self.enabled:
+            return
+        for tag in tags:
+            self.backend.incr(f"rc:tag:{tag}")
+
+    def _key(self, request: Request, tags) -> str:
+        versions = ",".join(f"{tag}={self.backend.get_counter(f'rc:tag:{tag}')}" for tag in tags)
+        params = sorted(request.query_params.multi_items())
+        raw = f"{request.url.path}?{params}|{versions}"
+        return "rc:" + hashlib.sha1(raw.encode()).hexdigest()
+
+    def _count(self, request: Request, field: str):
+        route = request.scope.get("route")
+        with self._stats_lock:
+            self._stats[route.path if route else request.url.path][field] += 1
+
+    def stats(self) -> dict:
+        """Счётчики попаданий/промахов: суммарно и по маршрутам."""
+        with self._stats_lock:
+            routes = {path: dict(counters) for path, counters in self._stats.items()}
+        return {
+            "backend": self.backend.name if self.enabled else "none",
+            "ttl": self.ttl,
+            "entries": self.backend.size() if self.enabled else 0,
+            "hits": sum(c["hits"] for c in routes.values()),
+            "misses": sum(c["misses"] for c in routes.values()),
+            "routes": routes,
+        }
+
+    def cached(self, *tags: str, response_model):
+        """
+        Декоратор GET-эндпоинта: кэширует сериализованный ответ.
+
+        Эндпоинт получает дополнительные параметры request/response (если он
+        их не объявил сам). Ответы-исключения (HTTPException) и готовые объекты
+        Response (например, потоковая выгрузка) не кэшируются.
+
+        Результат эндпоинта сериализуется через app.serialization (без проверки
+        по response_model в FastAPI) — и при выключенном кэше тоже. Если у
+        эндпоинта есть параметр projection (выбор полей ответа), сериализуются
+        только выбранные поля; ключ кэша учитывает их, так как включает параметры запроса.
+
+        Args:
+            *tags: наборы данных, от которых зависит ответ
+            response_model: схема ответа (та же, что в response_model маршрута)
+        """
+
+        def decorator(endpoint):
+            signature = inspect.signature(endpoint)
+            own_request = "request" in signature.parameters
+            own_response = "response" in signature.parameters
+            parameters = list(signature.parameters.values())
+            if not own_request:
+                parameters.append(inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request))
+            if not own_response:
+                parameters.append(inspect.Parameter("response", inspect.Parameter.KEYWORD_ONLY, annotation=Response))
+            is_async = inspect.iscoroutinefunction(endpoint)
+
+            def split_kwargs(kwargs):
+                request = kwargs["request"] if own_request else kwargs.pop("request")
+                response = kwargs["response"] if own_response else kwargs.pop("response")
+                return request, response
+
+            def lookup(request):
+                if not self.enabled:
+                    return None, None
+                key = self._key(request, tags)
+                value = self.backend.get(key)
+                if value is None:
+                    self._count(request, "misses")
+                    return key, None
+                self._count(request, "hits")
+                return key, _unpack(value, request.headers.get("accept-encoding"))
+
+            def store(key, request, response, result, projection):
+                if isinstance(result, Response):
+                    return result
+                body = dump_json(response_model, result, projection)
+                headers = {k: v for k, v in response.headers.items() if k.lower() not in _SKIPPED_HEADERS}
+                if key is None:
+                    return Response(content=body, media_type="application/json", headers=headers)
+                variants = encode_variants(body)
+                self.backend.set(key, _pack(headers, body, variants), self.ttl)
+                return encoded_response(body, variants, request.headers.get("accept-encoding"), headers=headers)
+
+            if is_async:
+                @functools.wraps(endpoint)
+                async def wrapper(*args, **kwargs):
+                    request, response = split_kwargs(kwargs)
+                    if self.enabled and self.backend.blocking:
+                        key, hit = await run_in_threadpool(lookup, request)
+                    else:
+                        key, hit = lookup(request)
+                    if hit is not None:
+                        return hit
+                    result = await endpoint(*args, **kwargs)
+                    return await run_in_request_thread(store, key, request, response, result, kwargs.get("projection"))
+            else:
+                @functools.wraps(endpoint)
+                def wrapper(*args, **kwargs):
+                    request, response = split_kwargs(kwargs)
+                    key, hit = lookup(request)
+                    if hit is not None:
+                        return hit
+                    return store(key, request, response, endpoint(*args, **kwargs), kwargs.get("projection"))
+
+            wrapper.__signature__ = signature.replace(parameters=parameters)
+            return wrapper
+
+        return decorator
+
+
+def create_backend(name: str = RESPONSE_CACHE_BACKEND):
+    """Создаёт хранилище кэша по имени из настроек (None — кэш выключен)."""
+    if name == "memory":
+        return MemoryBackend()
+    if name == "redis":
+        return RedisBackend()
+    return None
+
+
+# Общий экземпляр кэша ответов
+response_cache = ResponseCache(create_backend())
@@ -1,12 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException,status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
-from app.dependencies import get_db
+from typing import List, Optional
+from app.dependencies import get_db, get_read_db, check_bulk_size
 from app.schemas.activity import ActivityCreate, ActivityOut
-from app.crud.activity import create_activity, get_activities, build_activity_tree
+from app.schemas.bulk import BulkResult
+from app.crud.activity import assemble_activity_tree
+from app.crud.aio import create_activity, bulk_create_activities, get_activities, get_activity_snapshot
+from app.crud.loaders import ACTIVITY_MAX_LEVEL
+from app.activity_cache import ACTIVITY_CACHE_ENABLED, activity_cache
+from app.serialization import dump_json, json_response
+from app.http_cache import etag_matches, cache_control_setting
 
 router = APIRouter(prefix="/activities", tags=["Activities"])
 
+# Cache-Control ответов GET /activities (переменная CACHE_CONTROL_ACTIVITIES)
+ACTIVITIES_CACHE_CONTROL = cache_control_setting("activities")
+
+def _activities_etag(version: int) -> str:
+    # Слабый: тело отдаётся и без сжатия, и сжатым (app.compression)
+    return f'W/"activities-{version}"'
+
+def _validators(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": ACTIVITIES_CACHE_CONTROL}
+
 # -------------------------------------------------------------------------
 # Создание нового вида деятельности
 # -------------------------------------------------------------------------
@@ -33,10 +49,11 @@ router = APIRouter(prefix="/activities", tags=["Activities"])
     }
 """
 )
-def create_activity_endpoint(activity_in: ActivityCreate, db: Session = Depends(get_db)):
+async def create_activity_endpoint(activity_in: ActivityCreate, db: Session = Depends(get_db)):
     try:
-        activity = create_activity(db, activity_in)
-        return build_activity_tree(activity)
+        activity = await create_activity(db, activity_in)
+        # У только что созданной активности нет потомков: узел собирается без обращения к связи children
+        return assemble_activity_tree([activity])[0]
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -48,6 +65,32 @@ def create_activity_endpoint(activity_in: ActivityCreate, db: Session = Depends(
             detail=f"Ошибка при создании деятельности: {str(e)}"
         )
 
+# -------------------------------------------------------------------------
+# Массовое создание видов деятельности
+# -------------------------------------------------------------------------
+@router.post(
+    "/bulk",
+    response_model=BulkResult,
+    summary="Массово создать виды деятельности",
+    description="""
+Принимает список видов деятельности в формате одиночного создания
+и сохраняет их пачками. Строки с ошибками не прерывают загрузку: они
+перечислены в `errors` (index — номер строки), а в `ids` для них стоит `null`.
+Запросы больше чем на 10 000 строк отклоняются (413) — для них есть `python -m app.importer`.
+Родитель (`parent_id`) должен существовать до запроса, уровень вложенности — не больше 3.
+
+    Пример запроса:
+
+    [
+      {"name": "Мясная продукция", "parent_id": 1},
+      {"name": "Молочная продукция", "parent_id": 1}
+    ]
+"""
+)
+async def bulk_create_activities_endpoint(rows: List[ActivityCreate], db: Session = Depends(get_db)):
+    check_bulk_size(rows)
+    return await bulk_create_activities(db, rows)
+
 # -------------------------------------------------------------------------
 # Получить список всех видов деятельности (в виде дерева)
 # -------------------------------------------------------------------------
@@ -58,13 +101,37 @@ def create_activity_endpoint(activity_in: ActivityCreate, db: Session = Depends(
     description="""
 Возвращает иерархический список всех видов деятельности (в виде дерева).  
 Родительские виды находятся на верхнем уровне, дочерние — внутри.
+
+- `root_id` — вернуть только поддерево указанного вида деятельности;
+- `max_depth` — количество уровней дерева в ответе (считая корень).
 """
 )
-def get_all_activities(db: Session = Depends(get_db)):
-    activities = get_activities(db)
+async def get_all_activities(
+    request: Request,
+    root_id: Optional[int] = Query(None, description="ID корня поддерева"),
+    max_depth: Optional[int] = Query(None, ge=1, le=ACTIVITY_MAX_LEVEL, description="Количество уровней дерева"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db),
+):
+    if not ACTIVITY_CACHE_ENABLED:
+        activities = await get_activities(db, root_id, max_depth)
+    else:
+        # Пока снимок кэша заведомо актуален, 304 отдаётся без обращения к БД
+        version = activity_cache.fresh_version()
+        if version is not None and etag_matches(if_none_match, _activities_etag(version)):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_validators(_activities_etag(version)))
+        snapshot = await get_activity_snapshot(db)
+        etag = _activities_etag(snapshot.version)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_validators(etag))
+        activities = snapshot.subtree(root_id, max_depth)
+        if activities:
+            # Тело (и его сжатые варианты) собирается один раз на версию снимка и параметры запроса
+            payload = snapshot.payload((root_id, max_depth), lambda: dump_json(List[ActivityOut], activities))
+            return payload.response(request.headers.get("accept-encoding"), headers=_validators(etag))
     if not activities:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Виды деятельности не найдены"
         )
-    return activities
\ No newline at end of file
+    return json_response(List[ActivityOut], activities)
\ No newline at end of file
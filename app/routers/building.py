@@ -1,12 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from typing import List
-from app.dependencies import get_db
-from app.schemas.building import BuildingCreate, BuildingOut
-from app.crud.building import create_building, get_buildings
+from app.dependencies import get_db, get_read_db, PageParams, set_next_cursor, check_bulk_size, MAX_PAGE_SIZE
+from app.streaming import ndjson_response
+from app.response_cache import response_cache
+from app.http_cache import conditional, cache_control_setting
+from app.schemas.building import BuildingCreate, BuildingOut, BuildingGeoOut
+from app.schemas.bulk import BulkResult
+from app.crud.building import iter_buildings
+from app.crud.aio import create_building, bulk_create_buildings, get_buildings, get_nearest_buildings
 
 router = APIRouter(prefix="/buildings", tags=["Buildings"])
 
+# Наборы данных, от которых зависят ответы эндпоинтов зданий (для кэша ответов)
+BUILDING_CACHE_TAGS = ("buildings",)
+# Cache-Control ответов (переменная CACHE_CONTROL_BUILDINGS)
+BUILDINGS_CACHE_CONTROL = cache_control_setting("buildings")
+
+
 # -------------------------------------------------------------------------
 # Создание нового здания
 # -------------------------------------------------------------------------
@@ -19,9 +30,9 @@ router = APIRouter(prefix="/buildings", tags=["Buildings"])
 Необходимо указать **адрес**, **широту** и **долготу**.
 """
 )
-def create_building_endpoint(building_in: BuildingCreate, db: Session = Depends(get_db)):
+async def create_building_endpoint(building_in: BuildingCreate, db: Session = Depends(get_db)):
     try:
-        building = create_building(db, building_in)
+        building = await create_building(db, building_in)
         return building
     except Exception as e:
         raise HTTPException(
@@ -29,6 +40,31 @@ def create_building_endpoint(building_in: BuildingCreate, db: Session = Depends(
             detail=f"Ошибка при создании здания: {str(e)}"
         )
 
+# -------------------------------------------------------------------------
+# Массовое создание зданий
+# -------------------------------------------------------------------------
+@router.post(
+    "/bulk",
+    response_model=BulkResult,
+    summary="Массово создать здания",
+    description="""
+Принимает список зданий в формате одиночного создания
+и сохраняет их пачками. Строки с ошибками не прерывают загрузку: они
+перечислены в `errors` (index — номер строки), а в `ids` для них стоит `null`.
+Запросы больше чем на 10 000 строк отклоняются (413) — для них есть `python -m app.importer`.
+
+    Пример запроса:
+
+    [
+      {"address": "г. Москва, ул. Ленина 1", "latitude": 55.75, "longitude": 37.61},
+      {"address": "г. Москва, ул. Тверская 7", "latitude": 55.76, "longitude": 37.60}
+    ]
+"""
+)
+async def bulk_create_buildings_endpoint(rows: List[BuildingCreate], db: Session = Depends(get_db)):
+    check_bulk_size(rows)
+    return await bulk_create_buildings(db, rows)
+
 # -------------------------------------------------------------------------
 # Получить список всех зданий
 # -------------------------------------------------------------------------
@@ -36,13 +72,58 @@ def create_building_endpoint(building_in: BuildingCreate, db: Session = Depends(
     "/",
     response_model=List[BuildingOut],
     summary="Получить все здания",
-    description="Возвращает список всех зданий, зарегистрированных в системе."
+    description="""
+Возвращает список всех зданий, зарегистрированных в системе.
+
+- `limit`/`cursor` — курсорная пагинация, курсор следующей страницы возвращается в заголовке `X-Next-Cursor`;
+- `stream=true` — потоковая выгрузка всего списка в формате NDJSON (одно здание на строку).
+"""
 )
-def get_all_buildings(db: Session = Depends(get_db)):
-    buildings = get_buildings(db)
+@conditional(*BUILDING_CACHE_TAGS, cache_control=BUILDINGS_CACHE_CONTROL)
+@response_cache.cached(*BUILDING_CACHE_TAGS, response_model=List[BuildingOut])
+async def get_all_buildings(
+    response: Response,
+    page: PageParams = Depends(),
+    stream: bool = Query(False, description="Потоковая выгрузка в формате NDJSON"),
+    db: Session = Depends(get_read_db),
+):
+    if stream:
+        return ndjson_response(iter_buildings, BuildingOut)
+    buildings, next_cursor = await get_buildings(db, page.limit, page.cursor)
+    set_next_cursor(response, next_cursor)
     if not buildings:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Здания не найдены"
         )
+    return buildings
+
+
+# -------------------------------------------------------------------------
+# Ближайшие к точке здания
+# -------------------------------------------------------------------------
+@router.get(
+    "/nearest",
+    response_model=List[BuildingGeoOut],
+    summary="Ближайшие здания",
+    description="""
+Возвращает `k` ближайших к точке зданий, отсортированных по расстоянию (поле `distance`, в метрах).
+Если указан `radius`, здания дальше этого расстояния не возвращаются.
+"""
+)
+@conditional(*BUILDING_CACHE_TAGS, cache_control=BUILDINGS_CACHE_CONTROL)
+@response_cache.cached(*BUILDING_CACHE_TAGS, response_model=List[BuildingGeoOut])
+async def get_nearest_buildings_endpoint(
+    latitude: float = Query(..., ge=-90, le=90, description="Широта точки"),
+    longitude: float = Query(..., ge=-180, le=180, description="Долгота точки"),
+    k: int = Query(10, ge=1, le=MAX_PAGE_SIZE, description="Количество зданий"),
+    radius: float = Query(None, gt=0, description="Максимальное расстояние, метры"),
+    db: Session = Depends(get_read_db),
+):
+    buildings = await get_nearest_buildings(db, latitude, longitude, k, radius)
+    if not buildings:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Здания рядом с указанной точкой не найдены"
+        )
     return buildings
\ No newline at end of file
@@ -0,0 +1,36 @@
+import functools
+from fastapi import APIRouter, Query
+from app.streaming import ndjson_response, NDJSON_MEDIA_TYPE
+from app.schemas.changes import ChangeOut
+from app.crud.changes import iter_changes
+
+router = APIRouter(prefix="/changes", tags=["Changes"])
+
+
+# -------------------------------------------------------------------------
+# Журнал изменений для инкрементальной синхронизации
+# -------------------------------------------------------------------------
+@router.get(
+    "",
+    response_model=ChangeOut,
+    summary="Изменения справочника",
+    description="""
+Потоково (NDJSON, одна запись `ChangeOut` на строку) возвращает изменения
+организаций, зданий и видов деятельности в порядке транзакций, записавших
+их в журнал. Изменение появляется в ленте, когда завершены все транзакции,
+начатые раньше записавшей его.
+
+- `since` — курсор: `cursor` последней полученной записи (0 — с начала журнала);
+- `limit` — максимальное количество записей в ответе.
+
+`data` — текущее состояние строки на момент запроса (null, если она удалена),
+поэтому при нескольких изменениях одной строки достаточно применить последнее.
+Пустой ответ означает, что изменений после `since` нет.
+""",
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+def get_changes(
+    since: int = Query(0, ge=0, description="Курсор последней полученной записи"),
+    limit: int = Query(None, ge=1, description="Максимальное количество записей"),
+):
+    return ndjson_response(functools.partial(iter_changes, since=since, limit=limit), ChangeOut)
@@ -0,0 +1,97 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+from app.response_cache import response_cache
+from app.database import engines
+from app.db_pool import pool_status, threadpool_stats
+from app.metrics import route_metrics
+from app.query_stats import QueryStats, query_stats
+from app.dependencies import require_monitoring_token
+
+# Все эндпоинты мониторинга — только с токеном MONITORING_TOKEN
+router = APIRouter(prefix="/metrics", tags=["Monitoring"], dependencies=[Depends(require_monitoring_token)])
+
+# -------------------------------------------------------------------------
+# Метрики запросов в формате Prometheus
+# -------------------------------------------------------------------------
+@router.get(
+    "",
+    response_class=PlainTextResponse,
+    summary="Метрики запросов (Prometheus)",
+    description="""
+Метрики по маршрутам с момента запуска процесса в текстовом формате Prometheus:
+количество запросов и гистограмма времени обработки, время SQL-запросов и
+сериализации, количество SQL-запросов и загруженных ORM-объектов.
+Метки: method, route (шаблон пути), status.
+"""
+)
+def get_prometheus_metrics():
+    return PlainTextResponse(route_metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# -------------------------------------------------------------------------
+# Статистика кэша ответов
+# -------------------------------------------------------------------------
+@router.get(
+    "/cache",
+    summary="Статистика кэша ответов",
+    description="""
+Возвращает тип хранилища кэша, количество записей и счётчики попаданий/промахов
+(суммарно и по каждому маршруту) с момента запуска процесса.
+"""
+)
+def get_cache_stats():
+    return response_cache.stats()
+
+# -------------------------------------------------------------------------
+# Состояние пулов соединений с БД
+# -------------------------------------------------------------------------
+@router.get(
+    "/pool",
+    summary="Состояние пулов соединений",
+    description="""
+Для каждого движка (primary, replica и их асинхронных вариантов, если они
+созданы) возвращает размер пула, количество занятых и свободных соединений,
+overflow, а также число выдач соединения, суммарное/среднее/максимальное
+время ожидания, максимум одновременно занятых соединений (`busy_max`)
+и количество ошибок QueuePool timeout с момента запуска процесса.
+
+`threadpool` — пул потоков, в котором выполняются CRUD-функции в `DB_MODE=sync`:
+размер, максимум одновременно занятых потоков, число вызовов и время ожидания свободного потока.
+"""
+)
+def get_pool_stats():
+    pools = {name: pool_status(engine.pool) for name, engine in engines().items()}
+    pools["threadpool"] = threadpool_stats.snapshot()
+    return pools
+
+# -------------------------------------------------------------------------
+# Статистика SQL-запросов по отпечаткам
+# -------------------------------------------------------------------------
+@router.get(
+    "/queries",
+    summary="Самые затратные SQL-запросы",
+    description="""
+Возвращает top отпечатков SQL-запросов (текст запроса без значений параметров)
+и вызывающих их функций приложения, отсортированных по полю `sort`:
+количество, суммарное/среднее/максимальное время, p50/p95/p99 по последним
+запросам, число строк (если драйвер его сообщает). У отпечатков указано,
+какие функции их вызывали.
+
+Запросы дольше `SLOW_QUERY_MS` дополнительно пишутся в лог `app.slow_query` с планом выполнения.
+"""
+)
+def get_query_stats(
+    top: int = Query(20, ge=1, le=1000, description="Количество строк в каждой таблице"),
+    sort: Literal[QueryStats.SORT_FIELDS] = Query("total_ms", description="Поле сортировки"),
+):
+    return query_stats.top(top, sort)
+
+@router.delete(
+    "/queries",
+    summary="Сбросить статистику SQL-запросов",
+    description="Обнуляет статистику отпечатков (например, перед нагрузочным тестом).",
+)
+def reset_query_stats():
+    query_stats.reset()
+    return {"status": "ok"}
+
@@ -1,25 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException,status
+import functools
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
-from app.dependencies import get_db
-from app.schemas.organizations import OrganizationCreate, OrganizationOut
-from app.crud.organizations import (
+from typing import List, Optional
+from app.dependencies import get_db, get_read_db, PageParams, set_next_cursor, check_bulk_size, get_organization_projection, MAX_PAGE_SIZE
+from app.streaming import ndjson_response
+from app.response_cache import response_cache
+from app.http_cache import conditional, cache_control_setting
+from app.schemas.organizations import OrganizationCreate, OrganizationOut, OrganizationGeoOut, OrganizationProjection
+from app.schemas.bulk import BulkResult
+from app.crud.organizations import iter_organizations
+from app.crud.aio import (
     create_organization,
+    bulk_create_organizations,
     get_organizations,
     get_organizations_by_building,
     get_organizations_by_name_activites,
     get_organizations_by_coordinates,
+    get_organizations_in_radius,
+    get_organizations_in_box,
+    get_nearest_organizations,
     get_organization_by_id,
     get_organization_by_name,
+    search_organizations,
     get_organizations_by_activity_name,
 )
 
+# Все GET-эндпоинты организаций принимают параметры выбора полей ответа:
+# fields (например, fields=id,name,building для карты) и expand (activities.children),
+# см. get_organization_projection. Невыбранные связи не загружаются из БД.
 router = APIRouter(
     prefix="/organizations",
     tags=["Organizations"],
     responses={404: {"description": "Организация не найдена"}},
 )
 
+# Наборы данных, от которых зависят ответы эндпоинтов организаций (для кэша ответов)
+ORGANIZATION_CACHE_TAGS = ("organizations", "buildings", "activities")
+# Cache-Control ответов (переменная CACHE_CONTROL_ORGANIZATIONS)
+ORGANIZATIONS_CACHE_CONTROL = cache_control_setting("organizations")
+
+
 # -------------------------------------------------------------------------
 # Создание новой организации
 # -------------------------------------------------------------------------
@@ -42,9 +62,9 @@ router = APIRouter(
     }
     """
 )
-def create_organization_endpoint(org_in: OrganizationCreate, db: Session = Depends(get_db)):
+async def create_organization_endpoint(org_in: OrganizationCreate, db: Session = Depends(get_db)):
     try:
-        org = create_organization(db, org_in)
+        org = await create_organization(db, org_in)
         return org
     except Exception as e:
         raise HTTPException(
@@ -53,6 +73,32 @@ def create_organization_endpoint(org_in: OrganizationCreate, db: Session = Depen
         )
 
 
+# -------------------------------------------------------------------------
+# Массовое создание организаций
+# -------------------------------------------------------------------------
+@router.post(
+    "/bulk",
+    response_model=BulkResult,
+    summary="Массово создать организации",
+    description="""
+Принимает список организаций в формате одиночного создания
+и сохраняет их пачками. Строки с ошибками не прерывают загрузку: они
+перечислены в `errors` (index — номер строки), а в `ids` для них стоит `null`.
+Запросы больше чем на 10 000 строк отклоняются (413) — для них есть `python -m app.importer`.
+Здание (`building_id`) должно существовать; несуществующие `activity_ids` пропускаются.
+
+    Пример запроса:
+
+    [
+      {"name": "Моя компания", "building_id": 1, "phones": [{"phone": "+7 123 456 78 90"}], "activity_ids": [1, 2]},
+      {"name": "Другая компания", "building_id": 2}
+    ]
+"""
+)
+async def bulk_create_organizations_endpoint(rows: List[OrganizationCreate], db: Session = Depends(get_db)):
+    check_bulk_size(rows)
+    return await bulk_create_organizations(db, rows)
+
 # -------------------------------------------------------------------------
 # Получить список всех организаций
 # -------------------------------------------------------------------------
@@ -60,10 +106,26 @@ def create_organization_endpoint(org_in: OrganizationCreate, db: Session = Depen
     "/all_organizations",
     response_model=List[OrganizationOut],
     summary="Получить все организации",
-    description="Возвращает полный список всех организаций в базе данных.",
+    description="""
+Возвращает список всех организаций в базе данных.
+
+- `limit`/`cursor` — курсорная пагинация, курсор следующей страницы возвращается в заголовке `X-Next-Cursor`;
+- `stream=true` — потоковая выгрузка всего списка в формате NDJSON (одна организация на строку).
+""",
 )
-def get_all_organizations(db: Session = Depends(get_db)):
-    orgs = get_organizations(db)
+@conditional(*ORGANIZATION_CACHE_TAGS, cache_control=ORGANIZATIONS_CACHE_CONTROL)
+@response_cache.cached(*ORGANIZATION_CACHE_TAGS, response_model=List[OrganizationOut])
+async def get_all_organizations(
+    response: Response,
+    page: PageParams = Depends(),
+    stream: bool = Query(False, description="Потоковая выгрузка в формате NDJSON"),
+    projection: Optional[OrganizationProjection] = Depends(get_organization_projection),
+    db: Session = Depends(get_read_db),
+):
+    if stream:
+        return ndjson_response(functools.partial(iter_organizations, projection=projection), OrganizationOut, projection=projection)
+    orgs, next_cursor = await get_organizations(db, page.limit, page.cursor, projection=projection)
+    set_next_cursor(response, next_cursor)
     if not orgs:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -81,8 +143,13 @@ def get_all_organizations(db: Session = Depends(get_db)):
     summary="Организации по зданию",
     description="Возвращает все организации, находящиеся в указанном здании.",
 )
-def get_all_organizations_by_building(building_id: int, db: Session = Depends(get_db)):
-    orgs = get_organizations_by_building(db, building_id)
+@conditional(*ORGANIZATION_CACHE_TAGS, cache_control=ORGANIZATIONS_CACHE_CONTROL)
+@response_cache.cached(*ORGANIZATION_CACHE_TAGS, response_model=List[OrganizationOut])
+async def get_all_organizations_by_building(building_id: int, response: Response, page: PageParams = Depends(),
+                                           projection: Optional[OrganizationProjection] = Depends(get_organization_projection),
+                                           db: Session = Depends(get_read_db)):
+    orgs, next_cursor = await get_organizations_by_building(db, building_id, page.limit, page.cursor, projection=projection)
+    set_next_cursor(response, next_cursor)
     if not orgs:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -100,8 +167,13 @@ def get_all_organizations_by_building(building_id: int, db: Session = Depends(ge
     summary="Поиск организаций по названию деятельности",
     description="Находит организации, у которых указана определённая деятельность (без учёта регистра).",
 )
-def get_all_organizations_by_name_activites(activity: str, db: Session = Depends(get_db)):
-    orgs = get_organizations_by_name_activites(db, activity)
+@conditional(*ORGANIZATION_CACHE_TAGS, cache_control=ORGANIZATIONS_CACHE_CONTROL)
+@response_cache.cached(*ORGANIZATION_CACHE_TAGS, response_model=List[OrganizationOut])
+async def get_all_organizations_by_name_activites(activity: str, response: Response, page: PageParams = Depends(),
+                                                 projection: Optional[OrganizationProjection] = Depends(get_organization_projection),
+                                                 db: Session = Depends(get_read_db)):
+    orgs, next_cursor = await get_organizations_by_name_activites(db, activity, page.limit, page.cursor, projection=projection)
+    set_next_cursor(response, next_cursor)
     if not orgs:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -119,8 +191,13 @@ def get_all_organizations_by_name_activites(activity: str, db: Session = Depends
     summary="Организации по координатам",
     description="Возвращает организации, находящиеся по указанным координатам (широта и долгота).",
 )
-def get_all_organizations_by_coordinates(latitude: float, longitude: float, db: Session = Depends(get_db)):
-    orgs = get_organizations_by_coordinates(db, latitude, longitude)
+@conditional(*ORGANIZATION_CACHE_TAGS, cache_control=ORGANIZATIONS_CACHE_CONTROL)
+@response_cache.cached(*ORGANIZATION_CACHE_TAGS, response_model=List[OrganizationOut])
+async def get_all_organizations_by_coordinates(latitude: float, longitude: float, response: Response, page: PageParams = Depends(),
+                                               projection: Optional[OrganizationProjection] = Depends(get_organization_projection),
+                                               db: Session = Depends(get_read_db)):
+    orgs, next_cursor = await get_organizations_by_coordinates(db, latitude, longitude, page.limit, page.cursor, projection=projection)
+    set_next_cursor(response, next_cursor)
     if not orgs:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -129,6 +206,162 @@ def get_all_organizations_by_coordinates(latitude: float, longitude: float, db:
     return orgs
 
 
+# -------------------------------------------------------------------------
+# Поиск организаций в радиусе от точки
+# -------------------------------------------------------------------------
+@router.get(
+    "/by_radius/",
+    response_model=List[OrganizationGeoOut],
+    summary="Организации в радиусе от точки",
+    description="""
+Возвращает организации, здания которых находятся не дальше `radius` метров от точки (`latitude`, `longitude`).
+
+Результаты отсортированы по расстоянию (поле `distance`, в метрах), ближайшие — первыми.
+Пагинация — `limit`/`offset`, общее количество найденных организаций возвращается в заголовке `X-Total-Count`.
+Площадь описанного вокруг круга прямоугольника ограничена `MAX_SEARCH_AREA_KM2` (по умолчанию 100 000 км²).
+""",
+)
+@conditional(*ORGANIZATION_CACHE_TAGS, cache_control=ORGANIZATIONS_CACHE_CONTROL)
+@response_cache.cached(*ORGANIZATION_CACHE_TAGS, response_model=List[OrganizationGeoOut])
+async def get_all_organizations_in_radius(
+    response: Response,
+    latitude: float = Query(..., ge=-90, le=90, description="Широта точки"),
+    longitude: float = Query(..., ge=-180, le=180, description="Долгота точки"),
+    radius: float = Query(..., gt=0, le=1_000_000, description="Радиус поиска, метры"),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+    offset: int = Query(0, ge=0, description="Смещение от начала выдачи"),
+    projection: Optional[OrganizationProjection] = Depends(get_organization_projection),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        orgs, total = await get_organizations_in_radius(db, latitude, longitude, radius, limit, offset, projection=projection)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    response.headers["X-Total-Count"] = str(total)
+    if not orgs:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Организации в радиусе {radius} м от ({latitude}, {longitude}) не найдены"
+        )
+    return orgs
+
+
+# -------------------------------------------------------------------------
+# Поиск организаций в прямоугольной области
+# -------------------------------------------------------------------------
+@router.get(
+    "/by_rectangle/",
+    response_model=List[OrganizationGeoOut],
+    summary="Организации в прямоугольной области",
+    description="""
+Возвращает организации, здания которых находятся внутри прямоугольной области на карте.
+
+Если `min_longitude` больше `max_longitude`, область пересекает 180-й меридиан.
+Результаты отсортированы по расстоянию от центра области (поле `distance`, в метрах).
+Пагинация — `limit`/`offset`, общее количество найденных организаций возвращается в заголовке `X-Total-Count`.
+Площадь области ограничена `MAX_SEARCH_AREA_KM2` (по умолчанию 100 000 км²).
+""",
+)
+@conditional(*ORGANIZATION_CACHE_TAGS, cache_control=ORGANIZATIONS_CACHE_CONTROL)
+@response_cache.cached(*ORGANIZATION_CACHE_TAGS, response_model=List[OrganizationGeoOut])
+async def get_all_organizations_in_rectangle(
+    response: Response,
+    min_latitude: float = Query(..., ge=-90, le=90),
+    max_latitude: float = Query(..., ge=-90, le=90),
+    min_longitude: float = Query(..., ge=-180, le=180),
+    max_longitude: float = Query(..., ge=-180, le=180),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+    offset: int = Query(0, ge=0, description="Смещение от начала выдачи"),
+    projection: Optional[OrganizationProjection] = Depends(get_organization_projection),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        orgs, total = await get_organizations_in_box(db, min_latitude, max_latitude, min_longitude, max_longitude, limit, offset,
+                                                     projection=projection)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    response.headers["X-Total-Count"] = str(total)
+    if not orgs:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Организации в указанной области не найдены"
+        )
+    return orgs
+
+
+# -------------------------------------------------------------------------
+# Ближайшие к точке организации
+# -------------------------------------------------------------------------
+@router.get(
+    "/nearest",
+    response_model=List[OrganizationGeoOut],
+    summary="Ближайшие организации",
+    description="""
+Возвращает `limit` ближайших к точке организаций, отсортированных по расстоянию (поле `distance`, в метрах).
+Если указан `radius`, организации дальше этого расстояния не возвращаются.
+""",
+)
+@conditional(*ORGANIZATION_CACHE_TAGS, cache_control=ORGANIZATIONS_CACHE_CONTROL)
+@response_cache.cached(*ORGANIZATION_CACHE_TAGS, response_model=List[OrganizationGeoOut])
+async def get_all_nearest_organizations(
+    latitude: float = Query(..., ge=-90, le=90, description="Широта точки"),
+    longitude: float = Query(..., ge=-180, le=180, description="Долгота точки"),
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE, description="Количество организаций"),
+    radius: float = Query(None, gt=0, description="Максимальное расстояние, метры"),
+    projection: Optional[OrganizationProjection] = Depends(get_organization_projection),
+    db: Session = Depends(get_read_db),
+):
+    orgs = await get_nearest_organizations(db, latitude, longitude, limit, radius, projection=projection)
+    if not orgs:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Организации рядом с точкой ({latitude}, {longitude}) не найдены"
+        )
+    return orgs
+
+
+# -------------------------------------------------------------------------
+# Поиск организаций по названию
+# -------------------------------------------------------------------------
+@router.get(
+    "/search",
+    response_model=List[OrganizationOut],
+    summary="Поиск организаций по названию",
+    description="""
+Ищет организации по названию без учёта регистра: по префиксу, подстроке,
+словам в любом порядке и с опечатками.
+
+Результаты отсортированы по релевантности: точное совпадение, затем названия,
+начинающиеся с запроса, затем содержащие его, затем похожие.
+Пагинация — `limit`/`offset`, общее количество найденных организаций возвращается в заголовке `X-Total-Count`.
+""",
+)
+@conditional(*ORGANIZATION_CACHE_TAGS, cache_control=ORGANIZATIONS_CACHE_CONTROL)
+@response_cache.cached(*ORGANIZATION_CACHE_TAGS, response_model=List[OrganizationOut])
+async def search_organizations_by_name(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=255, description="Строка поиска"),
+    limit: int = Query(20, ge=1, le=100, description="Размер страницы"),
+    offset: int = Query(0, ge=0, description="Смещение от начала выдачи"),
+    projection: Optional[OrganizationProjection] = Depends(get_organization_projection),
+    db: Session = Depends(get_read_db),
+):
+    orgs, total = await search_organizations(db, q, limit, offset, projection=projection)
+    response.headers["X-Total-Count"] = str(total)
+    if not orgs:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Организации по запросу '{q}' не найдены"
+        )
+    return orgs
+
+
 # -------------------------------------------------------------------------
 # Получить организацию по её ID
 # -------------------------------------------------------------------------
@@ -138,8 +371,12 @@ def get_all_organizations_by_coordinates(latitude: float, longitude: float, db:
     summary="Организация по ID",
     description="Возвращает полную информацию об организации по её уникальному идентификатору.",
 )
-def get_one_organization_by_id(organization_id: int, db: Session = Depends(get_db)):
-    org = get_organization_by_id(db, organization_id)
+@conditional(*ORGANIZATION_CACHE_TAGS, cache_control=ORGANIZATIONS_CACHE_CONTROL)
+@response_cache.cached(*ORGANIZATION_CACHE_TAGS, response_model=OrganizationOut)
+async def get_one_organization_by_id(organization_id: int,
+                                     projection: Optional[OrganizationProjection] = Depends(get_organization_projection),
+                                     db: Session = Depends(get_read_db)):
+    org = await get_organization_by_id(db, organization_id, projection=projection)
     if not org:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -157,8 +394,12 @@ def get_one_organization_by_id(organization_id: int, db: Session = Depends(get_d
     summary="Организация по названию",
     description="Ищет организацию по точному совпадению имени.",
 )
-def get_one_organization_by_name(organization_name: str, db: Session = Depends(get_db)):
-    org = get_organization_by_name(db, organization_name)
+@conditional(*ORGANIZATION_CACHE_TAGS, cache_control=ORGANIZATIONS_CACHE_CONTROL)
+@response_cache.cached(*ORGANIZATION_CACHE_TAGS, response_model=OrganizationOut)
+async def get_one_organization_by_name(organization_name: str,
+                                       projection: Optional[OrganizationProjection] = Depends(get_organization_projection),
+                                       db: Session = Depends(get_read_db)):
+    org = await get_organization_by_name(db, organization_name, projection=projection)
     if not org:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -181,8 +422,13 @@ def get_one_organization_by_name(organization_name: str, db: Session = Depends(g
 Если запросить `"Мясная продукция"`, то будут возвращены организации, у которых деятельность `"Мясная продукция"` или родитель `"Еда"`.
 """,
 )
-def get_organizations_by_activity(activity_name: str, db: Session = Depends(get_db)):
-    orgs = get_organizations_by_activity_name(db, activity_name)
+@conditional(*ORGANIZATION_CACHE_TAGS, cache_control=ORGANIZATIONS_CACHE_CONTROL)
+@response_cache.cached(*ORGANIZATION_CACHE_TAGS, response_model=List[OrganizationOut])
+async def get_organizations_by_activity(activity_name: str, response: Response, page: PageParams = Depends(),
+                                        projection: Optional[OrganizationProjection] = Depends(get_organization_projection),
+                                        db: Session = Depends(get_read_db)):
+    orgs, next_cursor = await get_organizations_by_activity_name(db, activity_name, page.limit, page.cursor, projection=projection)
+    set_next_cursor(response, next_cursor)
     if not orgs:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
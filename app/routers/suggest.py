@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import List, Literal, Optional
+from app.dependencies import get_read_db
+from app.schemas.suggest import SuggestionOut
+from app.suggest_index import suggest_index
+from app.crud.aio import refresh_suggest_index
+
+router = APIRouter(prefix="/suggest", tags=["Suggest"])
+
+
+# -------------------------------------------------------------------------
+# Подсказки для строки поиска
+# -------------------------------------------------------------------------
+@router.get(
+    "/",
+    response_model=List[SuggestionOut],
+    summary="Подсказки по названиям",
+    description="""
+Возвращает до `limit` названий организаций и видов деятельности, в которых
+с префикса `q` начинается само название или одно из его слов (без учёта регистра).
+
+Сначала идут совпадения с начала названия, затем с начала других слов,
+внутри каждой группы — по алфавиту. Одинаковые названия показываются один раз.
+Ответ строится по индексу в памяти процесса; с БД индекс сверяется не чаще
+раза в `SUGGEST_INDEX_CHECK_INTERVAL` секунд, чтобы подхватить названия,
+добавленные другими процессами.
+"""
+)
+async def get_suggestions(
+    q: str = Query(..., min_length=1, max_length=255, description="Введённый префикс"),
+    limit: int = Query(10, ge=1, le=50, description="Количество подсказок"),
+    kind: Optional[Literal["organization", "activity"]] = Query(None, description="Искать только организации или только виды деятельности"),
+    db: Session = Depends(get_read_db),
+):
+    if not suggest_index.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Индекс подсказок отключён (SUGGEST_INDEX_ENABLED=false)"
+        )
+    if suggest_index.refresh_due:
+        await refresh_suggest_index(db)
+    return suggest_index.suggest(q, limit, kind)
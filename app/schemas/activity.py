@@ -16,6 +16,17 @@ class ActivityCreate(ActivityBase):
     """Схема для создания нового вида деятельности."""
     pass
 
+class ActivityFlatOut(BaseModel):
+    """Вид деятельности без поддерева (например, в журнале изменений)."""
+    id: int
+    name: str
+    parent_id: Optional[int] = None
+    level: int
+
+    model_config = {
+        "from_attributes": True
+    }
+
 ActivityOut = ForwardRef("ActivityOut")
 
 class ActivityOut(BaseModel):
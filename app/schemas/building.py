@@ -22,4 +22,8 @@ class BuildingOut(BuildingBase):
 
     model_config = {
         "from_attributes": True
-    }
\ No newline at end of file
+    }
+
+class BuildingGeoOut(BuildingOut):
+    """Здание в результатах поиска ближайших: distance — расстояние от точки поиска, метры."""
+    distance: float
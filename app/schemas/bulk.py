@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+"""
+Схемы (Pydantic) для результатов массовой загрузки (POST .../bulk, app.importer).
+"""
+
+class BulkRowError(BaseModel):
+    """Ошибка одной строки: index — номер строки во входном списке (с нуля)."""
+    index: int
+    error: str
+
+class BulkResult(BaseModel):
+    """
+    Результат массовой загрузки.
+
+    - created — количество созданных записей;
+    - ids — id созданных записей в порядке входных строк (null для строк с ошибкой);
+    - errors — ошибки отдельных строк (остальные строки при этом сохраняются).
+    """
+    created: int
+    ids: List[Optional[int]]
+    errors: List[BulkRowError] = []
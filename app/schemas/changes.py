@@ -0,0 +1,36 @@
+from datetime import datetime, timezone
+from pydantic import BaseModel, field_validator
+from typing import Optional, Union
+from app.schemas.activity import ActivityFlatOut
+from app.schemas.building import BuildingOut
+from app.schemas.organizations import OrganizationOut
+
+"""
+Схемы (Pydantic) для журнала изменений (GET /changes).
+"""
+
+class ChangeOut(BaseModel):
+    """
+    Одно изменение строки справочника.
+
+    - cursor — id записи журнала; следующий запрос — /changes?since=<cursor последней записи>;
+    - table — organizations, buildings или activities;
+    - operation — insert, update или delete;
+    - id, version — id строки и её версия после изменения;
+    - changed_at — время изменения в UTC (в JSON — с суффиксом Z);
+    - data — текущее состояние строки (OrganizationOut, BuildingOut или ActivityFlatOut),
+      null, если строка удалена.
+    """
+    cursor: int
+    table: str
+    operation: str
+    id: int
+    version: int
+    changed_at: datetime
+    data: Optional[Union[OrganizationOut, BuildingOut, ActivityFlatOut]] = None
+
+    @field_validator("changed_at")
+    @classmethod
+    def to_utc(cls, value: datetime) -> datetime:
+        # SQLite возвращает CURRENT_TIMESTAMP (UTC) без часового пояса, PostgreSQL — в поясе сессии
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, NamedTuple, Optional
 from app.schemas.building import BuildingOut
 from app.schemas.activity import ActivityOut
 
@@ -61,4 +61,38 @@ class OrganizationOut(OrganizationBase):
 
     model_config = {
         "from_attributes": True
-    }
\ No newline at end of file
+    }
+
+class OrganizationGeoOut(OrganizationOut):
+    """
+    Организация в результатах поиска по карте.
+
+    Дополнительно содержит distance — расстояние (в метрах) от точки поиска
+    (или от центра прямоугольной области) до здания организации.
+    """
+    distance: float
+
+# -------------------------------------------------------------------
+# Выбор полей ответа (fields / expand)
+# -------------------------------------------------------------------
+# Поля OrganizationOut в порядке схемы
+ORGANIZATION_FIELDS = ("name", "id", "building", "phones", "activities")
+
+# Значение expand, включающее у видов деятельности дерево children
+EXPAND_ACTIVITY_CHILDREN = "activities.children"
+
+class OrganizationProjection(NamedTuple):
+    """
+    Форма ответа с организациями при выборе полей (параметры fields/expand).
+
+    По ней строятся и запрос (загружаются только нужные столбцы и связи,
+    см. app.crud.loaders), и ответ (только перечисленные поля, см. app.serialization).
+
+    - fields — поля OrganizationOut (из ORGANIZATION_FIELDS) в порядке схемы;
+    - activity_children — выводить ли у видов деятельности дерево children.
+
+    У OrganizationGeoOut поле distance выводится всегда.
+    """
+    fields: tuple = ORGANIZATION_FIELDS
+    activity_children: bool = True
+
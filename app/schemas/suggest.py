@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import Literal
+
+"""
+Схемы (Pydantic) для подсказок автодополнения.
+"""
+
+class SuggestionOut(BaseModel):
+    """Подсказка: kind — вид объекта (organization или activity), id и название."""
+    kind: Literal["organization", "activity"]
+    id: int
+    name: str
@@ -0,0 +1,257 @@
+import functools
+import time
+from datetime import datetime
+from typing import List, get_args, get_origin
+
+import orjson
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.schemas.activity import ActivityOut, ActivityFlatOut
+from app.schemas.building import BuildingOut, BuildingGeoOut
+from app.schemas.organizations import OrganizationOut, OrganizationGeoOut, OrganizationProjection, PhoneOut
+from app.schemas.changes import ChangeOut
+from app.models.documents import OrganizationDocument
+from app.metrics import record_serialization
+
+"""
+Быстрая сериализация ответов API в JSON.
+
+Обычный путь FastAPI для response_model — проверка каждой строки через
+Pydantic (from_attributes, с вложенными BuildingOut, PhoneOut и рекурсивным
+ActivityOut) и затем кодирование в JSON. Для больших списков проверка
+занимает большую часть времени ответа, хотя данные из БД в ней не нуждаются.
+
+Для схем ответа, перечисленных в _ROW_SERIALIZERS, строки собираются в
+словари напрямую из атрибутов ORM-объектов (или строк SQL-запроса с теми же
+полями) в порядке полей схемы и кодируются orjson — результат побайтно
+совпадает с ответом Pydantic. Остальные схемы сериализуются заранее
+созданным TypeAdapter (без повторного построения схемы на каждый запрос).
+
+Организации из денормализованной таблицы organization_documents (режим
+чтения ORGANIZATION_DOCUMENTS=read, см. app.crud.documents) уже хранят JSON
+ответа: полный ответ склеивается из готовых байтов без разбора и повторного
+кодирования, разбираются только документы для ответов с выбором полей.
+
+Замер: python -m benchmarks.serialization.
+"""
+
+
+def _building(building, memo: dict) -> dict:
+    return {
+        "address": building.address,
+        "latitude": float(building.latitude),
+        "longitude": float(building.longitude),
+        "id": building.id,
+    }
+
+
+def _building_geo(building, memo: dict) -> dict:
+    row = _building(building, memo)
+    row["distance"] = float(building.distance)
+    return row
+
+
+def _phone(phone, memo: dict) -> dict:
+    return {"phone": phone.phone, "id": phone.id}
+
+
+def _activity(activity, memo: dict) -> dict:
+    # Дерево из assemble_activity_tree уже состоит из словарей нужной формы
+    if isinstance(activity, dict):
+        return activity
+    # Один и тот же вид деятельности (с поддеревом) встречается у многих организаций
+    # выборки: identity map сессии отдаёт один объект, его словарь собирается один раз
+    row = memo.get(id(activity))
+    if row is None:
+        row = memo[id(activity)] = {
+            "id": activity.id,
+            "name": activity.name,
+            "parent_id": activity.parent_id,
+            "level": activity.level,
+            "children": [_activity(child, memo) for child in activity.children],
+        }
+    return row
+
+
+def _organization(org, memo: dict) -> dict:
+    building = org.building
+    return {
+        "name": org.name,
+        "id": org.id,
+        "building": _building(building, memo) if building is not None else None,
+        "phones": [_phone(phone, memo) for phone in org.phones],
+        "activities": [_activity(activity, memo) for activity in org.activities],
+    }
+
+
+def _organization_geo(org, memo: dict) -> dict:
+    row = _organization(org, memo)
+    row["distance"] = float(org.distance)
+    return row
+
+
+def _activity_flat(activity, memo: dict) -> dict:
+    return {"id": activity.id, "name": activity.name, "parent_id": activity.parent_id, "level": activity.level}
+
+
+# Таблица журнала изменений -> функция сериализации текущего состояния строки
+_CHANGE_DATA_SERIALIZERS = {
+    "organizations": _organization,
+    "buildings": _building,
+    "activities": _activity_flat,
+}
+
+
+def _utc_isoformat(value: datetime) -> str:
+    # Как Pydantic для ChangeOut.changed_at: время в UTC с суффиксом Z (orjson пишет +00:00)
+    return ChangeOut.to_utc(value).isoformat().replace("+00:00", "Z")
+
+
+def _change(change, memo: dict) -> dict:
+    # change — пара (запись журнала, текущий объект строки или None), см. app.crud.changes.iter_changes
+    entry, entity = change
+    return {
+        "cursor": entry.id,
+        "table": entry.table_name,
+        "operation": entry.operation,
+        "id": entry.entity_id,
+        "version": entry.version,
+        "changed_at": _utc_isoformat(entry.changed_at),
+        "data": _CHANGE_DATA_SERIALIZERS[entry.table_name](entity, memo) if entity is not None else None,
+    }
+
+
+# Поле OrganizationOut -> функция (организация, memo) -> значение поля
+_ORGANIZATION_FIELD_SERIALIZERS = {
+    "name": lambda org, memo: org.name,
+    "id": lambda org, memo: org.id,
+    "building": lambda org, memo: _building(org.building, memo) if org.building is not None else None,
+    "phones": lambda org, memo: [_phone(phone, memo) for phone in org.phones],
+}
+
+
+def _organization_projection(projection: OrganizationProjection, geo: bool):
+    """Функция сериализации организации с полями проекции (и distance для OrganizationGeoOut)."""
+    activity = _activity if projection.activity_children else _activity_flat
+    getters = dict(_ORGANIZATION_FIELD_SERIALIZERS)
+    getters["activities"] = lambda org, memo: [activity(a, memo) for a in org.activities]
+    if geo:
+        getters["distance"] = lambda org, memo: float(org.distance)
+    fields = [(name, getters[name]) for name in (*projection.fields, *(("distance",) if geo else ()))]
+
+    def row(org, memo: dict) -> dict:
+        return {name: getter(org, memo) for name, getter in fields}
+    return row
+
+
+def _document_projection(data: dict, projection: OrganizationProjection) -> dict:
+    """Поля проекции из разобранного документа организации (в порядке схемы)."""
+    row = {name: data[name] for name in projection.fields}
+    if "activities" in row and not projection.activity_children:
+        row["activities"] = [{key: activity[key] for key in ("id", "name", "parent_id", "level")}
+                             for activity in row["activities"]]
+    return row
+
+
+def _document_json(doc, projection: OrganizationProjection, geo: bool) -> bytes:
+    """JSON организации из документа (OrganizationDocument) — без сборки из связанных таблиц."""
+    if projection is None:
+        # bytes(): psycopg2 возвращает bytea как memoryview
+        body = bytes(doc.document)
+        if geo:
+            body = body[:-1] + b',"distance":' + orjson.dumps(float(doc.distance)) + b"}"
+        return body
+    row = _document_projection(orjson.loads(doc.document), projection)
+    if geo:
+        row["distance"] = float(doc.distance)
+    return orjson.dumps(row)
+
+
+# Схема ответа -> функция (объект, memo) -> словарь одной строки в порядке полей схемы;
+# memo — общий для всего ответа словарь уже собранных видов деятельности
+_ROW_SERIALIZERS = {
+    OrganizationOut: _organization,
+    OrganizationGeoOut: _organization_geo,
+    BuildingOut: _building,
+    BuildingGeoOut: _building_geo,
+    PhoneOut: _phone,
+    ActivityOut: _activity,
+    ActivityFlatOut: _activity_flat,
+    ChangeOut: _change,
+}
+
+
+def _row_serializer(schema, projection: OrganizationProjection = None):
+    if projection is not None and schema in (OrganizationOut, OrganizationGeoOut):
+        return _organization_projection(projection, geo=schema is OrganizationGeoOut)
+    return _ROW_SERIALIZERS.get(schema)
+
+
+@functools.lru_cache(maxsize=None)
+def get_serializer(response_model, projection: OrganizationProjection = None):
+    """
+    Возвращает функцию сериализации ответа для схемы.
+
+    Поддерживаются схемы из _ROW_SERIALIZERS и списки из них (List[Schema]);
+    для остальных схем используется TypeAdapter, созданный один раз.
+    Проекция (выбор полей) применяется к OrganizationOut и OrganizationGeoOut.
+
+    Returns:
+        Callable: функция (результат эндпоинта) -> bytes (JSON)
+    """
+    if get_origin(response_model) in (list, List):
+        (item_model,) = get_args(response_model)
+        row = _row_serializer(item_model, projection)
+        if row is not None:
+            geo = item_model is OrganizationGeoOut
+            documents = geo or item_model is OrganizationOut
+
+            def serialize_list(items):
+                # В режиме чтения из organization_documents все организации выборки — документы
+                if documents and items and isinstance(items[0], OrganizationDocument):
+                    return b"[" + b",".join(_document_json(item, projection, geo) for item in items) + b"]"
+                memo = {}
+                return orjson.dumps([row(item, memo) for item in items])
+            return serialize_list
+    else:
+        row = _row_serializer(response_model, projection)
+        if row is not None:
+            return lambda item: _dump_row(response_model, row, item, projection)
+    adapter = TypeAdapter(response_model)
+    return lambda result: adapter.dump_json(adapter.validate_python(result, from_attributes=True))
+
+
+def _dump_row(schema, row, obj, projection: OrganizationProjection = None) -> bytes:
+    if isinstance(obj, OrganizationDocument) and schema in (OrganizationOut, OrganizationGeoOut):
+        return _document_json(obj, projection, geo=schema is OrganizationGeoOut)
+    return orjson.dumps(row(obj, {}))
+
+
+def dump_json(response_model, result, projection: OrganizationProjection = None) -> bytes:
+    """
+    Сериализует результат эндпоинта в JSON по схеме ответа (и проекции, если она указана).
+
+    Время сериализации учитывается в метриках запроса (app.metrics).
+    """
+    start = time.perf_counter()
+    body = get_serializer(response_model, projection)(result)
+    record_serialization(time.perf_counter() - start)
+    return body
+
+
+def dump_row(schema, obj, projection: OrganizationProjection = None) -> bytes:
+    """Сериализует одну запись (например, для NDJSON) по схеме."""
+    row = _row_serializer(schema, projection)
+    if row is not None:
+        return _dump_row(schema, row, obj, projection)
+    return schema.model_validate(obj).model_dump_json().encode()
+
+
+def json_response(response_model, result, headers: dict = None) -> Response:
+    """
+    Готовый JSON-ответ, минуя проверку по response_model в FastAPI.
+
+    Схема маршрута (response_model) при этом остаётся в OpenAPI.
+    """
+    return Response(content=dump_json(response_model, result), media_type="application/json", headers=headers)
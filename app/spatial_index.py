@@ -0,0 +1,282 @@
+import heapq
+import math
+import os
+import threading
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.geo import EARTH_RADIUS_M
+from app.index_sync import ChangeFollower
+from app.models.building import Building
+
+"""
+In-memory пространственный индекс зданий (KD-дерево) для поиска ближайших.
+
+Координаты хранятся как точки на единичной сфере (x, y, z): евклидово
+расстояние между ними (хорда) монотонно связано с расстоянием по большому
+кругу, поэтому поиск корректен по всему земному шару, включая полюса
+и 180-й меридиан.
+
+Дерево «упаковано»: точки переупорядочены так, что каждый узел занимает
+непрерывный отрезок массивов, а для внутренних узлов хранятся только ось
+и значение разбиения (нумерация как у двоичной кучи). Листья обрабатываются
+векторно средствами NumPy.
+
+Индекс включается переменной окружения SPATIAL_INDEX_ENABLED, загружается
+при старте приложения и пополняется в create_building. Новые здания сначала
+попадают в небольшой буфер, который просматривается линейно и периодически
+вливается в дерево перестроением. Каждый процесс (воркер uvicorn) держит
+собственную копию индекса: здания, созданные другим воркером, поиск
+подхватывает не позже чем через SPATIAL_INDEX_CHECK_INTERVAL секунд
+по версии "buildings" и журналу изменений (см. app.index_sync).
+"""
+
+SPATIAL_INDEX_ENABLED = os.getenv("SPATIAL_INDEX_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Как часто (в секундах) сверять версию "buildings" с БД, чтобы подхватить здания других процессов
+SPATIAL_INDEX_CHECK_INTERVAL = float(os.getenv("SPATIAL_INDEX_CHECK_INTERVAL", "1.0"))
+
+VERSION_NAME = "buildings"
+
+# Зданий на один запрос при подгрузке изменений других процессов
+REFRESH_BATCH_SIZE = 10_000
+
+# Максимальное количество точек в листе дерева
+LEAF_SIZE = 32
+
+# Минимальный размер буфера новых точек, после которого дерево перестраивается
+PENDING_REBUILD_MIN = 1024
+
+
+def to_unit_vectors(latitudes, longitudes):
+    """Переводит массивы широт и долгот (в градусах) в точки единичной сферы, shape (n, 3)."""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def meters_to_chord2(distance_m: float) -> float:
+    """Квадрат длины хорды единичной сферы, соответствующей расстоянию по поверхности."""
+    angle = min(distance_m / EARTH_RADIUS_M, math.pi)
+    return (2 * math.sin(angle / 2)) ** 2
+
+
+def chord2_to_meters(chord2: float) -> float:
+    """Обратное преобразование: квадрат хорды -> расстояние по поверхности в метрах."""
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(chord2) / 2))
+
+
+class _Tree:
+    """Неизменяемый снимок упакованного KD-дерева."""
+
+    def __init__(self, ids, points):
+        n = len(ids)
+        depth = max(0, math.ceil(math.log2(n / LEAF_SIZE))) if n else 0
+        self.n_internal = (1 << depth) - 1
+        self.split_dim = np.zeros(max(self.n_internal, 1), dtype=np.int8)
+        self.split_val = np.zeros(max(self.n_internal, 1), dtype=np.float64)
+
+        perm = np.arange(n)
+        stack = [(0, 0, n)]
+        while stack:
+            node, lo, hi = stack.pop()
+            if node >= self.n_internal or hi - lo < 2:
+                continue
+            segment = perm[lo:hi]
+            coords = points[segment]
+            dim = int(np.argmax(coords.max(axis=0) - coords.min(axis=0)))
+            mid = (lo + hi) // 2
+            order = np.argpartition(coords[:, dim], mid - lo)
+            perm[lo:hi] = segment[order]
+            self.split_dim[node] = dim
+            self.split_val[node] = points[perm[mid], dim]
+            stack.append((2 * node + 1, lo, mid))
+            stack.append((2 * node + 2, mid, hi))
+
+        self.ids = np.asarray(ids, dtype=np.int64)[perm]
+        self.points = points[perm]
+        # Для проверки, есть ли здание в дереве (двоичным поиском)
+        self.sorted_ids = np.sort(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def contains(self, ids):
+        """Маска: какие из ids есть в дереве."""
+        if not len(self.sorted_ids):
+            return np.zeros(len(ids), dtype=bool)
+        positions = np.minimum(np.searchsorted(self.sorted_ids, ids), len(self.sorted_ids) - 1)
+        return self.sorted_ids[positions] == ids
+
+    def nearest(self, query, k: int, max_chord2: float):
+        """k ближайших точек: список (квадрат хорды, id), не дальше max_chord2."""
+        best = []  # max-heap по расстоянию: (-chord2, id)
+        worst = max_chord2
+        heap = [(0.0, 0, 0, len(self.ids))]
+        while heap:
+            bound, node, lo, hi = heapq.heappop(heap)
+            if bound > worst:
+                break
+            if node >= self.n_internal or hi - lo < 2:
+                d2 = ((self.points[lo:hi] - query) ** 2).sum(axis=1)
+                for i in np.flatnonzero(d2 <= worst):
+                    item = (-float(d2[i]), int(self.ids[lo + i]))
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    elif item > best[0]:
+                        heapq.heapreplace(best, item)
+                    if len(best) == k:
+                        worst = -best[0][0]
+                continue
+            mid = (lo + hi) // 2
+            diff = query[self.split_dim[node]] - self.split_val[node]
+            near, far = ((2 * node + 1, lo, mid), (2 * node + 2, mid, hi)) if diff <= 0 else ((2 * node + 2, mid, hi), (2 * node + 1, lo, mid))
+            heapq.heappush(heap, (bound, *near))
+            heapq.heappush(heap, (max(bound, float(diff * diff)), *far))
+        return [(-d2, building_id) for d2, building_id in best]
+
+    def within(self, query, max_chord2: float):
+        """Все точки не дальше max_chord2: список (квадрат хорды, id)."""
+        found = []
+        stack = [(0.0, 0, 0, len(self.ids))]
+        while stack:
+            bound, node, lo, hi = stack.pop()
+            if bound > max_chord2:
+                continue
+            if node >= self.n_internal or hi - lo < 2:
+                d2 = ((self.points[lo:hi] - query) ** 2).sum(axis=1)
+                mask = np.flatnonzero(d2 <= max_chord2)
+                found.extend(zip(d2[mask].tolist(), self.ids[lo + mask].tolist()))
+                continue
+            mid = (lo + hi) // 2
+            diff = query[self.split_dim[node]] - self.split_val[node]
+            left_bound = max(bound, float(diff * diff)) if diff > 0 else bound
+            right_bound = max(bound, float(diff * diff)) if diff <= 0 else bound
+            stack.append((left_bound, 2 * node + 1, lo, mid))
+            stack.append((right_bound, 2 * node + 2, mid, hi))
+        return found
+
+
+class BuildingSpatialIndex:
+    """
+    Пространственный индекс зданий, общий для всех запросов процесса.
+
+    Состояние (дерево + буфер новых точек) хранится одним неизменяемым
+    кортежем: чтение идёт без блокировок по снимку, а добавление и
+    перестроение заменяют снимок целиком под блокировкой.
+    """
+
+    def __init__(self, check_interval: float = SPATIAL_INDEX_CHECK_INTERVAL):
+        self._lock = threading.Lock()
+        self._state = None
+        self._changes = ChangeFollower(VERSION_NAME, check_interval)
+
+    @staticmethod
+    def _empty_pending():
+        return np.empty(0, dtype=np.int64), np.empty((0, 3), dtype=np.float64)
+
+    @property
+    def ready(self) -> bool:
+        """Загружен ли индекс (если нет — запросы обслуживаются через БД)."""
+        return self._state is not None
+
+    def __len__(self):
+        if self._state is None:
+            return 0
+        tree, pending_ids, _ = self._state
+        return len(tree) + len(pending_ids)
+
+    def build(self, ids, latitudes, longitudes):
+        """Строит индекс заново по массивам id, широт и долгот."""
+        tree = _Tree(ids, to_unit_vectors(latitudes, longitudes))
+        with self._lock:
+            self._state = (tree, *self._empty_pending())
+
+    def load(self, db: Session):
+        """Загружает координаты всех зданий из БД и строит индекс."""
+        self._changes.start(db)
+        rows = db.query(Building.id, Building.latitude, Building.longitude).all()
+        ids, latitudes, longitudes = zip(*rows) if rows else ((), (), ())
+        self.build(ids, latitudes, longitudes)
+
+    def add(self, building_id: int, latitude: float, longitude: float):
+        """Добавляет здание в индекс (если индекс загружен), см. add_many."""
+        self.add_many([(building_id, latitude, longitude)])
+
+    def add_many(self, rows):
+        """
+        Добавляет здания — тройки (id, широта, долгота) — в индекс (если индекс загружен).
+        Здания, которые уже есть в индексе, пропускаются.
+
+        Точки попадают в буфер; когда буфер становится больше 1/64 размера
+        дерева (но не меньше PENDING_REBUILD_MIN), дерево перестраивается.
+        """
+        if self._state is None or not rows:
+            return
+        ids, latitudes, longitudes = zip(*rows)
+        ids = np.asarray(ids, dtype=np.int64)
+        points = to_unit_vectors(latitudes, longitudes)
+        with self._lock:
+            tree, pending_ids, pending_points = self._state
+            new = ~(tree.contains(ids) | np.isin(ids, pending_ids))
+            if not new.any():
+                return
+            pending_ids = np.concatenate((pending_ids, ids[new]))
+            pending_points = np.vstack((pending_points, points[new]))
+            if len(pending_ids) >= max(PENDING_REBUILD_MIN, len(tree) // 64):
+                tree = _Tree(np.concatenate((tree.ids, pending_ids)), np.vstack((tree.points, pending_points)))
+                pending_ids, pending_points = self._empty_pending()
+            self._state = (tree, pending_ids, pending_points)
+
+    def refresh(self, db: Session):
+        """
+        Добавляет здания, созданные другими процессами, если пора сверить
+        версию "buildings" с БД (см. app.index_sync). Вызывается перед поиском.
+        """
+        if self._state is None or not self._changes.due:
+            return
+        ids = self._changes.changed_ids(db)
+        for start in range(0, len(ids), REFRESH_BATCH_SIZE):
+            chunk = ids[start:start + REFRESH_BATCH_SIZE]
+            self.add_many(db.query(Building.id, Building.latitude, Building.longitude).filter(Building.id.in_(chunk)).all())
+
+    def _search(self, latitude: float, longitude: float, max_chord2: float, k: int = None):
+        tree, pending_ids, pending_points = self._state
+        query = to_unit_vectors([latitude], [longitude])[0]
+        found = tree.nearest(query, k, max_chord2) if k is not None else tree.within(query, max_chord2)
+        if len(pending_ids):
+            d2 = ((pending_points - query) ** 2).sum(axis=1)
+            mask = np.flatnonzero(d2 <= max_chord2)
+            found.extend(zip(d2[mask].tolist(), pending_ids[mask].tolist()))
+        found.sort()
+        if k is not None:
+            found = found[:k]
+        return [(chord2_to_meters(d2), building_id) for d2, building_id in found]
+
+    def nearest(self, latitude: float, longitude: float, k: int, radius_m: float = None):
+        """
+        Возвращает k ближайших к точке зданий.
+
+        Args:
+            radius_m (float, optional): ограничение по расстоянию, метры
+
+        Returns:
+            list: пары (расстояние в метрах, id здания), ближайшие — первыми
+        """
+        max_chord2 = meters_to_chord2(radius_m) if radius_m is not None else 4.0
+        return self._search(latitude, longitude, max_chord2, k)
+
+    def within(self, latitude: float, longitude: float, radius_m: float):
+        """
+        Возвращает все здания в радиусе radius_m метров от точки.
+
+        Returns:
+            list: пары (расстояние в метрах, id здания), ближайшие — первыми
+        """
+        return self._search(latitude, longitude, meters_to_chord2(radius_m))
+
+
+# Общий экземпляр индекса процесса
+building_index = BuildingSpatialIndex()
@@ -0,0 +1,47 @@
+from fastapi.responses import StreamingResponse
+from app.database import ReadSessionLocal
+from app.serialization import dump_row
+
+"""
+Потоковая выдача больших списков в формате NDJSON (одна JSON-запись на строку).
+
+Записи читаются из серверного курсора пачками (yield_per) и сериализуются
+по мере чтения, поэтому в памяти одновременно находится не больше одной пачки.
+"""
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Размер пачки, читаемой из курсора БД за один раз
+STREAM_BATCH_SIZE = 500
+
+def ndjson_response(iter_factory, schema, batch_size: int = STREAM_BATCH_SIZE, projection=None):
+    """
+    Создаёт потоковый ответ NDJSON.
+
+    Для выгрузки открывается отдельная сессия: она живёт, пока ответ
+    не будет отправлен полностью, независимо от сессии запроса (get_read_db).
+
+    Args:
+        iter_factory: функция (db, batch_size) -> итератор ORM-объектов
+        schema: Pydantic-схема одной записи (сериализация — app.serialization.dump_row)
+        batch_size (int): размер пачки чтения из БД
+        projection (OrganizationProjection, optional): выбор полей записи (см. app.serialization)
+
+    Returns:
+        StreamingResponse: ответ с типом application/x-ndjson
+    """
+    def generate():
+        db = ReadSessionLocal()
+        try:
+            chunk = []
+            for obj in iter_factory(db, batch_size):
+                chunk.append(dump_row(schema, obj, projection))
+                if len(chunk) >= batch_size:
+                    yield b"\n".join(chunk) + b"\n"
+                    chunk = []
+            if chunk:
+                yield b"\n".join(chunk) + b"\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,271 @@
+import os
+import threading
+from array import array
+from bisect import bisect_left, insort
+
+from sqlalchemy.orm import Session
+
+from app.index_sync import ChangeFollower
+from app.models.organizations import Organization
+from app.models.activity import Activity
+
+"""
+In-memory индекс подсказок (автодополнения) по названиям организаций и видов деятельности.
+
+Для каждого названия хранится нормализованная строка (нижний регистр, одиночные
+пробелы) и отсортированные массивы «суффиксов», начинающихся с начала слова.
+Суффикс кодируется одним 64-битным числом (номер названия << 8 | смещение),
+поэтому на каждое слово приходится 8 байт, а строки суффиксов не создаются:
+bisect сравнивает срезы нормализованных названий. Поиск по префиксу —
+два двоичных поиска и просмотр первых совпадений, O(log n + k).
+
+Совпадения с начала названия идут раньше совпадений с начала следующих слов,
+внутри каждой группы — в алфавитном порядке. Одинаковые названия
+показываются один раз.
+
+Индекс включается переменной окружения SUGGEST_INDEX_ENABLED (по умолчанию
+включён), строится при старте приложения и пополняется в create_organization,
+create_activity и при массовой загрузке. Как и в app.spatial_index, новые
+названия попадают в небольшой буфер, который периодически вливается в
+основные массивы перестроением, а каждый процесс держит свою копию индекса:
+названия, добавленные другими воркерами, подхватываются не позже чем через
+SUGGEST_INDEX_CHECK_INTERVAL секунд по версиям "organizations" и "activities"
+и журналу изменений (см. app.index_sync).
+
+Память (benchmarks/suggest.py, CPython 3.11, кириллические названия из трёх
+слов, в среднем 20 символов): около 265 МБ на миллион названий, ~280 байт
+на название — почти всё занимают две строки (исходное название для ответа
+и нормализованное для сравнения), плюс 8 байт на слово и 16 байт на id
+(в порядке названий и отсортированный — для проверки, есть ли id в индексе).
+Построение по миллиону названий — около 8 с, поиск — p99 ~0.15 мс.
+"""
+
+SUGGEST_INDEX_ENABLED = os.getenv("SUGGEST_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Как часто (в секундах) сверять версии с БД, чтобы подхватить названия других процессов
+SUGGEST_INDEX_CHECK_INTERVAL = float(os.getenv("SUGGEST_INDEX_CHECK_INTERVAL", "1.0"))
+
+# Строк на один запрос при подгрузке изменений других процессов
+REFRESH_BATCH_SIZE = 10_000
+
+# Минимальный размер буфера новых названий, после которого массивы перестраиваются
+PENDING_REBUILD_MIN = 1024
+
+# Названия длиннее этого (в символах) индексируются по первым MAX_NAME_LENGTH символам
+MAX_NAME_LENGTH = 255
+
+# Наибольший символ Unicode: prefix + _MAX_CHAR больше любой строки, начинающейся с prefix
+_MAX_CHAR = chr(0x10FFFF)
+
+
+def normalize(value: str) -> str:
+    """Приводит строку к виду для сравнения: нижний регистр, одиночные пробелы."""
+    return " ".join(value.casefold().split())[:MAX_NAME_LENGTH]
+
+
+class PrefixIndex:
+    """
+    Индекс подсказок для одного вида объектов (организаций или видов деятельности).
+
+    Состояние (списки названий, отсортированные массивы суффиксов и буфер)
+    хранится одним кортежем: поиск идёт без блокировок по снимку, добавление
+    и перестроение заменяют снимок под блокировкой. Списки названий только
+    пополняются, поэтому старые снимки остаются согласованными.
+
+    Для проверки, есть ли id в индексе, хранятся отсортированный массив id,
+    известных при построении, и множество id, добавленных после него.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._lock = threading.Lock()
+        self._state = None
+        self._sorted_ids = array("q")
+        self._added_ids = set()
+
+    @property
+    def ready(self) -> bool:
+        return self._state is not None
+
+    def __len__(self):
+        return len(self._state[0]) if self._state is not None else 0
+
+    @staticmethod
+    def _sort_key(norms):
+        return lambda entry: norms[entry >> 8][entry & 0xFF:]
+
+    @staticmethod
+    def _append(ids, names, norms, item_id: int, name: str):
+        """Добавляет название; возвращает суффикс с начала названия и суффиксы следующих слов."""
+        ref = len(ids)
+        norm = normalize(name)
+        ids.append(item_id)
+        names.append(name)
+        norms.append(norm)
+        return ref << 8, [ref << 8 | (i + 1) for i, char in enumerate(norm) if char == " "]
+
+    def build(self, rows):
+        """Строит индекс заново по парам (id, название)."""
+        ids, names, norms = array("q"), [], []
+        starts, words = [], []
+        for item_id, name in rows:
+            start, rest = self._append(ids, names, norms, item_id, name)
+            starts.append(start)
+            words.extend(rest)
+        key = self._sort_key(norms)
+        starts.sort(key=key)
+        words.sort(key=key)
+        with self._lock:
+            self._state = (ids, names, norms, array("Q", starts), array("Q", words), (), ())
+            self._sorted_ids = array("q", sorted(ids))
+            self._added_ids = set()
+
+    def _contains(self, item_id: int) -> bool:
+        position = bisect_left(self._sorted_ids, item_id)
+        found = position < len(self._sorted_ids) and self._sorted_ids[position] == item_id
+        return found or item_id in self._added_ids
+
+    def add(self, rows):
+        """
+        Добавляет пары (id, название) в индекс (если индекс построен).
+        id, которые уже есть в индексе, пропускаются.
+
+        Суффиксы попадают в буфер; когда буфер становится больше 1/64 размера
+        индекса (но не меньше PENDING_REBUILD_MIN), массивы перестраиваются.
+        """
+        if self._state is None:
+            return
+        with self._lock:
+            ids, names, norms, starts, words, pending_starts, pending_words = self._state
+            key = self._sort_key(norms)
+            pending_starts = list(pending_starts)
+            pending_words = list(pending_words)
+            for item_id, name in rows:
+                if self._contains(item_id):
+                    continue
+                self._added_ids.add(item_id)
+                start, rest = self._append(ids, names, norms, item_id, name)
+                insort(pending_starts, start, key=key)
+                for entry in rest:
+                    insort(pending_words, entry, key=key)
+            if len(pending_starts) >= max(PENDING_REBUILD_MIN, len(starts) // 64):
+                starts = array("Q", sorted([*starts, *pending_starts], key=key))
+                words = array("Q", sorted([*words, *pending_words], key=key))
+                pending_starts, pending_words = [], []
+            self._state = (ids, names, norms, starts, words, tuple(pending_starts), tuple(pending_words))
+
+    def suggest(self, prefix: str, limit: int):
+        """
+        Возвращает до limit подсказок для нормализованного префикса.
+
+        Returns:
+            list: тройки (признак совпадения с начала названия, id, название)
+        """
+        ids, names, norms, starts, words, pending_starts, pending_words = self._state
+        key = self._sort_key(norms)
+        result, seen = [], set()
+        for from_start, base, pending in ((True, starts, pending_starts), (False, words, pending_words)):
+            merged = sorted([*self._first(base, prefix, limit, key), *self._first(pending, prefix, limit, key)], key=key)
+            for entry in merged:
+                ref = entry >> 8
+                if norms[ref] in seen:
+                    continue
+                seen.add(norms[ref])
+                result.append((from_start, ids[ref], names[ref]))
+                if len(result) == limit:
+                    return result
+        return result
+
+    @staticmethod
+    def _first(entries, prefix: str, limit: int, key):
+        """Первые (в алфавитном порядке) суффиксы, начинающиеся с prefix, — не больше limit различных названий."""
+        lo = bisect_left(entries, prefix, key=key)
+        hi = bisect_left(entries, prefix + _MAX_CHAR, lo=lo, key=key)
+        found, names = [], set()
+        for i in range(lo, hi):
+            name = key(entries[i] & ~0xFF)
+            if name in names:
+                continue
+            names.add(name)
+            found.append(entries[i])
+            if len(found) == limit:
+                break
+        return found
+
+
+class SuggestIndex:
+    """Подсказки по организациям и видам деятельности, общие для всех запросов процесса."""
+
+    def __init__(self, check_interval: float = SUGGEST_INDEX_CHECK_INTERVAL):
+        self.organizations = PrefixIndex("organization")
+        self.activities = PrefixIndex("activity")
+        # Индекс, модель и позиция в журнале изменений её таблицы
+        self._sources = (
+            (self.organizations, Organization, ChangeFollower("organizations", check_interval)),
+            (self.activities, Activity, ChangeFollower("activities", check_interval)),
+        )
+
+    @property
+    def ready(self) -> bool:
+        return self.organizations.ready and self.activities.ready
+
+    @property
+    def refresh_due(self) -> bool:
+        """Пора ли сверить индекс с БД (см. refresh)."""
+        return any(changes.due for _, _, changes in self._sources)
+
+    def load(self, db: Session):
+        """Загружает названия организаций и видов деятельности из БД и строит индекс."""
+        for _, _, changes in self._sources:
+            changes.start(db)
+        self.organizations.build(db.query(Organization.id, Organization.name).yield_per(10_000))
+        self.activities.build(db.query(Activity.id, Activity.name).all())
+
+    def refresh(self, db: Session):
+        """
+        Добавляет организации и виды деятельности, созданные другими процессами,
+        если пора сверить версии с БД (см. app.index_sync).
+        """
+        for index, model, changes in self._sources:
+            if not index.ready or not changes.due:
+                continue
+            ids = changes.changed_ids(db)
+            for start in range(0, len(ids), REFRESH_BATCH_SIZE):
+                chunk = ids[start:start + REFRESH_BATCH_SIZE]
+                index.add(db.query(model.id, model.name).filter(model.id.in_(chunk)).order_by(model.id).all())
+
+    def add_organizations(self, rows):
+        """Добавляет организации: пары (id, название)."""
+        self.organizations.add(rows)
+
+    def add_activities(self, rows):
+        """Добавляет виды деятельности: пары (id, название)."""
+        self.activities.add(rows)
+
+    def suggest(self, prefix: str, limit: int = 10, kind: str = None):
+        """
+        Возвращает до limit подсказок по префиксу.
+
+        Сначала идут совпадения с начала названия, затем с начала других слов,
+        внутри каждой группы — по алфавиту.
+
+        Args:
+            kind (str, optional): "organization" или "activity"
+
+        Returns:
+            list: словари {"kind", "id", "name"}
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        found = []
+        for index in (self.activities, self.organizations):
+            if kind in (None, index.kind):
+                found.extend((not from_start, normalize(name), index.kind, item_id, name)
+                             for from_start, item_id, name in index.suggest(prefix, limit))
+        found.sort(key=lambda item: item[:2])
+        return [{"kind": kind_, "id": item_id, "name": name} for _, _, kind_, item_id, name in found[:limit]]
+
+
+# Общий экземпляр индекса процесса
+suggest_index = SuggestIndex()
@@ -0,0 +1,119 @@
+"""
+Бенчмарк поиска организаций по виду деятельности с учётом иерархии.
+
+Сравнивает прежнюю реализацию (рекурсивный обход `children`/`parent` через
+ленивые связи, по запросу на узел) с запросом по таблице замыкания
+activity_closure на широком дереве из трёх уровней.
+
+Запуск:
+    python -m benchmarks.activity_closure --roots 20 --width 15 --organizations 20000
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, event, insert, func
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import building, organizations, activity  # noqa: F401 — регистрация моделей
+from app.models.activity import Activity, activity_closure
+from app.models.organizations import Organization, organization_activity
+from app.crud.organizations import get_organizations_by_activity_name
+
+
+def legacy_organizations_by_activity_name(db, activity_name: str):
+    """Реализация до появления activity_closure (для сравнения)."""
+    act = db.query(Activity).filter(func.lower(Activity.name) == activity_name.lower()).first()
+    if not act:
+        return []
+
+    def collect_children(node):
+        ids = [node.id]
+        for child in node.children:
+            ids.extend(collect_children(child))
+        return ids
+
+    def collect_parents(node):
+        if node.parent:
+            return [node.parent.id] + collect_parents(node.parent)
+        return []
+
+    ids = set(collect_children(act) + collect_parents(act))
+    return db.query(Organization).join(Organization.activities).filter(Activity.id.in_(ids)).all()
+
+
+def seed(db, roots: int, width: int, n_orgs: int, rng: random.Random):
+    activities, closure = [], []
+    next_id = 1
+
+    def add(name, parent, level, ancestors):
+        nonlocal next_id
+        act_id = next_id
+        next_id += 1
+        activities.append({"id": act_id, "name": name, "parent_id": parent, "level": level})
+        closure.append({"ancestor_id": act_id, "descendant_id": act_id, "depth": 0})
+        for depth, ancestor in enumerate(reversed(ancestors), start=1):
+            closure.append({"ancestor_id": ancestor, "descendant_id": act_id, "depth": depth})
+        return act_id
+
+    for r in range(roots):
+        root = add(f"root {r}", None, 1, [])
+        for c in range(width):
+            child = add(f"child {r}.{c}", root, 2, [root])
+            for g in range(width):
+                add(f"leaf {r}.{c}.{g}", child, 3, [root, child])
+
+    db.execute(insert(Activity), activities)
+    db.execute(insert(activity_closure), closure)
+    db.execute(insert(Organization), [{"id": i, "name": f"org {i}"} for i in range(1, n_orgs + 1)])
+    db.execute(
+        insert(organization_activity),
+        [{"organization_id": i, "activity_id": rng.randint(1, len(activities))} for i in range(1, n_orgs + 1)],
+    )
+    db.commit()
+    return len(activities)
+
+
+def measure(engine, fn):
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    start = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    event.remove(engine, "before_cursor_execute", count)
+    return elapsed, statements[0], len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--roots", type=int, default=20)
+    parser.add_argument("--width", type=int, default=15)
+    parser.add_argument("--organizations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        total = seed(db, args.roots, args.width, args.organizations, random.Random(0))
+    print(f"видов деятельности: {total}, организаций: {args.organizations}")
+
+    for name in ("root 0", "child 0.0", "leaf 0.0.0"):
+        with Session() as db:
+            legacy = measure(engine, lambda: legacy_organizations_by_activity_name(db, name))
+        with Session() as db:
+            closure = measure(engine, lambda: get_organizations_by_activity_name(db, name)[0])
+        print(f"{name:>12}: рекурсия {legacy[0]:8.1f} мс, {legacy[1]:4} запросов, {legacy[2]} орг. | "
+              f"замыкание {closure[0]:8.1f} мс, {closure[1]:4} запросов, {closure[2]} орг.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Микробенчмарк сжатия ответов (app.compression).
+
+Сериализует N организаций (List[OrganizationOut], те же данные, что в
+benchmarks.serialization) и для каждой кодировки (gzip, brotli — если
+установлен пакет brotli) выводит размер ответа и время на запрос:
+- сжатие на каждый запрос — так CompressionMiddleware обрабатывает ответы без кэша;
+- попадание в кэш ответов с заранее сжатым вариантом — выборка готовых байтов
+  из записи кэша (app.response_cache), без повторного сжатия.
+
+Запуск:
+    python -m benchmarks.compression --organizations 10000
+"""
+import argparse
+import os
+import random
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from benchmarks.serialization import make_organizations, timed
+from app.compression import available_encodings, compress, encode_variants
+from app.response_cache import _pack, _unpack
+from app.schemas.organizations import OrganizationOut
+from app.serialization import dump_json
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--organizations", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    body = dump_json(List[OrganizationOut], make_organizations(args.organizations, random.Random(0)))
+    entry = _pack({}, body, encode_variants(body))
+    print(f"организаций: {args.organizations}, ответ без сжатия: {len(body) / 1024:.0f} КБ")
+    for encoding in available_encodings():
+        size = len(compress(body, encoding))
+        per_request = timed(lambda: compress(body, encoding), args.repeat)
+        cached = timed(lambda: _unpack(entry, encoding), args.repeat)
+        print(f"{encoding:>6}: {size / 1024:8.0f} КБ ({size / len(body):5.1%}), "
+              f"сжатие на запрос {per_request:7.1f} мс, из кэша {cached:6.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
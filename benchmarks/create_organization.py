@@ -0,0 +1,110 @@
+"""
+Бенчмарк создания организаций по одной (POST /organizations/).
+
+Сравнивает прежнюю реализацию create_organization (ORM: запрос видов
+деятельности, добавление организации с телефонами через unit of work, коммит
+и повторное чтение организации со всеми связями) с текущей (проверка здания
+и видов деятельности одним запросом, INSERT ... RETURNING, многострочные
+INSERT телефонов и связей, ответ без повторного чтения).
+
+БД (SQLite-файл по умолчанию) заполняется benchmarks.datagen; каждая
+организация создаётся в отдельной сессии, как в запросе API. Выводятся
+созданий в секунду и SQL-запросов на создание.
+
+Запуск:
+    python -m benchmarks.create_organization --creates 2000 --phones 2 --activities 3
+"""
+import argparse
+import os
+import random
+import time
+
+DEFAULT_DATABASE_URL = "sqlite:////tmp/orgs_bench_create.sqlite"
+os.environ.setdefault("DATABASE_URL", DEFAULT_DATABASE_URL)
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.datagen import DatasetSpec, create_dataset
+from app.models.organizations import Organization, OrganizationPhone
+from app.models.activity import Activity
+from app.schemas.organizations import OrganizationCreate
+from app.crud.organizations import create_organization, get_organization_by_id
+from app.response_cache import response_cache
+from app.suggest_index import suggest_index
+
+
+def legacy_create_organization(db, org_in: OrganizationCreate):
+    """Реализация до пакетной вставки (для сравнения)."""
+    org = Organization(name=org_in.name, building_id=org_in.building_id)
+    for phone in org_in.phones:
+        org.phones.append(OrganizationPhone(phone=phone.phone))
+    if org_in.activity_ids:
+        activities = db.query(Activity).filter(Activity.id.in_(org_in.activity_ids)).all()
+        org.activities.extend(activities)
+    db.add(org)
+    db.commit()
+    suggest_index.add_organizations([(org.id, org.name)])
+    response_cache.invalidate("organizations")
+    return get_organization_by_id(db, org.id)
+
+
+def make_rows(dataset, count: int, phones: int, activities: int, label: str, rng: random.Random):
+    building_ids = [b[0] for b in dataset.buildings]
+    activity_ids = [a[0] for a in dataset.activities]
+    return [
+        OrganizationCreate(
+            name=f"ООО «Бенчмарк {label}» {i}",
+            building_id=rng.choice(building_ids),
+            phones=[{"phone": f"+7 900 {i:07d}-{k}"} for k in range(phones)],
+            activity_ids=rng.sample(activity_ids, activities),
+        )
+        for i in range(count)
+    ]
+
+
+def run(engine, Session, create, rows):
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    start = time.perf_counter()
+    for row in rows:
+        with Session() as db:
+            create(db, row)
+    elapsed = time.perf_counter() - start
+    event.remove(engine, "before_cursor_execute", count)
+    return len(rows) / elapsed, statements[0] / len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--organizations", type=int, default=10_000, help="организаций в справочнике до замера")
+    parser.add_argument("--creates", type=int, default=2000)
+    parser.add_argument("--phones", type=int, default=2, help="телефонов у создаваемой организации")
+    parser.add_argument("--activities", type=int, default=3, help="видов деятельности у создаваемой организации")
+    args = parser.parse_args()
+
+    dataset = create_dataset(args.database_url, DatasetSpec(buildings=max(1, args.organizations // 10),
+                                                            organizations=args.organizations))
+    engine = create_engine(args.database_url)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    rng = random.Random(0)
+    print(f"создаётся {args.creates} организаций: телефонов {args.phones}, видов деятельности {args.activities}")
+    results = [
+        ("прежняя (ORM + refresh)", run(engine, Session, legacy_create_organization,
+                                        make_rows(dataset, args.creates, args.phones, args.activities, "legacy", rng))),
+        ("INSERT ... RETURNING", run(engine, Session, create_organization,
+                                     make_rows(dataset, args.creates, args.phones, args.activities, "batched", rng))),
+    ]
+    baseline = results[0][1][0]
+    for label, (per_second, statements) in results:
+        print(f"{label:>24}: {per_second:8.1f} созданий/с, {statements:5.1f} SQL-запросов на создание "
+              f"({per_second / baseline:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
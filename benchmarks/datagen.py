@@ -0,0 +1,214 @@
+"""
+Детерминированный генератор синтетического справочника для бенчмарков.
+
+По параметрам DatasetSpec (количество зданий и организаций, телефонов на
+организацию, ширина и глубина дерева видов деятельности, зерно генератора
+случайных чисел) создаёт схему и заполняет БД через функции массовой загрузки
+(app.crud.bulk) — те же, что обслуживают POST .../bulk. При одинаковых
+параметрах на пустой БД получаются одинаковые строки и одинаковые id, поэтому
+результаты бенчмарков на разных запусках и ветках сравнимы.
+
+Дерево видов деятельности: activity_width корней, у каждого узла
+activity_width детей, activity_depth уровней (не больше ACTIVITY_MAX_LEVEL).
+Здания — точки в прямоугольнике вокруг центра Москвы; организация получает
+случайное здание, phones_per_org телефонов и activities_per_org видов
+деятельности любого уровня.
+
+Модули приложения импортируются внутри функций: app.database создаёт движок
+по DATABASE_URL при импорте, а вызывающий бенчмарк задаёт его позже.
+
+Запуск (пересоздаёт схему указанной БД):
+    python -m benchmarks.datagen --database-url sqlite:////tmp/orgs_bench.sqlite --organizations 100000
+"""
+import argparse
+import os
+import random
+import time
+from typing import List, NamedTuple
+
+# Прямоугольник, в котором размещаются здания: (мин. широта, макс. широта, мин. долгота, макс. долгота)
+AREA = (55.6, 55.9, 37.4, 37.8)
+
+LEGAL_FORMS = ("ООО", "АО", "ЗАО", "ИП", "ПАО")
+NAME_WORDS = (
+    "Вектор", "Меридиан", "Гранит", "Лотос", "Орион", "Прогресс", "Север", "Альфа", "Сфера", "Радуга",
+    "Березка", "Восход", "Маяк", "Кристалл", "Горизонт", "Фортуна", "Исток", "Парус", "Янтарь", "Атлант",
+)
+STREETS = ("Ленина", "Тверская", "Садовая", "Лесная", "Мира", "Победы", "Школьная", "Новая", "Полевая", "Заречная")
+
+
+class DatasetSpec(NamedTuple):
+    """Параметры синтетического справочника."""
+    buildings: int = 1000
+    organizations: int = 10000
+    phones_per_org: int = 2
+    activity_width: int = 8
+    activity_depth: int = 3
+    activities_per_org: int = 2
+    seed: int = 0
+
+
+class Dataset(NamedTuple):
+    """Созданный справочник: id и значения, из которых бенчмарки строят параметры запросов."""
+    spec: DatasetSpec                # None, если справочник прочитан из БД (load_dataset)
+    buildings: List[tuple]           # (id, широта, долгота) по возрастанию id
+    occupied_building_ids: List[int]  # здания, в которых есть хотя бы одна организация
+    organizations: List[tuple]       # (id, название) по возрастанию id
+    activities: List[tuple]          # (id, название, уровень) по возрастанию id
+
+
+def organization_name(rng: random.Random, number: int) -> str:
+    return f"{rng.choice(LEGAL_FORMS)} «{rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)}» {number}"
+
+
+def _activity_tree(spec: DatasetSpec):
+    """Уровни дерева: список уровней, уровень — список (название, номер родителя в предыдущем уровне)."""
+    levels = [[(f"Раздел {r + 1}", None) for r in range(spec.activity_width)]]
+    for _ in range(1, spec.activity_depth):
+        parents = levels[-1]
+        levels.append([
+            (f"{name.replace('Раздел', 'Вид')}.{c + 1}", p)
+            for p, (name, _) in enumerate(parents) for c in range(spec.activity_width)
+        ])
+    return levels
+
+
+def generate(db, spec: DatasetSpec) -> Dataset:
+    """
+    Заполняет пустую БД справочником по spec.
+
+    Returns:
+        Dataset: id и значения созданных строк
+    """
+    from app.schemas.building import BuildingCreate
+    from app.schemas.activity import ActivityCreate
+    from app.schemas.organizations import OrganizationCreate
+    from app.crud.bulk import bulk_create_buildings, bulk_create_activities, bulk_create_organizations
+    from app.crud.loaders import ACTIVITY_MAX_LEVEL
+
+    if not 1 <= spec.activity_depth <= ACTIVITY_MAX_LEVEL:
+        raise ValueError(f"activity_depth должна быть от 1 до {ACTIVITY_MAX_LEVEL}")
+    rng = random.Random(spec.seed)
+    min_lat, max_lat, min_lon, max_lon = AREA
+
+    building_rows = [
+        BuildingCreate(
+            address=f"г. Москва, ул. {rng.choice(STREETS)}, д. {i + 1}",
+            latitude=round(rng.uniform(min_lat, max_lat), 6),
+            longitude=round(rng.uniform(min_lon, max_lon), 6),
+        )
+        for i in range(spec.buildings)
+    ]
+    building_ids = bulk_create_buildings(db, building_rows)["ids"]
+
+    activities, parent_ids = [], None
+    for level, rows in enumerate(_activity_tree(spec), start=1):
+        ids = bulk_create_activities(db, [
+            ActivityCreate(name=name, parent_id=parent_ids[p] if parent_ids else None) for name, p in rows
+        ])["ids"]
+        activities += [(act_id, name, level) for act_id, (name, _) in zip(ids, rows)]
+        parent_ids = ids
+    activity_ids = [act_id for act_id, _, _ in activities]
+
+    organization_rows = [
+        OrganizationCreate(
+            name=organization_name(rng, i + 1),
+            building_id=rng.choice(building_ids),
+            phones=[{"phone": f"+7 9{rng.randint(10, 99)} {rng.randint(0, 9_999_999):07d}"} for _ in range(spec.phones_per_org)],
+            activity_ids=rng.sample(activity_ids, min(spec.activities_per_org, len(activity_ids))),
+        )
+        for i in range(spec.organizations)
+    ]
+    organization_ids = bulk_create_organizations(db, organization_rows)["ids"]
+
+    return Dataset(
+        spec=spec,
+        buildings=[(b_id, row.latitude, row.longitude) for b_id, row in zip(building_ids, building_rows)],
+        occupied_building_ids=sorted({row.building_id for row in organization_rows}),
+        organizations=[(o_id, row.name) for o_id, row in zip(organization_ids, organization_rows)],
+        activities=activities,
+    )
+
+
+def create_dataset(database_url: str, spec: DatasetSpec) -> Dataset:
+    """Пересоздаёт схему БД по database_url и заполняет её справочником по spec."""
+    os.environ.setdefault("DATABASE_URL", database_url)
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.database import Base
+    from app.models import building, organizations, activity, versions, changes, documents  # noqa: F401 — регистрация моделей
+    from app.crud.search import ensure_search_index
+    from app.crud.documents import DOCUMENTS_WRITE, rebuild_documents
+
+    engine = create_engine(database_url)
+    try:
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        if engine.dialect.name == "sqlite":
+            # В PostgreSQL индексы поиска создаёт миграция
+            with engine.begin() as conn:
+                ensure_search_index(conn)
+        with sessionmaker(bind=engine)() as db:
+            dataset = generate(db, spec)
+            if DOCUMENTS_WRITE:
+                # Справочник вставляется в обход CRUD: документы собираются целиком
+                rebuild_documents(db)
+        if engine.dialect.name == "postgresql":
+            with engine.begin() as conn:
+                conn.exec_driver_sql("ANALYZE")
+        return dataset
+    finally:
+        engine.dispose()
+
+
+def load_dataset(database_url: str) -> Dataset:
+    """Читает Dataset из уже заполненной БД (spec неизвестен — None)."""
+    os.environ.setdefault("DATABASE_URL", database_url)
+    from sqlalchemy import create_engine, select
+    from app.models.building import Building
+    from app.models.activity import Activity
+    from app.models.organizations import Organization
+
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as conn:
+            return Dataset(
+                spec=None,
+                buildings=[tuple(row) for row in conn.execute(
+                    select(Building.id, Building.latitude, Building.longitude).order_by(Building.id))],
+                occupied_building_ids=list(conn.scalars(
+                    select(Organization.building_id).distinct().order_by(Organization.building_id))),
+                organizations=[tuple(row) for row in conn.execute(
+                    select(Organization.id, Organization.name).order_by(Organization.id))],
+                activities=[tuple(row) for row in conn.execute(
+                    select(Activity.id, Activity.name, Activity.level).order_by(Activity.id))],
+            )
+    finally:
+        engine.dispose()
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser):
+    """Добавляет в parser аргументы командной строки для полей DatasetSpec."""
+    defaults = DatasetSpec()
+    for field in DatasetSpec._fields:
+        parser.add_argument(f"--{field.replace('_', '-')}", type=int, default=getattr(defaults, field))
+
+
+def spec_from_args(args) -> DatasetSpec:
+    return DatasetSpec(**{field: getattr(args, field) for field in DatasetSpec._fields})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:////tmp/orgs_bench.sqlite")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    dataset = create_dataset(args.database_url, spec_from_args(args))
+    print(f"зданий: {len(dataset.buildings)}, видов деятельности: {len(dataset.activities)}, "
+          f"организаций: {len(dataset.organizations)} за {time.perf_counter() - start:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Аудит планов запросов CRUD: ни один «горячий» запрос не должен читать таблицу целиком.
+
+Скрипт заполняет БД тестовыми данными через функции массовой загрузки,
+выполняет каждую функцию CRUD из списка AUDITED, перехватывает все её SQL-запросы
+и прогоняет их через EXPLAIN:
+- SQLite — EXPLAIN QUERY PLAN, ошибкой считается строка «SCAN <таблица>»
+  (полный просмотр таблицы или индекса). ANALYZE не выполняется: без
+  статистики планировщик считает таблицы большими и выбирает индекс, если
+  он есть, — так результат не зависит от размера тестовых данных;
+- PostgreSQL — EXPLAIN (FORMAT JSON) при enable_seqscan = off, ошибкой
+  считается узел Seq Scan (планировщик выбирает его, только если подходящего
+  индекса нет).
+
+Код возврата — 1, если найден хотя бы один полный просмотр.
+
+Запуск:
+    python -m benchmarks.explain_audit
+    python -m benchmarks.explain_audit --database-url postgresql+psycopg2://... --organizations 50000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+# Кэши процесса выключены: аудит должен видеть запросы к БД
+os.environ.setdefault("ACTIVITY_CACHE_ENABLED", "false")
+os.environ.setdefault("RESPONSE_CACHE_BACKEND", "none")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import building, organizations, activity, versions, changes, documents  # noqa: F401 — регистрация моделей
+from app.schemas.building import BuildingCreate
+from app.schemas.activity import ActivityCreate
+from app.schemas.organizations import OrganizationCreate
+from app.crud.bulk import bulk_create_buildings, bulk_create_activities, bulk_create_organizations
+from app.crud import organizations as org_crud, building as building_crud, activity as activity_crud
+from app.crud.search import ensure_search_index
+
+# Функции CRUD, запросы которых проверяются: (название, функция от сессии)
+AUDITED = [
+    ("organizations.by_building", lambda db: org_crud.get_organizations_by_building(db, 7, limit=50)),
+    ("organizations.by_building (cursor)", lambda db: org_crud.get_organizations_by_building(db, 7, limit=50, cursor=100)),
+    ("organizations.by_name_activites", lambda db: org_crud.get_organizations_by_name_activites(db, "child 1.1", limit=50)),
+    ("organizations.by_coordinates", lambda db: org_crud.get_organizations_by_coordinates(db, 55.75, 37.6, limit=50)),
+    ("organizations.in_radius", lambda db: org_crud.get_organizations_in_radius(db, 55.75, 37.6, 500, limit=20)),
+    ("organizations.in_box", lambda db: org_crud.get_organizations_in_box(db, 55.74, 55.76, 37.59, 37.61, limit=20)),
+    ("organizations.nearest", lambda db: org_crud.get_nearest_organizations(db, 55.75, 37.6, 10)),
+    ("organizations.by_id", lambda db: org_crud.get_organization_by_id(db, 42)),
+    ("organizations.by_name", lambda db: org_crud.get_organization_by_name(db, "org 42")),
+    ("organizations.by_activity_name", lambda db: org_crud.get_organizations_by_activity_name(db, "child 1.1", limit=50)),
+    ("buildings.page (cursor)", lambda db: building_crud.get_buildings(db, limit=50, cursor=100)),
+    ("buildings.nearest", lambda db: building_crud.get_nearest_buildings(db, 55.75, 37.6, 10)),
+    ("activities.subtree", lambda db: activity_crud.get_activities(db, root_id=2)),
+]
+
+
+def seed(db, n_orgs: int, rng: random.Random):
+    """Заполняет БД через функции массовой загрузки: здания, дерево видов деятельности, организации."""
+    n_buildings = max(10, n_orgs // 10)
+    bulk_create_buildings(db, [
+        BuildingCreate(address=f"building {i}", latitude=rng.uniform(55.6, 55.9), longitude=rng.uniform(37.4, 37.8))
+        for i in range(n_buildings)
+    ])
+    roots = bulk_create_activities(db, [ActivityCreate(name=f"root {r}") for r in range(10)])["ids"]
+    children = bulk_create_activities(db, [
+        ActivityCreate(name=f"child {r}.{c}", parent_id=root) for r, root in enumerate(roots) for c in range(10)
+    ])["ids"]
+    leaves = bulk_create_activities(db, [
+        ActivityCreate(name=f"leaf {i}.{g}", parent_id=child) for i, child in enumerate(children) for g in range(10)
+    ])["ids"]
+    activity_ids = roots + children + leaves
+    bulk_create_organizations(db, [
+        OrganizationCreate(
+            name=f"org {i}",
+            building_id=rng.randint(1, n_buildings),
+            phones=[{"phone": f"+7 900 {i:07d}"}],
+            activity_ids=rng.sample(activity_ids, 2),
+        )
+        for i in range(n_orgs)
+    ])
+
+
+def capture(engine, fn):
+    """Выполняет fn и возвращает список выполненных ею запросов (SQL, параметры)."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def _pg_seq_scans(node):
+    if node.get("Node Type") == "Seq Scan":
+        yield f"Seq Scan on {node.get('Relation Name')}"
+    for child in node.get("Plans", []):
+        yield from _pg_seq_scans(child)
+
+
+def full_scans(conn, statement: str, parameters):
+    """Полные просмотры таблиц в плане запроса."""
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql("SET enable_seqscan = off")
+        plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return list(_pg_seq_scans(plan[0]["Plan"]))
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    details = [row[-1] for row in rows]
+    return [d for d in details if d.startswith("SCAN ") and "VIRTUAL TABLE" not in d and d != "SCAN CONSTANT ROW"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:////tmp/orgs_explain_audit.sqlite")
+    parser.add_argument("--organizations", type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        ensure_search_index(conn)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        seed(db, args.organizations, random.Random(0))
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
+
+    failures = 0
+    for name, fn in AUDITED:
+        with Session() as db:
+            statements = capture(engine, lambda: fn(db))
+        with engine.connect() as conn:
+            problems = [(statement, scans) for statement, parameters in statements
+                        if (scans := full_scans(conn, statement, parameters))]
+        status = "OK  " if not problems else "SCAN"
+        print(f"{status} {name}: запросов {len(statements)}")
+        for statement, scans in problems:
+            failures += 1
+            print(f"     {', '.join(scans)}\n     {' '.join(statement.split())[:300]}")
+    print(f"полных просмотров: {failures}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
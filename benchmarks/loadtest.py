@@ -0,0 +1,289 @@
+"""
+Нагрузочный тест: масштабирование по числу клиентов, режимам БД и воркерам uvicorn.
+
+Для каждого режима (DB_MODE=sync / async) и каждого числа воркеров uvicorn
+запускается отдельный процесс сервера, после чего выполняется развёртка по
+concurrency: на каждом уровне заданное число параллельных клиентов (httpx)
+в течение duration секунд выполняет смесь запросов MIX к эндпоинтам
+организаций, зданий, видов деятельности и подсказок. Параметры запросов
+детерминированно выбираются из справочника (сценарии benchmarks.suite).
+Кэш ответов отключается, чтобы каждый запрос доходил до БД.
+
+Для каждого уровня фиксируются пропускная способность, p50/p95/p99 и ошибки,
+а по GET /metrics/pool до и после уровня — среднее ожидание соединения
+в пулах БД и свободного потока в пуле потоков, число ошибок QueuePool
+timeout и то, был ли пул занят целиком (busy_max достиг размера пула).
+
+Точка насыщения — первый уровень, на котором рост числа клиентов почти не
+увеличивает пропускную способность (меньше SATURATION_GAIN), а задержки
+растут. Причина определяется по пулам на этом уровне: исчерпан пул
+соединений (DB_POOL_SIZE + DB_MAX_OVERFLOW, таймауты QueuePool) или пул
+потоков (THREADPOOL_SIZE); если ни один пул не был занят целиком —
+ограничивает CPU процесса (GIL) или сама БД, а рост ожидания в пулах —
+следствие общей очереди, а не его причина.
+С несколькими воркерами /metrics/pool отдаёт счётчики того воркера, который
+ответил, поэтому причина насыщения оценивается приблизительно.
+
+Запуск (SQLite создаётся и заполняется benchmarks.datagen):
+    python -m benchmarks.loadtest --seed 2000 --concurrency 1 4 16 64 --duration 10
+    python -m benchmarks.loadtest --modes sync --workers 1 2 4 --save /tmp/loadtest.json
+    python -m benchmarks.loadtest --modes sync --server-env DB_POOL_SIZE=2 DB_MAX_OVERFLOW=0
+
+Для PostgreSQL укажите --database-url postgresql+psycopg2://... (нужен asyncpg).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import secrets
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.datagen import DatasetSpec, create_dataset, load_dataset
+
+DEFAULT_DATABASE_URL = "sqlite:////tmp/orgs_loadtest.sqlite"
+
+# Смесь запросов: (сценарий из benchmarks.suite.SCENARIOS, вес)
+MIX = (
+    ("organizations.by_id", 20),
+    ("organizations.by_building", 10),
+    ("organizations.nearest", 10),
+    ("organizations.by_radius", 8),
+    ("organizations.search", 8),
+    ("organizations.by_activity_name", 6),
+    ("organizations.all", 6),
+    ("buildings.list", 4),
+    ("buildings.nearest", 6),
+    ("activities.tree", 6),
+    ("activities.subtree", 4),
+    ("suggest", 12),
+)
+
+# Количество заранее построенных запросов смеси (клиенты проходят их по кругу)
+MIX_SIZE = 5000
+
+# Токен эндпоинтов мониторинга запускаемого сервера (GET /metrics/pool)
+MONITORING_TOKEN = secrets.token_hex(16)
+
+# Уровень считается насыщенным, если пропускная способность выросла меньше чем на эту долю
+SATURATION_GAIN = 0.1
+
+
+def build_mix(dataset, size: int = MIX_SIZE, seed: int = 0) -> list:
+    """Детерминированный список запросов смеси MIX: (url, params)."""
+    from benchmarks.suite import SCENARIOS
+
+    scenarios = {scenario.name: scenario for scenario in SCENARIOS}
+    names, weights = zip(*MIX)
+    rng = random.Random(seed)
+    requests = []
+    for n, name in enumerate(rng.choices(names, weights, k=size)):
+        request = scenarios[name].build(dataset, rng, n)
+        requests.append((request["url"], request.get("params")))
+    return requests
+
+
+def start_server(mode: str, database_url: str, port: int, extra_env: dict = None, workers: int = 1):
+    # Медленные запросы при перегрузке неизбежны: журнал и EXPLAIN только мешали бы замеру
+    env = {**os.environ, "DB_MODE": mode, "DATABASE_URL": database_url, "RESPONSE_CACHE_BACKEND": "none",
+           "SLOW_QUERY_MS": "60000", "MONITORING_TOKEN": MONITORING_TOKEN, **(extra_env or {})}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning",
+         "--workers", str(workers)],
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn ({mode}) завершился с кодом {process.returncode} (порт {port} занят?)")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/").status_code == 200:
+                return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"uvicorn ({mode}) не запустился")
+
+
+async def run_load(base_url: str, requests, concurrency: int, duration: float):
+    """Запускает concurrency клиентов на duration секунд; возвращает задержки (мс) и число ошибок."""
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker(offset: int):
+            nonlocal errors
+            # Клиенты начинают с разных мест смеси, чтобы не запрашивать одно и то же одновременно
+            i = offset * len(requests) // concurrency
+            while time.monotonic() < deadline:
+                url, params = requests[i % len(requests)]
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url, params=params)
+                    if response.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+                i += 1
+
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return latencies, errors
+
+
+def summarize(latencies, errors: int, duration: float) -> dict:
+    latencies = sorted(latencies)
+    if not latencies:
+        return {"requests": 0, "rps": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "errors": errors}
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / duration,
+        "p50": statistics.median(latencies),
+        "p95": latencies[max(0, int(len(latencies) * 0.95) - 1)],
+        "p99": latencies[max(0, int(len(latencies) * 0.99) - 1)],
+        "errors": errors,
+    }
+
+
+def pool_snapshot(base_url: str) -> dict:
+    try:
+        return httpx.get(f"{base_url}/metrics/pool", timeout=10,
+                         headers={"Authorization": f"Bearer {MONITORING_TOKEN}"}).json()
+    except (httpx.HTTPError, ValueError):
+        return {}
+
+
+def _exhausted(status: dict) -> bool:
+    """Был ли пул занят целиком: busy_max достиг размера (для пула БД — с overflow; -1 — без ограничения)."""
+    if status.get("pool") == "threadpool":
+        return bool(status["size"]) and status["busy_max"] >= status["size"]
+    return status["max_overflow"] >= 0 and status["busy_max"] >= status["size"] + status["max_overflow"]
+
+
+def pool_pressure(before: dict, after: dict) -> dict:
+    """
+    Состояние пулов за интервал между двумя снимками /metrics/pool.
+
+    Returns:
+        dict: db_wait_ms — наибольшее среднее ожидание соединения среди движков БД,
+        threadpool_wait_ms — среднее ожидание свободного потока, pool_timeouts — ошибки QueuePool timeout,
+        db_exhausted / threadpool_exhausted — пул был занят целиком
+    """
+    result = {"db_wait_ms": 0.0, "threadpool_wait_ms": 0.0, "pool_timeouts": 0,
+              "db_exhausted": False, "threadpool_exhausted": False}
+    for name, status in after.items():
+        if "checkouts" not in status:
+            continue
+        prev = before.get(name, {})
+        attempts = status["checkouts"] + status["timeouts"] - prev.get("checkouts", 0) - prev.get("timeouts", 0)
+        wait = (status["wait_total_ms"] - prev.get("wait_total_ms", 0.0)) / attempts if attempts > 0 else 0.0
+        if name == "threadpool":
+            result["threadpool_wait_ms"] = wait
+            result["threadpool_exhausted"] = _exhausted(status)
+        else:
+            result["db_wait_ms"] = max(result["db_wait_ms"], wait)
+            result["pool_timeouts"] += status["timeouts"] - prev.get("timeouts", 0)
+            result["db_exhausted"] = result["db_exhausted"] or _exhausted(status)
+    return result
+
+
+def saturation_cause(level: dict) -> str:
+    if level["pool_timeouts"] or level["db_exhausted"]:
+        return "пул соединений с БД (DB_POOL_SIZE + DB_MAX_OVERFLOW)"
+    if level["threadpool_exhausted"]:
+        return "пул потоков (THREADPOOL_SIZE)"
+    return "пулы не исчерпаны: CPU процесса (GIL) или сама БД"
+
+
+def find_saturation(levels: list) -> dict:
+    """
+    Первый уровень concurrency, на котором пропускная способность перестала расти.
+
+    Returns:
+        dict | None: concurrency, пиковая пропускная способность до насыщения и причина
+    """
+    for prev, level in zip(levels, levels[1:]):
+        if prev["rps"] and level["rps"] / prev["rps"] - 1 < SATURATION_GAIN and level["p99"] > prev["p99"]:
+            return {
+                "concurrency": prev["concurrency"],
+                "rps": prev["rps"],
+                "saturated_at": level["concurrency"],
+                "cause": saturation_cause(level),
+            }
+    return None
+
+
+def sweep(base_url: str, requests, concurrency_levels, duration: float, warmup: float) -> list:
+    levels = []
+    print(f"{'клиентов':>9} {'rps':>9} {'p50 мс':>9} {'p95 мс':>9} {'p99 мс':>9} {'ошибок':>7} "
+          f"{'ожид. БД мс':>12} {'ожид. потока мс':>16} {'таймаутов':>10}")
+    for concurrency in concurrency_levels:
+        if warmup:
+            asyncio.run(run_load(base_url, requests, concurrency, warmup))
+        before = pool_snapshot(base_url)
+        latencies, errors = asyncio.run(run_load(base_url, requests, concurrency, duration))
+        level = {"concurrency": concurrency, **summarize(latencies, errors, duration),
+                 **pool_pressure(before, pool_snapshot(base_url))}
+        levels.append(level)
+        print(f"{concurrency:>9} {level['rps']:>9.1f} {level['p50']:>9.1f} {level['p95']:>9.1f} {level['p99']:>9.1f} "
+              f"{level['errors']:>7} {level['db_wait_ms']:>12.2f} {level['threadpool_wait_ms']:>16.2f} {level['pool_timeouts']:>10}")
+    return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--seed", type=int, default=0, help="пересоздать схему и создать столько организаций")
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1], help="количество воркеров uvicorn")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64, 128])
+    parser.add_argument("--duration", type=float, default=10.0, help="длительность уровня, секунды")
+    parser.add_argument("--warmup", type=float, default=1.0, help="прогрев перед уровнем, секунды")
+    parser.add_argument("--server-env", nargs="*", default=[], metavar="NAME=VALUE",
+                        help="переменные окружения сервера, например DB_POOL_SIZE=2 THREADPOOL_SIZE=8")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--save", help="сохранить кривые в JSON")
+    args = parser.parse_args()
+
+    if args.seed:
+        dataset = create_dataset(args.database_url, DatasetSpec(buildings=max(1, args.seed // 10), organizations=args.seed))
+    else:
+        dataset = load_dataset(args.database_url)
+    requests = build_mix(dataset)
+    server_env = dict(item.split("=", 1) for item in args.server_env)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    runs = []
+    for mode in args.modes:
+        for workers in args.workers:
+            print(f"\nDB_MODE={mode}, воркеров: {workers}")
+            process = start_server(mode, args.database_url, args.port, server_env, workers)
+            try:
+                levels = sweep(base_url, requests, args.concurrency, args.duration, args.warmup)
+            finally:
+                process.terminate()
+                process.wait()
+            saturation = find_saturation(levels)
+            if saturation:
+                print(f"насыщение: {saturation['rps']:.1f} rps при {saturation['concurrency']} клиентах "
+                      f"(дальше рост < {SATURATION_GAIN:.0%}); причина: {saturation['cause']}")
+            else:
+                print("насыщение не достигнуто")
+            runs.append({"mode": mode, "workers": workers, "levels": levels, "saturation": saturation})
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"database_url": args.database_url, "server_env": server_env, "duration": args.duration,
+                       "runs": runs}, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"результаты сохранены: {args.save}")
+
+
+if __name__ == "__main__":
+    main()
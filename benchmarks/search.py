@@ -0,0 +1,97 @@
+"""
+Бенчмарк поиска организаций по названию (/organizations/search).
+
+Генерирует справочник из случайных названий вида «Кофейня Ромашка 123» и
+сравнивает полный просмотр таблицы (LIKE '%запрос%', как без индекса)
+с поиском по индексу (FTS5 trigram в SQLite, pg_trgm/tsvector в PostgreSQL)
+для префиксных, подстрочных, многословных запросов и запросов с опечатками.
+
+Запуск:
+    python -m benchmarks.search --organizations 1000000
+    python -m benchmarks.search --database-url postgresql+psycopg2://... --organizations 1000000
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import building, organizations, activity, versions, changes, documents  # noqa: F401 — регистрация моделей
+from app.models.organizations import Organization
+from app.crud.search import ensure_search_index, search_organization_ids
+
+KINDS = ["Кофейня", "Аптека", "Автосервис", "Пекарня", "Стоматология", "Цветы", "Ломбард", "Фитнес-клуб",
+         "Барбершоп", "Типография", "Coffee", "Pizza", "Market", "Studio"]
+NAMES = ["Ромашка", "Берёзка", "Северная", "Восток", "Меридиан", "Гранит", "Лотос", "Радуга", "Звезда",
+         "Альфа", "Вектор", "Orion", "Nova", "Sunrise", "Atlas", "Delta"]
+
+QUERIES = [
+    ("префикс", "Кофейня Ром"),
+    ("подстрока", "ридиан"),
+    ("слова в другом порядке", "гранит аптека"),
+    ("опечатка", "Стаматология Лотас"),
+    ("точное", "Pizza Orion 4242"),
+]
+
+BATCH = 50_000
+
+
+def seed(engine, n: int, rng: random.Random):
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for start in range(1, n + 1, BATCH):
+            rows = [
+                {"id": i, "name": f"{rng.choice(KINDS)} {rng.choice(NAMES)} {rng.randint(1, 9999)}"}
+                for i in range(start, min(start + BATCH, n + 1))
+            ]
+            conn.execute(insert(Organization), rows)
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        ensure_search_index(conn)
+    return (time.perf_counter() - start) * 1000
+
+
+def scan(db, query: str):
+    """Поиск без индекса: полный просмотр таблицы."""
+    return db.execute(select(Organization.id).where(Organization.name.ilike(f"%{query}%"))).all()
+
+
+def timed(fn, repeat: int):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:////tmp/orgs_search_bench.sqlite")
+    parser.add_argument("--organizations", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    index_ms = seed(engine, args.organizations, random.Random(0))
+    print(f"организаций: {args.organizations}, построение индекса: {index_ms:.0f} мс")
+
+    Session = sessionmaker(bind=engine)
+    for label, query in QUERIES:
+        with Session() as db:
+            scan_ms, scan_rows = timed(lambda: scan(db, query), args.repeat)
+            search_ms, found = timed(lambda: search_organization_ids(db, query), args.repeat)
+        top = found[0][0] if found else 0.0
+        print(f"{label:>24} {query!r:>24}: скан {scan_ms:8.1f} мс ({len(scan_rows)} совп.) | "
+              f"поиск {search_ms:8.1f} мс ({len(found)} канд., лучшая релевантность {top:.2f})")
+
+
+if __name__ == "__main__":
+    main()
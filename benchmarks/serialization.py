@@ -0,0 +1,107 @@
+"""
+Микробенчмарк сериализации списка организаций (List[OrganizationOut]).
+
+Строит N организаций в памяти (ORM-объекты со зданием, двумя телефонами и двумя
+видами деятельности с поддеревом) и сравнивает время сериализации:
+- jsonable_encoder + json.dumps — классический путь FastAPI;
+- TypeAdapter: проверка from_attributes + dump_json — путь FastAPI с
+  response_model и прежний путь кэша ответов;
+- app.serialization — словари из атрибутов ORM + orjson.
+
+Перед замером проверяется, что app.serialization даёт те же байты, что и Pydantic.
+
+Запуск:
+    python -m benchmarks.serialization --organizations 10000
+"""
+import argparse
+import json
+import os
+import random
+import time
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models import versions  # noqa: F401 — регистрация моделей
+from app.models.organizations import Organization, OrganizationPhone
+from app.models.activity import Activity
+from app.models.building import Building
+from app.schemas.organizations import OrganizationOut
+from app.serialization import dump_json
+
+
+def make_organizations(n: int, rng: random.Random):
+    """Организации в памяти: дерево из 10 корней по 10 детей по 3 листа, одно здание на 10 организаций."""
+    activities, next_id = [], 1
+    for r in range(10):
+        root = Activity(id=next_id, name=f"Категория {r}", parent_id=None, level=1)
+        next_id += 1
+        for c in range(10):
+            child = Activity(id=next_id, name=f"Подкатегория {r}.{c}", parent_id=root.id, level=2)
+            next_id += 1
+            root.children.append(child)
+            for g in range(3):
+                child.children.append(Activity(id=next_id, name=f"Вид {r}.{c}.{g}", parent_id=child.id, level=3))
+                next_id += 1
+            activities.append(child)
+    buildings = [
+        Building(id=i + 1, address=f"г. Москва, ул. Тестовая, д. {i + 1}",
+                 latitude=rng.uniform(55.6, 55.9), longitude=rng.uniform(37.4, 37.8))
+        for i in range(max(1, n // 10))
+    ]
+    organizations = []
+    for i in range(n):
+        org = Organization(id=i + 1, name=f"ООО «Организация {i + 1}»", building=rng.choice(buildings))
+        org.phones = [OrganizationPhone(id=2 * i + k + 1, phone=f"+7 900 {i:03d}-{k:02d}-00") for k in range(2)]
+        org.activities = rng.sample(activities, 2)
+        organizations.append(org)
+    return organizations
+
+
+def timed(fn, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--organizations", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    organizations = make_organizations(args.organizations, random.Random(0))
+    adapter = TypeAdapter(List[OrganizationOut])
+
+    def pydantic_path():
+        return adapter.dump_json(adapter.validate_python(organizations, from_attributes=True))
+
+    def encoder_path():
+        models = adapter.validate_python(organizations, from_attributes=True)
+        return json.dumps(jsonable_encoder(models), ensure_ascii=False, separators=(",", ":")).encode()
+
+    def fast_path():
+        return dump_json(List[OrganizationOut], organizations)
+
+    expected = pydantic_path()
+    assert fast_path() == expected, "app.serialization и Pydantic дают разный JSON"
+    print(f"организаций: {args.organizations}, ответ: {len(expected) / 1024:.0f} КБ")
+    results = [
+        ("jsonable_encoder + json.dumps", timed(encoder_path, args.repeat)),
+        ("TypeAdapter validate + dump_json", timed(pydantic_path, args.repeat)),
+        ("app.serialization (orjson)", timed(fast_path, args.repeat)),
+    ]
+    baseline = results[1][1]
+    for label, ms in results:
+        print(f"{label:>34}: {ms:8.1f} мс  ({baseline / ms:4.1f}x к TypeAdapter)")
+
+
+if __name__ == "__main__":
+    main()
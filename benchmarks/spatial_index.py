@@ -0,0 +1,91 @@
+"""
+Бенчмарк поиска ближайших зданий: in-memory KD-дерево против поиска через БД.
+
+Для каждого размера набора создаётся база SQLite в памяти со случайными
+зданиями в пределах города, строится индекс и замеряется время ответа
+на запросы «k ближайших» из случайных точек.
+
+Запуск:
+    python -m benchmarks.spatial_index --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.geo import geo_cell
+from app.models import building, organizations, activity  # noqa: F401 — регистрация моделей
+from app.models.building import Building
+from app.crud.building import nearest_buildings_sql
+from app.spatial_index import BuildingSpatialIndex
+
+# Область, в которой генерируются здания (примерно Москва)
+MIN_LAT, MAX_LAT = 55.55, 55.95
+MIN_LON, MAX_LON = 37.35, 37.85
+
+
+def seed(db, size: int, rng: random.Random):
+    rows = []
+    for i in range(size):
+        lat, lon = rng.uniform(MIN_LAT, MAX_LAT), rng.uniform(MIN_LON, MAX_LON)
+        rows.append({"address": f"building {i}", "latitude": lat, "longitude": lon, "geo_cell": geo_cell(lat, lon)})
+        if len(rows) == 50_000:
+            db.execute(insert(Building), rows)
+            rows = []
+    if rows:
+        db.execute(insert(Building), rows)
+    db.commit()
+
+
+def timed(fn, points):
+    durations = []
+    for lat, lon in points:
+        start = time.perf_counter()
+        fn(lat, lon)
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return statistics.mean(durations), durations[len(durations) // 2], durations[int(len(durations) * 0.99) - 1]
+
+
+def run(size: int, queries: int, k: int):
+    rng = random.Random(size)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    seed(db, size, rng)
+
+    index = BuildingSpatialIndex()
+    start = time.perf_counter()
+    index.load(db)
+    build_s = time.perf_counter() - start
+
+    points = [(rng.uniform(MIN_LAT, MAX_LAT), rng.uniform(MIN_LON, MAX_LON)) for _ in range(queries)]
+    sql = timed(lambda lat, lon: nearest_buildings_sql(db, lat, lon, k), points)
+    mem = timed(lambda lat, lon: index.nearest(lat, lon, k), points)
+
+    print(f"{size:>9} зданий, построение индекса {build_s:.2f} с")
+    print(f"{'':>9} SQL (geo_cell):  mean {sql[0]:8.3f} мс  p50 {sql[1]:8.3f} мс  p99 {sql[2]:8.3f} мс")
+    print(f"{'':>9} KD-дерево:       mean {mem[0]:8.3f} мс  p50 {mem[1]:8.3f} мс  p99 {mem[2]:8.3f} мс")
+    db.close()
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Бенчмарк индекса подсказок (/suggest).
+
+Строит app.suggest_index по синтетическим названиям организаций и измеряет
+время построения, занимаемую память (tracemalloc) и задержку поиска
+по случайным префиксам длиной от 1 до 6 символов.
+
+Запуск:
+    python -m benchmarks.suggest --names 1000000 --queries 20000
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+import tracemalloc
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.suggest_index import PrefixIndex
+
+KINDS = ["Кофейня", "Аптека", "Автосервис", "Пекарня", "Стоматология", "Цветы", "Ломбард", "Фитнес-клуб",
+         "Барбершоп", "Типография", "Coffee", "Pizza", "Market", "Studio"]
+SYLLABLES = ["ро", "ма", "шка", "бе", "рё", "зка", "се", "вер", "ная", "лот", "ос", "гра", "нит", "ви", "ктор", "аль", "фа"]
+
+
+def make_name(rng: random.Random) -> str:
+    word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+    return f"{rng.choice(KINDS)} {word} {rng.randint(1, 999)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--names", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    names = [make_name(rng) for _ in range(args.names)]
+    avg_len = statistics.mean(len(name) for name in names)
+
+    index = PrefixIndex("organization")
+    start = time.perf_counter()
+    index.build(enumerate(names, 1))
+    build_s = time.perf_counter() - start
+
+    # Память измеряется отдельным построением: tracemalloc сильно замедляет выделение памяти
+    tracemalloc.start()
+    measured = PrefixIndex("organization")
+    measured.build(enumerate(names, 1))
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del measured
+    # Исходные строки названий созданы до измерения; в приложении они принадлежат индексу
+    memory += sum(name.__sizeof__() for name in names)
+    print(f"названий: {args.names} (средняя длина {avg_len:.1f}), построение {build_s:.1f} с, "
+          f"память {memory / 2**20:.0f} МБ ({memory / args.names:.0f} байт на название)")
+
+    prefixes = []
+    for _ in range(args.queries):
+        name = rng.choice(names).casefold()
+        words = name.split()
+        word = rng.choice(words)
+        prefixes.append(word[:rng.randint(1, min(6, len(word)))])
+    latencies = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        index.suggest(prefix, args.limit)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    print(f"поиск: p50 {latencies[len(latencies) // 2]:.0f} мкс, p99 {latencies[int(len(latencies) * 0.99)]:.0f} мкс, "
+          f"max {latencies[-1]:.0f} мкс")
+
+    start = time.perf_counter()
+    for i in range(1000):
+        index.add([(args.names + i + 1, make_name(rng))])
+    print(f"добавление: {(time.perf_counter() - start) * 1000:.3f} мс на 1000 названий")
+
+
+if __name__ == "__main__":
+    main()
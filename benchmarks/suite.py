@@ -0,0 +1,386 @@
+"""
+Воспроизводимый набор бенчмарков эндпоинтов API.
+
+1. БД пересоздаётся и заполняется детерминированным справочником
+   (benchmarks.datagen, параметры --buildings, --organizations и т.д.).
+2. Приложение запускается в этом же процессе (lifespan загружает индексы),
+   запросы выполняются через httpx.ASGITransport — без сети и uvicorn,
+   поэтому замер отражает работу приложения и БД.
+3. Для каждого сценария из SCENARIOS (все эндпоинты роутеров organizations,
+   buildings, activities, suggest; мониторинг не замеряется) выполняются
+   --warmup прогревочных и --requests измеряемых запросов с параметрами,
+   детерминированно выбранными из созданного справочника, при --concurrency
+   одновременных запросах. Сценарии записи (POST) идут последними.
+4. Считаются пропускная способность (запросов в секунду), задержки
+   (mean, p50, p95, p99, max), количество SQL-запросов на запрос и пиковый
+   прирост памяти Python (tracemalloc) — память измеряется отдельным
+   коротким проходом (--memory-requests), чтобы tracemalloc не искажал время.
+
+Кэш ответов по умолчанию выключен (RESPONSE_CACHE_BACKEND=none), иначе
+замерялся бы только кэш; EXPLAIN медленных запросов тоже выключен, чтобы не
+попадать в счётчик SQL-запросов, а валидаторы HTTP-кэша не сверяются с БД
+по таймеру (HTTP_CACHE_CHECK_INTERVAL). Эти настройки можно переопределить
+переменными окружения.
+
+Клиент отправляет Accept-Encoding: identity, поэтому сценарии замеряют
+ответы без сжатия (app.compression) и сравнимы с прогонами до его появления.
+Цена сжатия замеряется отдельными сценариями с суффиксом «(gzip)» и «(br)».
+
+Результаты сохраняются в JSON (--save) и сравниваются с сохранённым
+базовым прогоном (--compare): регрессией считается рост задержки p50/p95
+или пиковой памяти и падение пропускной способности больше чем на
+--tolerance, любой рост числа SQL-запросов на запрос и новые ошибки.
+При регрессии код возврата — 1. Время зависит от машины: базовый прогон
+нужно снимать на той же машине и с теми же параметрами.
+
+Запуск:
+    python -m benchmarks.suite --save benchmarks/baselines/sqlite.json
+    python -m benchmarks.suite --compare benchmarks/baselines/sqlite.json
+    python -m benchmarks.suite --only organizations. --requests 500 --concurrency 8
+    python -m benchmarks.suite --database-url postgresql+psycopg2://... --db-mode async
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from typing import Callable, NamedTuple
+
+from benchmarks.datagen import Dataset, add_spec_arguments, create_dataset, organization_name, spec_from_args
+
+DEFAULT_DATABASE_URL = "sqlite:////tmp/orgs_bench_suite.sqlite"
+
+# Показатели, по которым ищутся регрессии: (поле, True — больше значит хуже)
+COMPARED_FIELDS = (
+    ("rps", False),
+    ("p50_ms", True),
+    ("p95_ms", True),
+    ("peak_memory_kb", True),
+)
+
+
+class Scenario(NamedTuple):
+    """
+    Сценарий нагрузки на один эндпоинт.
+
+    build(dataset, rng, n) возвращает аргументы httpx-запроса (url, params, json)
+    для n-го запроса; max_requests ограничивает число запросов для тяжёлых сценариев.
+    """
+    name: str
+    method: str
+    build: Callable
+    max_requests: int = None
+
+
+def _building(dataset: Dataset, rng: random.Random):
+    return dataset.buildings[rng.randrange(len(dataset.buildings))]
+
+
+def _point(dataset: Dataset, rng: random.Random) -> dict:
+    _, latitude, longitude = _building(dataset, rng)
+    return {"latitude": latitude, "longitude": longitude}
+
+
+def _activity(dataset: Dataset, rng: random.Random, level: int = None):
+    candidates = [a for a in dataset.activities if level is None or a[2] == level]
+    return candidates[rng.randrange(len(candidates))]
+
+
+def _organization(dataset: Dataset, rng: random.Random):
+    return dataset.organizations[rng.randrange(len(dataset.organizations))]
+
+
+def _word(dataset: Dataset, rng: random.Random) -> str:
+    # Второе слово названия «ООО «Вектор Маяк» 12» — часть названия в кавычках
+    return _organization(dataset, rng)[1].split()[1].strip("«")
+
+
+def _new_organization(dataset: Dataset, rng: random.Random, n: int, tag: str) -> dict:
+    return {
+        "name": f"{organization_name(rng, n)} ({tag})",
+        "building_id": _building(dataset, rng)[0],
+        "phones": [{"phone": f"+7 900 {n:07d}"}],
+        "activity_ids": [_activity(dataset, rng)[0]],
+    }
+
+
+def _new_building(rng: random.Random, n: int) -> dict:
+    return {"address": f"г. Москва, ул. Новая, д. {n}", "latitude": rng.uniform(55.6, 55.9), "longitude": rng.uniform(37.4, 37.8)}
+
+
+SCENARIOS = [
+    Scenario("organizations.all", "GET", lambda d, rng, n: {
+        "url": "/organizations/all_organizations", "params": {"limit": 50, "cursor": _organization(d, rng)[0]}}),
+    Scenario("organizations.all (fields)", "GET", lambda d, rng, n: {
+        "url": "/organizations/all_organizations",
+        "params": {"limit": 50, "cursor": _organization(d, rng)[0], "fields": "id,name,building"}}),
+    Scenario("organizations.all (stream)", "GET", lambda d, rng, n: {
+        "url": "/organizations/all_organizations", "params": {"stream": "true"}}, max_requests=5),
+    Scenario("organizations.all (gzip)", "GET", lambda d, rng, n: {
+        "url": "/organizations/all_organizations", "params": {"limit": 50, "cursor": _organization(d, rng)[0]},
+        "headers": {"Accept-Encoding": "gzip"}}),
+    Scenario("organizations.all (br)", "GET", lambda d, rng, n: {
+        "url": "/organizations/all_organizations", "params": {"limit": 50, "cursor": _organization(d, rng)[0]},
+        "headers": {"Accept-Encoding": "br"}}),
+    Scenario("organizations.all (stream, gzip)", "GET", lambda d, rng, n: {
+        "url": "/organizations/all_organizations", "params": {"stream": "true"},
+        "headers": {"Accept-Encoding": "gzip"}}, max_requests=5),
+    Scenario("organizations.by_building", "GET", lambda d, rng, n: {
+        "url": f"/organizations/by_building_id/{d.occupied_building_ids[rng.randrange(len(d.occupied_building_ids))]}"}),
+    # Уровни дерева создаются по порядку: последний вид деятельности — с самого глубокого уровня
+    Scenario("organizations.by_activity", "GET", lambda d, rng, n: {
+        "url": f"/organizations/by_activity/{_activity(d, rng, level=d.activities[-1][2])[1]}", "params": {"limit": 50}}),
+    Scenario("organizations.by_coordinates", "GET", lambda d, rng, n: {
+        "url": "/organizations/by_coordinates/", "params": {**_point(d, rng), "limit": 50}}),
+    Scenario("organizations.by_radius", "GET", lambda d, rng, n: {
+        "url": "/organizations/by_radius/", "params": {**_point(d, rng), "radius": 1000, "limit": 50}}),
+    Scenario("organizations.by_rectangle", "GET", lambda d, rng, n: {
+        "url": "/organizations/by_rectangle/", "params": (lambda p: {
+            "min_latitude": p["latitude"] - 0.01, "max_latitude": p["latitude"] + 0.01,
+            "min_longitude": p["longitude"] - 0.02, "max_longitude": p["longitude"] + 0.02, "limit": 50,
+        })(_point(d, rng))}),
+    Scenario("organizations.nearest", "GET", lambda d, rng, n: {
+        "url": "/organizations/nearest", "params": {**_point(d, rng), "limit": 10}}),
+    Scenario("organizations.search", "GET", lambda d, rng, n: {
+        "url": "/organizations/search", "params": {"q": _word(d, rng), "limit": 20}}),
+    Scenario("organizations.by_id", "GET", lambda d, rng, n: {
+        "url": f"/organizations/by_organization_id/{_organization(d, rng)[0]}"}),
+    Scenario("organizations.by_name", "GET", lambda d, rng, n: {
+        "url": f"/organizations/by_organization_name/{_organization(d, rng)[1]}"}),
+    Scenario("organizations.by_activity_name", "GET", lambda d, rng, n: {
+        "url": f"/organizations/by_activity_name/{_activity(d, rng, level=1)[1]}", "params": {"limit": 50}}),
+    Scenario("buildings.list", "GET", lambda d, rng, n: {
+        "url": "/buildings/", "params": {"limit": 100, "cursor": _building(d, rng)[0]}}),
+    Scenario("buildings.nearest", "GET", lambda d, rng, n: {
+        "url": "/buildings/nearest", "params": {**_point(d, rng), "k": 10}}),
+    Scenario("activities.tree", "GET", lambda d, rng, n: {"url": "/activities/"}),
+    Scenario("activities.subtree", "GET", lambda d, rng, n: {
+        "url": "/activities/", "params": {"root_id": _activity(d, rng, level=1)[0]}}),
+    Scenario("suggest", "GET", lambda d, rng, n: {
+        "url": "/suggest/", "params": {"q": _word(d, rng)[:3], "limit": 10}}),
+    # Журнал заполняется при создании справочника: здания, виды деятельности, затем организации
+    Scenario("changes", "GET", lambda d, rng, n: {
+        "url": "/changes", "params": {"since": rng.randrange(len(d.buildings) + len(d.activities) + len(d.organizations)),
+                                      "limit": 500}}),
+    Scenario("buildings.create", "POST", lambda d, rng, n: {"url": "/buildings/", "json": _new_building(rng, n)}),
+    Scenario("buildings.bulk", "POST", lambda d, rng, n: {
+        "url": "/buildings/bulk", "json": [_new_building(rng, n * 100 + k) for k in range(100)]}),
+    Scenario("activities.create", "POST", lambda d, rng, n: {
+        "url": "/activities/", "json": {"name": f"Новый вид {n}", "parent_id": _activity(d, rng, level=1)[0]}}),
+    Scenario("activities.bulk", "POST", lambda d, rng, n: {
+        "url": "/activities/bulk",
+        "json": [{"name": f"Новый вид {n}.{k}", "parent_id": _activity(d, rng, level=1)[0]} for k in range(100)]}),
+    Scenario("organizations.create", "POST", lambda d, rng, n: {
+        "url": "/organizations/", "json": _new_organization(d, rng, n, "create")}),
+    Scenario("organizations.bulk", "POST", lambda d, rng, n: {
+        "url": "/organizations/bulk", "json": [_new_organization(d, rng, n * 100 + k, "bulk") for k in range(100)]}),
+]
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+class StatementCounter:
+    """Считает SQL-запросы всех движков приложения."""
+
+    def __init__(self, engines):
+        from sqlalchemy import event
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+async def _send(client, scenario: Scenario, request: dict) -> float:
+    """Выполняет запрос и возвращает его длительность, секунды (отрицательную — при ошибке)."""
+    start = time.perf_counter()
+    response = await client.request(scenario.method, **request)
+    await response.aread()
+    elapsed = time.perf_counter() - start
+    return elapsed if response.status_code < 400 else -elapsed
+
+
+async def _run_requests(client, scenario: Scenario, requests: list, concurrency: int) -> list:
+    """Выполняет запросы по порядку не более чем по concurrency одновременно; возвращает длительности."""
+    durations = [None] * len(requests)
+    position = 0
+
+    async def worker():
+        nonlocal position
+        while position < len(requests):
+            i = position
+            position += 1
+            durations[i] = await _send(client, scenario, requests[i])
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(requests)))))
+    return durations
+
+
+async def run_scenario(client, scenario: Scenario, dataset: Dataset, counter: StatementCounter, args) -> dict:
+    total = args.requests if scenario.max_requests is None else min(args.requests, scenario.max_requests)
+    rng = random.Random(f"{dataset.spec.seed}:{scenario.name}")
+    warmup, memory_requests = min(args.warmup, total), min(args.memory_requests, total)
+    requests = [scenario.build(dataset, rng, n) for n in range(warmup + total + memory_requests)]
+    await _run_requests(client, scenario, requests[:warmup], args.concurrency)
+
+    measured = requests[warmup:warmup + total]
+    statements_before = counter.count
+    start = time.perf_counter()
+    durations = await _run_requests(client, scenario, measured, args.concurrency)
+    elapsed = time.perf_counter() - start
+    statements = counter.count - statements_before
+
+    peak_memory_kb = 0.0
+    if memory_requests:
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        await _run_requests(client, scenario, requests[warmup + total:], args.concurrency)
+        peak_memory_kb = (tracemalloc.get_traced_memory()[1] - baseline) / 1024
+        tracemalloc.stop()
+
+    latencies = sorted(abs(d) * 1000 for d in durations)
+    return {
+        "requests": total,
+        "errors": sum(1 for d in durations if d < 0),
+        "rps": round(total / elapsed, 1),
+        "mean_ms": round(sum(latencies) / total, 3),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "max_ms": round(latencies[-1], 3),
+        "queries_per_request": round(statements / total, 2),
+        "peak_memory_kb": round(peak_memory_kb, 1),
+    }
+
+
+async def run_suite(dataset: Dataset, scenarios: list, args) -> dict:
+    # Приложение импортируется после настройки окружения и создания БД
+    import httpx
+    from app.database import engines
+    from app.main import app
+
+    counter = StatementCounter(engines().values())
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        # httpx по умолчанию просит gzip/br: сжатие замеряют только сценарии, задающие Accept-Encoding сами
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None,
+                                     headers={"Accept-Encoding": "identity"}) as client:
+            for scenario in scenarios:
+                results[scenario.name] = result = await run_scenario(client, scenario, dataset, counter, args)
+                print(format_row(scenario.name, result), flush=True)
+    return results
+
+
+HEADER = f"{'сценарий':<34} {'rps':>8} {'p50 мс':>9} {'p95 мс':>9} {'p99 мс':>9} {'SQL/запр':>9} {'память КБ':>10} {'ошибок':>7}"
+
+
+def format_row(name: str, r: dict) -> str:
+    return (f"{name:<34} {r['rps']:>8.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+            f"{r['queries_per_request']:>9.2f} {r['peak_memory_kb']:>10.1f} {r['errors']:>7}")
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Сравнивает прогон с базовым; возвращает список описаний регрессий."""
+    for key in ("spec", "settings"):
+        if current[key] != baseline.get(key):
+            print(f"внимание: {key} отличается от базового прогона: {baseline.get(key)} -> {current[key]}")
+    regressions = []
+    print(f"\n{'сценарий':<34} {'показатель':<20} {'база':>10} {'сейчас':>10} {'изменение':>10}")
+    for name, result in current["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            continue
+        for field, higher_is_worse in COMPARED_FIELDS:
+            old, new = base[field], result[field]
+            if not old:
+                continue
+            change = new / old - 1
+            worse = change > tolerance if higher_is_worse else change < -tolerance / (1 + tolerance)
+            mark = "  РЕГРЕССИЯ" if worse else ""
+            print(f"{name:<34} {field:<20} {old:>10.2f} {new:>10.2f} {change:>+9.0%}{mark}")
+            if worse:
+                regressions.append(f"{name}: {field} {old} -> {new}")
+        if result["queries_per_request"] > base["queries_per_request"]:
+            regressions.append(f"{name}: queries_per_request {base['queries_per_request']} -> {result['queries_per_request']}")
+        if result["errors"] > base["errors"]:
+            regressions.append(f"{name}: errors {base['errors']} -> {result['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--db-mode", choices=("sync", "async"), default="sync")
+    add_spec_arguments(parser)
+    parser.add_argument("--requests", type=int, default=100, help="измеряемых запросов на сценарий")
+    parser.add_argument("--warmup", type=int, default=20, help="прогревочных запросов на сценарий")
+    parser.add_argument("--memory-requests", type=int, default=10, help="запросов в проходе с tracemalloc (0 — не измерять память)")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--only", nargs="+", default=None, help="префиксы имён сценариев")
+    parser.add_argument("--save", help="сохранить результаты в JSON")
+    parser.add_argument("--compare", help="сравнить с сохранённым JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустимое ухудшение времени и памяти (доля)")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["DB_MODE"] = args.db_mode
+    os.environ.setdefault("RESPONSE_CACHE_BACKEND", "none")
+    os.environ.setdefault("SLOW_QUERY_EXPLAIN", "false")
+    # Других воркеров в прогоне нет: сверка валидаторов с БД по таймеру (app.http_cache) добавляла бы
+    # к SQL-запросам на запрос долю, зависящую от скорости машины; свои изменения процесс видит и так
+    os.environ.setdefault("HTTP_CACHE_CHECK_INTERVAL", "3600")
+
+    spec = spec_from_args(args)
+    scenarios = [s for s in SCENARIOS if not args.only or s.name.startswith(tuple(args.only))]
+    start = time.perf_counter()
+    dataset = create_dataset(args.database_url, spec)
+    print(f"справочник: зданий {spec.buildings}, организаций {spec.organizations}, "
+          f"видов деятельности {len(dataset.activities)} ({time.perf_counter() - start:.1f} с)\n")
+
+    print(HEADER)
+    results = asyncio.run(run_suite(dataset, scenarios, args))
+    current = {
+        "spec": spec._asdict(),
+        "settings": {
+            "dialect": args.database_url.split(":", 1)[0],
+            "db_mode": args.db_mode,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "response_cache": os.environ["RESPONSE_CACHE_BACKEND"],
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        # ru_maxrss в Linux — килобайты
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "scenarios": results,
+    }
+    print(f"\nпиковый RSS процесса: {current['max_rss_kb'] / 1024:.0f} МБ")
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"результаты сохранены: {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        print(f"\nрегрессий: {len(regressions)}")
+        for line in regressions:
+            print(f"  {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+import os
+import tempfile
+
+"""
+Общие настройки тестов.
+
+app.database создаёт движок по DATABASE_URL при импорте, а настройки кэшей
+читаются при импорте модулей приложения, поэтому окружение задаётся здесь —
+до того, как тесты импортируют app. Тесты работают с SQLite-файлом во
+временном каталоге; кэш ответов выключен, чтобы тесты видели запросы к БД,
+а снимок дерева видов деятельности и валидаторы HTTP-кэша не сверяются с БД
+по таймеру — иначе число запросов зависело бы от времени выполнения теста.
+"""
+
+TEST_DIR = tempfile.mkdtemp(prefix="orgs_tests_")
+TEST_DATABASE_URL = f"sqlite:///{os.path.join(TEST_DIR, 'app.sqlite')}"
+
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ["DB_MODE"] = "sync"
+os.environ["ACTIVITY_CACHE_ENABLED"] = "true"
+os.environ["ACTIVITY_CACHE_CHECK_INTERVAL"] = "3600"
+os.environ["HTTP_CACHE_CHECK_INTERVAL"] = "3600"
+os.environ["RESPONSE_CACHE_BACKEND"] = "none"
+os.environ["SLOW_QUERY_EXPLAIN"] = "false"
+os.environ["MONITORING_TOKEN"] = "test-monitoring-token"
@@ -0,0 +1,81 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select, text
+
+from app.database import Base, SessionLocal, engine
+from app.crud.bulk import bulk_create_buildings
+from app.crud.search import ensure_search_index
+from app.main import app
+from app.models.building import Building
+from app.models.changes import ChangeLog
+from app.schemas.building import BuildingCreate
+
+"""
+Массовая загрузка с ошибками в отдельных строках (app.crud.bulk).
+
+Строки с ошибками попадают в errors с номером во входном списке, их ids —
+null, остальные строки сохраняются. Ошибка БД в одной строке (здесь её
+вызывает триггер SQLite) откатывает пачку до точки сохранения, после чего
+строки вставляются по одной: в журнал изменений попадают только созданные.
+"""
+
+client = TestClient(app)
+
+# Адрес, вставку которого отклоняет триггер
+REJECTED_ADDRESS = "отклонить"
+
+
+@pytest.fixture
+def db():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        ensure_search_index(connection)
+        connection.execute(text(
+            f"CREATE TRIGGER reject_building BEFORE INSERT ON buildings WHEN NEW.address = '{REJECTED_ADDRESS}' "
+            "BEGIN SELECT RAISE(ABORT, 'building rejected'); END"
+        ))
+    with SessionLocal() as session:
+        yield session
+
+
+def building(address: str, n: int = 0) -> dict:
+    return {"address": address, "latitude": 55.75 + n / 1000, "longitude": 37.6}
+
+
+def test_organizations_with_missing_building(db):
+    building_id = client.post("/buildings/", json=building("Москва, Тверская 1")).json()["id"]
+    rows = [
+        {"name": f"Romashka {i}", "building_id": building_id if i != 1 else building_id + 100, "phones": [], "activity_ids": []}
+        for i in range(3)
+    ]
+    response = client.post("/organizations/bulk", json=rows)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["created"] == 2
+    assert result["ids"][1] is None and None not in (result["ids"][0], result["ids"][2])
+    assert [error["index"] for error in result["errors"]] == [1]
+    assert str(building_id + 100) in result["errors"][0]["error"]
+
+
+def test_database_error_falls_back_to_rows(db):
+    rows = [building("Москва, Тверская 1", 0), building(REJECTED_ADDRESS, 1), building("Москва, Арбат 10", 2)]
+    response = client.post("/buildings/bulk", json=rows)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["created"] == 2
+    assert result["ids"][1] is None
+    assert result["errors"] == [{"index": 1, "error": "building rejected"}]
+    assert sorted(b["address"] for b in client.get("/buildings/").json()) == ["Москва, Арбат 10", "Москва, Тверская 1"]
+    logged = db.scalars(select(ChangeLog.entity_id).where(ChangeLog.table_name == "buildings")).all()
+    assert sorted(logged) == sorted(result["ids"][0::2])
+
+
+def test_error_index_is_global_across_batches(db):
+    addresses = ["a", "b", "c", REJECTED_ADDRESS, "d", REJECTED_ADDRESS, "e"]
+    rows = [BuildingCreate(**building(address, n)) for n, address in enumerate(addresses)]
+    result = bulk_create_buildings(db, rows, batch_size=2)
+    assert [error["index"] for error in result["errors"]] == [3, 5]
+    assert [id_ is None for id_ in result["ids"]] == [address == REJECTED_ADDRESS for address in addresses]
+    assert result["created"] == 5
+    assert db.scalar(select(func.count()).select_from(Building)) == 5
@@ -0,0 +1,42 @@
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models.changes import ChangeLog
+from app.crud.changes import iter_changes
+
+"""
+Журнал изменений читается в порядке (xact_id, id): курсор не пропускает
+записи транзакции, получившей меньшие id, но закоммиченной позже.
+"""
+
+
+def make_log(entries):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = Session(engine)
+    db.execute(insert(ChangeLog), [
+        {"id": entry_id, "xact_id": xact_id, "table_name": "buildings", "entity_id": entry_id,
+         "operation": "insert", "version": 1}
+        for entry_id, xact_id in entries
+    ])
+    db.commit()
+    return db
+
+
+def read(db, since, limit=None):
+    return [entry.id for entry, _ in iter_changes(db, batch_size=2, since=since, limit=limit)]
+
+
+def test_reads_in_transaction_order():
+    # Транзакция 11 получила id 1 и 3, транзакция 10 — id 2 и 4
+    db = make_log([(1, 11), (2, 10), (3, 11), (4, 10), (5, 12)])
+    assert read(db, 0) == [2, 4, 1, 3, 5]
+
+
+def test_resumes_from_cursor():
+    db = make_log([(1, 11), (2, 10), (3, 11), (4, 10), (5, 12)])
+    first = read(db, 0, limit=3)
+    assert first == [2, 4, 1]
+    assert read(db, first[-1]) == [3, 5]
+    assert read(db, 5) == []
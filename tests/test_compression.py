@@ -0,0 +1,121 @@
+import asyncio
+import json
+import zlib
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.compression import CompressionMiddleware
+from app.database import Base, engine
+from app.crud.search import ensure_search_index
+from app.main import app
+
+"""
+Сжатие ответов (app.compression).
+
+Без Accept-Encoding (или с identity) тело отдаётся как есть, с gzip — сжатым,
+и после распаковки совпадает с несжатым. Потоковый NDJSON сжимается по
+частям: каждую часть можно распаковать сразу, не дожидаясь конца ответа.
+Строгий ETag сжатого ответа становится слабым.
+"""
+
+client = TestClient(app)
+
+
+def gunzip(body: bytes) -> bytes:
+    return zlib.decompress(body, wbits=31)
+
+
+@pytest.fixture(scope="module")
+def organizations():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        ensure_search_index(connection)
+    building_id = client.post("/buildings/", json={"address": "Москва, Тверская 1", "latitude": 55.757,
+                                                   "longitude": 37.613}).json()["id"]
+    rows = [{"name": f"Romashka {i}", "building_id": building_id, "phones": [{"phone": f"8-800-{i:03d}-00-00"}],
+             "activity_ids": []} for i in range(50)]
+    assert client.post("/organizations/bulk", json=rows).json()["created"] == 50
+
+
+def raw_get(url: str, encoding: str, params: dict = None):
+    """GET без автоматической распаковки: тело — байты, как их отправил сервер."""
+    with client.stream("GET", url, params=params, headers={"Accept-Encoding": encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def test_identity_and_gzip_bodies_match(organizations):
+    plain, plain_body = raw_get("/organizations/all_organizations", "identity")
+    gzipped, gzipped_body = raw_get("/organizations/all_organizations", "gzip")
+    assert "content-encoding" not in plain.headers
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in gzipped.headers["vary"].lower()
+    assert len(gzipped_body) < len(plain_body)
+    assert gunzip(gzipped_body) == plain_body
+    assert plain.headers["etag"] == gzipped.headers["etag"]
+
+
+def test_gzip_ndjson_stream(organizations):
+    plain, plain_body = raw_get("/organizations/all_organizations", "identity", {"stream": "true"})
+    gzipped, gzipped_body = raw_get("/organizations/all_organizations", "gzip", {"stream": "true"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "content-length" not in gzipped.headers
+    assert gunzip(gzipped_body) == plain_body
+    assert len(plain_body.splitlines()) == 50
+
+
+def run_asgi(asgi_app, path: str, accept_encoding: str) -> list:
+    """Выполняет GET через ASGI-приложение и возвращает отправленные сообщения."""
+    messages = []
+    scope = {"type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "query_string": b"",
+             "headers": [(b"accept-encoding", accept_encoding.encode())], "http_version": "1.1",
+             "scheme": "http", "server": ("test", 80), "client": ("test", 1), "root_path": "",
+             # ASGI 2.4: StreamingResponse не ждёт http.disconnect от receive
+             "asgi": {"version": "3.0", "spec_version": "2.4"}}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi_app(scope, receive, send))
+    return messages
+
+
+CHUNKS = [json.dumps({"id": i, "name": "Romashka " * 100}).encode() + b"\n" for i in range(3)]
+
+
+def _small_app():
+    api = FastAPI()
+
+    @api.get("/strong")
+    def strong():
+        return Response(content=b"x" * 4096, media_type="application/json", headers={"ETag": '"abc"'})
+
+    @api.get("/stream")
+    def stream():
+        return StreamingResponse(iter(CHUNKS), media_type="application/x-ndjson")
+
+    return CompressionMiddleware(api, min_size=1024)
+
+
+def test_stream_chunks_decompress_incrementally():
+    messages = run_asgi(_small_app(), "/stream", "gzip")
+    bodies = [m for m in messages if m["type"] == "http.response.body"]
+    decompressor = zlib.decompressobj(wbits=31)
+    # Каждая часть тела распаковывается в свою строку NDJSON сразу после получения
+    for message, chunk in zip(bodies, CHUNKS):
+        assert decompressor.decompress(message["body"]) == chunk
+    assert b"".join(decompressor.decompress(m["body"]) for m in bodies[len(CHUNKS):]) == b""
+    assert decompressor.eof
+
+
+@pytest.mark.parametrize("encoding, etag", [("gzip", 'W/"abc"'), ("identity", '"abc"')])
+def test_strong_etag_becomes_weak_when_compressed(encoding, etag):
+    start = run_asgi(_small_app(), "/strong", encoding)[0]
+    headers = {key.decode(): value.decode() for key, value in start["headers"]}
+    assert headers["etag"] == etag
@@ -0,0 +1,13 @@
+from app.crud import organizations as org_crud
+from benchmarks import explain_audit
+
+"""
+Горячие запросы CRUD не читают таблицы целиком (см. benchmarks.explain_audit).
+"""
+
+
+def test_no_full_scans(tmp_path, monkeypatch):
+    # Аудит должен видеть запросы к БД, а не снимок дерева видов деятельности в памяти
+    monkeypatch.setattr(org_crud, "ACTIVITY_CACHE_ENABLED", False)
+    database_url = f"sqlite:///{tmp_path / 'audit.sqlite'}"
+    assert explain_audit.main(["--database-url", database_url, "--organizations", "1000"]) == 0
@@ -0,0 +1,104 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import Base, SessionLocal, engine
+from app.crud.search import ensure_search_index
+from app.main import app
+from app.models.building import Building
+
+"""
+Поиск организаций по области (by_radius, by_rectangle) и по координатам.
+
+Страницы limit/offset совпадают с соответствующими срезами полной выдачи,
+отсортированной по расстоянию и id (в том числе когда страница начинается
+или заканчивается посреди здания), а X-Total-Count — с размером полной
+выдачи. Слишком большая область отклоняется. Здание, вставленное в обход
+create_building, получает geo_cell и находится поиском.
+"""
+
+client = TestClient(app)
+
+# Здания вдоль меридиана на разном расстоянии от первого и число организаций в каждом
+BUILDINGS = [
+    (55.7500, 37.6000, 3),
+    (55.7510, 37.6000, 2),
+    (55.7530, 37.6000, 4),
+    (55.7600, 37.6000, 1),
+    (55.7800, 37.6000, 3),
+]
+
+
+def create(url: str, payload: dict) -> dict:
+    response = client.post(url, json=payload)
+    assert response.status_code == 200, (url, response.text)
+    return response.json()
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        ensure_search_index(connection)
+    for i, (latitude, longitude, organizations) in enumerate(BUILDINGS):
+        building = create("/buildings/", {"address": f"Москва, Тверская {i}", "latitude": latitude, "longitude": longitude})
+        for j in range(organizations):
+            create("/organizations/", {"name": f"Romashka {i}.{j}", "building_id": building["id"],
+                                       "phones": [], "activity_ids": []})
+    return sum(organizations for _, _, organizations in BUILDINGS)
+
+
+def full_list(url: str, params: dict) -> list:
+    response = client.get(url, params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.mark.parametrize("url, params", [
+    ("/organizations/by_radius/", {"latitude": 55.75, "longitude": 37.6, "radius": 5000}),
+    ("/organizations/by_rectangle/", {"min_latitude": 55.7, "max_latitude": 55.8, "min_longitude": 37.5, "max_longitude": 37.7}),
+])
+def test_pages_match_full_list(dataset, url, params):
+    everything = full_list(url, params)
+    assert len(everything) == dataset
+    keys = [(org["distance"], org["id"]) for org in everything]
+    assert keys == sorted(keys)
+    for offset in range(dataset + 1):
+        for limit in (1, 2, 4, 7):
+            response = client.get(url, params={**params, "limit": limit, "offset": offset})
+            page = everything[offset:offset + limit]
+            if not page:
+                assert response.status_code == 404
+                continue
+            assert response.status_code == 200
+            assert [org["id"] for org in response.json()] == [org["id"] for org in page]
+            assert response.headers["x-total-count"] == str(dataset)
+
+
+def test_radius_excludes_buildings_outside(dataset):
+    # До здания на 55.76 около 1.1 км, до 55.78 — около 3.3 км
+    organizations = full_list("/organizations/by_radius/", {"latitude": 55.75, "longitude": 37.6, "radius": 1000})
+    assert len(organizations) == 9
+    assert all(org["distance"] <= 1000 for org in organizations)
+
+
+def test_too_large_area_is_rejected(dataset):
+    response = client.get("/organizations/by_rectangle/", params={
+        "min_latitude": 40, "max_latitude": 70, "min_longitude": 20, "max_longitude": 60})
+    assert response.status_code == 400
+    response = client.get("/organizations/by_radius/", params={"latitude": 55.75, "longitude": 37.6, "radius": 1_000_000})
+    assert response.status_code == 400
+
+
+def test_building_inserted_directly_is_found(dataset):
+    with SessionLocal() as db:
+        building = Building(address="Москва, Арбат 1", latitude=55.7520, longitude=37.5900)
+        db.add(building)
+        db.commit()
+        building_id = building.id
+        assert building.geo_cell is not None
+    create("/organizations/", {"name": "Vasilek", "building_id": building_id, "phones": [], "activity_ids": []})
+    found = full_list("/organizations/by_coordinates/", {"latitude": 55.7520, "longitude": 37.5900})
+    assert [org["name"] for org in found] == ["Vasilek"]
+    found = full_list("/organizations/by_radius/", {"latitude": 55.7520, "longitude": 37.5900, "radius": 10})
+    assert [org["name"] for org in found] == ["Vasilek"]
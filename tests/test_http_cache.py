@@ -0,0 +1,120 @@
+from contextlib import contextmanager
+from datetime import timedelta
+from email.utils import format_datetime, parsedate_to_datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import Base, engine
+from app.crud.search import ensure_search_index
+from app.main import app
+
+"""
+Условные GET-запросы (app.http_cache): ETag, Last-Modified и ответ 304.
+
+304 отдаётся до запросов CRUD и, пока этот процесс не менял данные, без
+обращения к table_versions: ответ на совпадающий If-None-Match не выполняет
+ни одного SQL-запроса. Создание организации или здания через API меняет
+ETag сразу, без ожидания HTTP_CACHE_CHECK_INTERVAL.
+"""
+
+client = TestClient(app)
+
+
+def create(url: str, payload: dict) -> dict:
+    response = client.post(url, json=payload)
+    assert response.status_code == 200, (url, response.text)
+    return response.json()
+
+
+def create_organization(building_id: int, name: str) -> dict:
+    return create("/organizations/", {"name": name, "building_id": building_id,
+                                      "phones": [{"phone": "8-800-000-00-00"}], "activity_ids": []})
+
+
+@pytest.fixture(scope="module")
+def organization():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        ensure_search_index(connection)
+    building = create("/buildings/", {"address": "Москва, Тверская 1", "latitude": 55.757, "longitude": 37.613})
+    return create_organization(building["id"], "Romashka")
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def organization_url(organization: dict) -> str:
+    return f"/organizations/by_organization_id/{organization['id']}"
+
+
+def test_validators_are_sent(organization):
+    response = client.get(organization_url(organization))
+    assert response.status_code == 200
+    assert response.headers["etag"].startswith('W/"')
+    assert parsedate_to_datetime(response.headers["last-modified"]) is not None
+    assert response.headers["cache-control"] == "public, no-cache"
+
+
+def test_if_none_match_gets_304_without_queries(organization):
+    etag = client.get(organization_url(organization)).headers["etag"]
+    with count_statements() as statements:
+        response = client.get(organization_url(organization), headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert statements == []
+
+
+def test_if_none_match_accepts_a_list_and_the_strong_form(organization):
+    etag = client.get(organization_url(organization)).headers["etag"]
+    response = client.get(organization_url(organization), headers={"If-None-Match": f'"other", {etag.removeprefix("W/")}'})
+    assert response.status_code == 304
+
+
+def test_if_modified_since(organization):
+    last_modified = client.get(organization_url(organization)).headers["last-modified"]
+    response = client.get(organization_url(organization), headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+    earlier = format_datetime(parsedate_to_datetime(last_modified) - timedelta(seconds=1), usegmt=True)
+    response = client.get(organization_url(organization), headers={"If-Modified-Since": earlier})
+    assert response.status_code == 200
+    assert response.json()["id"] == organization["id"]
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since(organization):
+    last_modified = client.get(organization_url(organization)).headers["last-modified"]
+    response = client.get(organization_url(organization),
+                          headers={"If-None-Match": 'W/"stale"', "If-Modified-Since": last_modified})
+    assert response.status_code == 200
+
+
+def test_create_invalidates_etag(organization):
+    etag = client.get(organization_url(organization)).headers["etag"]
+    create_organization(organization["building"]["id"], "Romashka 2")
+    response = client.get(organization_url(organization), headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_building_create_invalidates_building_list(organization):
+    etag = client.get("/buildings/").headers["etag"]
+    assert client.get("/buildings/", headers={"If-None-Match": etag}).status_code == 304
+    create("/buildings/", {"address": "Москва, Арбат 10", "latitude": 55.752, "longitude": 37.597})
+    response = client.get("/buildings/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
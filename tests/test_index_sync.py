@@ -0,0 +1,89 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models.building import Building
+from app.models.organizations import Organization
+from app.crud.changes import log_changes
+from app.spatial_index import BuildingSpatialIndex
+from app.suggest_index import SuggestIndex
+
+"""
+In-memory индексы подхватывают строки, созданные другими процессами:
+здесь «другой процесс» — отдельная сессия, которая пишет строку и журнал
+изменений, не трогая индекс.
+"""
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{os.path.join(tmp_path, 'index_sync.sqlite')}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def create_building(engine, address: str, latitude: float, longitude: float) -> int:
+    with Session(engine) as db:
+        building = Building(address=address, latitude=latitude, longitude=longitude)
+        db.add(building)
+        db.flush()
+        log_changes(db, "buildings", [building.id])
+        db.commit()
+        return building.id
+
+
+def create_organization(engine, name: str) -> int:
+    with Session(engine) as db:
+        organization = Organization(name=name)
+        db.add(organization)
+        db.flush()
+        log_changes(db, "organizations", [organization.id])
+        db.commit()
+        return organization.id
+
+
+def test_spatial_index_picks_up_buildings_of_other_processes(engine):
+    create_building(engine, "Тверская, 1", 55.757, 37.613)
+    index = BuildingSpatialIndex(check_interval=0)
+    with Session(engine) as db:
+        index.load(db)
+    other = create_building(engine, "Арбат, 1", 55.752, 37.597)
+
+    with Session(engine) as db:
+        index.refresh(db)
+        assert index.nearest(55.752, 37.597, 1)[0][1] == other
+        # Повторная проверка и локальное добавление не дублируют здание
+        index.refresh(db)
+    index.add(other, 55.752, 37.597)
+    assert len(index) == 2
+
+
+def test_spatial_index_waits_for_check_interval(engine):
+    index = BuildingSpatialIndex(check_interval=3600)
+    with Session(engine) as db:
+        index.load(db)
+    create_building(engine, "Арбат, 1", 55.752, 37.597)
+
+    with Session(engine) as db:
+        index.refresh(db)
+    assert len(index) == 0
+
+
+def test_suggest_index_picks_up_organizations_of_other_processes(engine):
+    create_organization(engine, "Рога и копыта")
+    index = SuggestIndex(check_interval=0)
+    with Session(engine) as db:
+        index.load(db)
+    other = create_organization(engine, "Молочный двор")
+
+    with Session(engine) as db:
+        assert index.refresh_due
+        index.refresh(db)
+        index.refresh(db)
+    index.add_organizations([(other, "Молочный двор")])
+    assert index.suggest("мол") == [{"kind": "organization", "id": other, "name": "Молочный двор"}]
+    assert len(index.organizations) == 2
@@ -0,0 +1,27 @@
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect
+
+from app.database import Base
+from app.models import building, organizations, activity, versions, changes, documents  # noqa: F401 — регистрация моделей
+
+"""
+Цепочка миграций применяется к чистой SQLite-базе и откатывается обратно.
+"""
+
+
+def test_upgrade_and_downgrade_on_sqlite(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'migrations.sqlite'}"
+    config = Config("alembic.ini")
+    config.set_main_option("sqlalchemy.url", database_url)
+
+    command.upgrade(config, "head")
+    engine = create_engine(database_url)
+    tables = set(inspect(engine).get_table_names())
+    assert set(Base.metadata.tables) <= tables
+    columns = {column["name"]: column for column in inspect(engine).get_columns("table_versions")}
+    assert not columns["updated_at"]["nullable"]
+
+    command.downgrade(config, "base")
+    assert set(inspect(engine).get_table_names()) == {"alembic_version"}
+    engine.dispose()
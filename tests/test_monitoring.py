@@ -0,0 +1,30 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+"""
+Эндпоинты мониторинга доступны только с токеном MONITORING_TOKEN.
+"""
+
+client = TestClient(app)
+
+ENDPOINTS = [("GET", "/metrics"), ("GET", "/metrics/cache"), ("GET", "/metrics/pool"),
+             ("GET", "/metrics/queries"), ("DELETE", "/metrics/queries")]
+
+
+@pytest.mark.parametrize("method, url", ENDPOINTS)
+@pytest.mark.parametrize("authorization", [None, "Bearer wrong-token", os.environ["MONITORING_TOKEN"]])
+def test_rejects_requests_without_token(method, url, authorization):
+    headers = {"Authorization": authorization} if authorization else {}
+    response = client.request(method, url, headers=headers)
+    assert response.status_code == 401
+    assert response.headers["www-authenticate"] == "Bearer"
+
+
+@pytest.mark.parametrize("method, url", ENDPOINTS)
+def test_accepts_token(method, url):
+    response = client.request(method, url, headers={"Authorization": f"Bearer {os.environ['MONITORING_TOKEN']}"})
+    assert response.status_code == 200
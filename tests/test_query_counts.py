@@ -0,0 +1,139 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import Base, engine
+from app.crud.search import ensure_search_index
+from app.main import app
+
+"""
+Число SQL-запросов эндпоинтов организаций не зависит от размера выборки.
+
+Каждый эндпоинт выполняется на справочниках из 8 и из 80 организаций
+(в тех же зданиях и с тем же деревом видов деятельности, поэтому выборки
+растут в 10 раз): число запросов должно совпадать и не превышать
+MAX_STATEMENTS. Ленивая загрузка связей (N+1) дала бы запрос на строку.
+
+Справочник заполняется через API. Дерево видов деятельности — одна ветка
+из трёх уровней, и у каждой организации все три вида: число запросов
+загрузки уровней children не зависит от того, какие виды попали в выборку.
+
+Перед замером каждый эндпоинт вызывается один раз: разовые запросы (сборка
+снимка дерева видов деятельности) в замер не попадают.
+"""
+
+# Основной запрос + телефоны + виды деятельности и уровни children, с запасом на вспомогательные запросы
+MAX_STATEMENTS = 10
+
+SIZES = (8, 80)
+
+# Здания справочника: организации размещаются в первых двух
+BUILDINGS = [
+    ("Москва, Тверская 1", 55.7570, 37.6130),
+    ("Москва, Арбат 10", 55.7520, 37.5970),
+    ("Москва, Пятницкая 5", 55.7430, 37.6280),
+    ("Москва, Мясницкая 20", 55.7630, 37.6370),
+]
+
+# Ветка дерева видов деятельности (латиница: lower() в SQLite не меняет регистр кириллицы)
+ACTIVITIES = ("Food", "Dairy", "Cheese")
+
+# Эндпоинт -> функция (справочник) -> (url, параметры); списки — без limit, чтобы выборка росла с размером
+ENDPOINTS = {
+    "all": lambda d: ("/organizations/all_organizations", {}),
+    "all (fields)": lambda d: ("/organizations/all_organizations", {"fields": "name,building,activities"}),
+    "all (stream)": lambda d: ("/organizations/all_organizations", {"stream": "true"}),
+    "by_building": lambda d: (f"/organizations/by_building_id/{d.buildings[0]['id']}", {}),
+    "by_activity": lambda d: (f"/organizations/by_activity/{ACTIVITIES[-1]}", {}),
+    "by_coordinates": lambda d: ("/organizations/by_coordinates/", _point(d)),
+    "by_radius": lambda d: ("/organizations/by_radius/", {**_point(d), "radius": 100_000}),
+    "by_rectangle": lambda d: ("/organizations/by_rectangle/", {
+        "min_latitude": 55, "max_latitude": 56, "min_longitude": 37, "max_longitude": 38}),
+    "nearest": lambda d: ("/organizations/nearest", {**_point(d), "limit": 1}),
+    "search": lambda d: ("/organizations/search", {"q": "Romashka", "limit": 100}),
+    "by_id": lambda d: (f"/organizations/by_organization_id/{d.organizations[0]['id']}", {}),
+    "by_name": lambda d: (f"/organizations/by_organization_name/{d.organizations[0]['name']}", {}),
+    "by_activity_name": lambda d: (f"/organizations/by_activity_name/{ACTIVITIES[0]}", {}),
+}
+
+client = TestClient(app)
+
+
+def _point(dataset) -> dict:
+    # Здание, в котором есть организации: поиск по точке не пуст
+    building = dataset.buildings[0]
+    return {"latitude": building["latitude"], "longitude": building["longitude"]}
+
+
+def create(url: str, payload: dict) -> dict:
+    response = client.post(url, json=payload)
+    assert response.status_code == 200, (url, response.text)
+    return response.json()
+
+
+def seed(organizations: int):
+    """Пересоздаёт таблицы и заполняет справочник через API."""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        # Индекс поиска для SQLite создаётся при старте приложения, а TestClient его не запускает
+        ensure_search_index(connection)
+    buildings = [create("/buildings/", {"address": address, "latitude": latitude, "longitude": longitude})
+                 for address, latitude, longitude in BUILDINGS]
+    activities, parent_id = [], None
+    for name in ACTIVITIES:
+        activities.append(create("/activities/", {"name": name, "parent_id": parent_id}))
+        parent_id = activities[-1]["id"]
+    orgs = [
+        create("/organizations/", {
+            "name": f"Romashka {i}",
+            "building_id": buildings[i % 2]["id"],
+            "phones": [{"phone": f"8-800-{i:03d}-00-0{j}"} for j in range(2)],
+            "activity_ids": [activity["id"] for activity in activities],
+        })
+        for i in range(organizations)
+    ]
+    return SimpleNamespace(buildings=buildings, activities=activities, organizations=orgs)
+
+
+@contextmanager
+def count_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def measure(organizations: int) -> dict:
+    """Число SQL-запросов каждого эндпоинта на справочнике из organizations организаций."""
+    dataset = seed(organizations)
+    counts = {}
+    for name, build in ENDPOINTS.items():
+        url, params = build(dataset)
+        client.get(url, params=params)
+        with count_statements(engine) as statements:
+            response = client.get(url, params=params)
+        assert response.status_code == 200, (name, response.text)
+        counts[name] = len(statements)
+    return counts
+
+
+@pytest.fixture(scope="module")
+def counts():
+    return {size: measure(size) for size in SIZES}
+
+
+@pytest.mark.parametrize("endpoint", list(ENDPOINTS))
+def test_statement_count_is_constant(counts, endpoint):
+    small, large = (counts[size][endpoint] for size in SIZES)
+    assert small == large, f"{endpoint}: {small} запросов на {SIZES[0]} организациях, {large} — на {SIZES[1]}"
+    assert large <= MAX_STATEMENTS, f"{endpoint}: {large} запросов"
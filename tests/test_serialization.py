@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.schemas.changes import ChangeOut
+from app.serialization import dump_row
+
+"""
+Быстрая сериализация (app.serialization) совпадает с ответом Pydantic.
+
+changed_at журнала изменений приходит из SQLite без часового пояса, из
+PostgreSQL — в поясе сессии; в ответе это всегда UTC с суффиксом Z.
+"""
+
+
+@pytest.mark.parametrize("changed_at", [
+    datetime(2026, 1, 2, 3, 4, 5),
+    datetime(2026, 1, 2, 3, 4, 5, 120000, tzinfo=timezone.utc),
+    datetime(2026, 1, 2, 6, 4, 5, tzinfo=timezone(timedelta(hours=3))),
+])
+def test_change_matches_pydantic(changed_at):
+    entry = SimpleNamespace(id=1, table_name="buildings", operation="insert", entity_id=2, version=1,
+                            changed_at=changed_at)
+    building = SimpleNamespace(id=2, address="Москва, Тверская 1", latitude=55.757, longitude=37.613)
+    expected = ChangeOut(cursor=1, table="buildings", operation="insert", id=2, version=1, changed_at=changed_at,
+                         data=vars(building)).model_dump_json().encode()
+    assert dump_row(ChangeOut, (entry, building)) == expected
+    assert b'"changed_at":"2026-01-02T03:04:05' in expected and b'Z"' in expected